@@ -0,0 +1,222 @@
+# source-hash: cc9fcaf5085b06972566dbc0e7b0fc1421ca57f38c4354aa5eab13023f15f742
+# This file is automatically generated by testtools/gentypes.py. Do not edit
+# Generated from: src/core/math/fixed.sv, src/core/types/types.sv, src/core/types/cmd_types.sv
+"""LogicObject types generated from the System Verilog packages"""
+
+from tools.logic_object import Fixed, Int, LogicObject, UInt, LogicField
+
+
+# color_t (12 bits)
+class Color(LogicObject):
+    red: int = LogicField(UInt(4))  # type: ignore
+    green: int = LogicField(UInt(4))  # type: ignore
+    blue: int = LogicField(UInt(4))  # type: ignore
+
+
+# position_t (75 bits)
+class Position(LogicObject):
+    x: float = LogicField(Fixed(14, 25))  # type: ignore
+    y: float = LogicField(Fixed(14, 25))  # type: ignore
+    z: float = LogicField(Fixed(14, 25))  # type: ignore
+
+
+# vertex_t (87 bits)
+class Vertex(LogicObject):
+    position: Position = LogicField(Position)  # type: ignore
+    color: Color = LogicField(Color)  # type: ignore
+
+
+# triangle_t (261 bits)
+class Triangle(LogicObject):
+    v0: Vertex = LogicField(Vertex)  # type: ignore
+    v1: Vertex = LogicField(Vertex)  # type: ignore
+    v2: Vertex = LogicField(Vertex)  # type: ignore
+
+
+# triangle_metadata_t (1 bits)
+class TriangleMetadata(LogicObject):
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+# last_t (1 bits)
+class Last(LogicObject):
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+# rotmat_t (225 bits)
+class Rotmat(LogicObject):
+    m00: float = LogicField(Fixed(14, 25))  # type: ignore
+    m01: float = LogicField(Fixed(14, 25))  # type: ignore
+    m02: float = LogicField(Fixed(14, 25))  # type: ignore
+    m10: float = LogicField(Fixed(14, 25))  # type: ignore
+    m11: float = LogicField(Fixed(14, 25))  # type: ignore
+    m12: float = LogicField(Fixed(14, 25))  # type: ignore
+    m20: float = LogicField(Fixed(14, 25))  # type: ignore
+    m21: float = LogicField(Fixed(14, 25))  # type: ignore
+    m22: float = LogicField(Fixed(14, 25))  # type: ignore
+
+
+# transform_t (300 bits)
+class Transform(LogicObject):
+    position: Position = LogicField(Position)  # type: ignore
+    rotmat: Rotmat = LogicField(Rotmat)  # type: ignore
+
+
+# camera_tf_last_t (301 bits)
+class CameraTfLast(LogicObject):
+    camera_transform: Transform = LogicField(Transform)  # type: ignore
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+# modelinstance_t (308 bits)
+class Modelinstance(LogicObject):
+    model_id: int = LogicField(UInt(8))  # type: ignore
+    transform: Transform = LogicField(Transform)  # type: ignore
+
+
+# scenebuf_modelinstance_t (608 bits)
+class ScenebufModelinstance(LogicObject):
+    model_id: int = LogicField(UInt(8))  # type: ignore
+    model_transform: Transform = LogicField(Transform)  # type: ignore
+    camera_transform: Transform = LogicField(Transform)  # type: ignore
+
+
+# pixel_coordinate_t (20 bits)
+class PixelCoordinate(LogicObject):
+    x: int = LogicField(UInt(10))  # type: ignore
+    y: int = LogicField(UInt(10))  # type: ignore
+
+
+# pixel_data_t (58 bits)
+class PixelData(LogicObject):
+    covered: int = LogicField(UInt(1))  # type: ignore
+    depth: float = LogicField(Fixed(14, 25))  # type: ignore
+    color: Color = LogicField(Color)  # type: ignore
+    coordinate: PixelCoordinate = LogicField(PixelCoordinate)  # type: ignore
+
+
+# pixel_metadata_t (1 bits)
+class PixelMetadata(LogicObject):
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+# bounding_box_t (100 bits)
+class BoundingBox(LogicObject):
+    top: float = LogicField(Fixed(14, 25))  # type: ignore
+    bottom: float = LogicField(Fixed(14, 25))  # type: ignore
+    left: float = LogicField(Fixed(14, 25))  # type: ignore
+    right: float = LogicField(Fixed(14, 25))  # type: ignore
+
+
+# attributed_triangle_t (387 bits)
+class AttributedTriangle(LogicObject):
+    triangle: Triangle = LogicField(Triangle)  # type: ignore
+    area_inv: float = LogicField(Fixed(14, 25))  # type: ignore
+    small_area: int = LogicField(UInt(1))  # type: ignore
+    bounding_box: BoundingBox = LogicField(BoundingBox)  # type: ignore
+
+
+# modelbuf_write_t (269 bits)
+class ModelbufWrite(LogicObject):
+    model_id: int = LogicField(UInt(8))  # type: ignore
+    triangle: Triangle = LogicField(Triangle)  # type: ignore
+
+
+# modelbuf_read_t (24 bits)
+class ModelbufRead(LogicObject):
+    model_index: int = LogicField(UInt(8))  # type: ignore
+    triangle_index: int = LogicField(UInt(16))  # type: ignore
+
+
+# triangle_meta_t (1 bits)
+class TriangleMeta(LogicObject):
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+# modelinstance_meta_t (1 bits)
+class ModelinstanceMeta(LogicObject):
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+# pipeline_entry_t (861 bits)
+class PipelineEntry(LogicObject):
+    triangle: Triangle = LogicField(Triangle)  # type: ignore
+    model_transform: Transform = LogicField(Transform)  # type: ignore
+    camera_transform: Transform = LogicField(Transform)  # type: ignore
+
+
+# triangle_tf (561 bits)
+class TriangleTf(LogicObject):
+    triangle: Triangle = LogicField(Triangle)  # type: ignore
+    transform: Transform = LogicField(Transform)  # type: ignore
+
+
+# triangle_tf_meta_t (2 bits)
+class TriangleTfMeta(LogicObject):
+    model_last: int = LogicField(UInt(1))  # type: ignore
+    triangle_last: int = LogicField(UInt(1))  # type: ignore
+
+
+# cmd_color_t (16 bits)
+class CmdColor(LogicObject):
+    red: int = LogicField(UInt(5))  # type: ignore
+    green: int = LogicField(UInt(6))  # type: ignore
+    blue: int = LogicField(UInt(5))  # type: ignore
+
+
+# cmd_position_t (96 bits)
+class CmdPosition(LogicObject):
+    x: float = LogicField(Fixed(16, 32))  # type: ignore
+    y: float = LogicField(Fixed(16, 32))  # type: ignore
+    z: float = LogicField(Fixed(16, 32))  # type: ignore
+
+
+# cmd_vertex_t (112 bits)
+class CmdVertex(LogicObject):
+    color: CmdColor = LogicField(CmdColor)  # type: ignore
+    position: CmdPosition = LogicField(CmdPosition)  # type: ignore
+
+
+# cmd_triangle_t (336 bits)
+class CmdTriangle(LogicObject):
+    v0: CmdVertex = LogicField(CmdVertex)  # type: ignore
+    v1: CmdVertex = LogicField(CmdVertex)  # type: ignore
+    v2: CmdVertex = LogicField(CmdVertex)  # type: ignore
+
+
+# cmd_rotmat_t (288 bits)
+class CmdRotmat(LogicObject):
+    m00: float = LogicField(Fixed(16, 32))  # type: ignore
+    m01: float = LogicField(Fixed(16, 32))  # type: ignore
+    m02: float = LogicField(Fixed(16, 32))  # type: ignore
+    m10: float = LogicField(Fixed(16, 32))  # type: ignore
+    m11: float = LogicField(Fixed(16, 32))  # type: ignore
+    m12: float = LogicField(Fixed(16, 32))  # type: ignore
+    m20: float = LogicField(Fixed(16, 32))  # type: ignore
+    m21: float = LogicField(Fixed(16, 32))  # type: ignore
+    m22: float = LogicField(Fixed(16, 32))  # type: ignore
+
+
+# cmd_transform_t (384 bits)
+class CmdTransform(LogicObject):
+    position: CmdPosition = LogicField(CmdPosition)  # type: ignore
+    rotmat: CmdRotmat = LogicField(CmdRotmat)  # type: ignore
+
+
+# cmd_modelinstance_t (392 bits)
+class CmdModelinstance(LogicObject):
+    model_id: int = LogicField(UInt(8))  # type: ignore
+    transform: CmdTransform = LogicField(CmdTransform)  # type: ignore
+
+
+# cmd_scene_t (400 bits)
+class CmdScene(LogicObject):
+    unused: int = LogicField(UInt(7))  # type: ignore
+    last: int = LogicField(UInt(1))  # type: ignore
+    modelinst: CmdModelinstance = LogicField(CmdModelinstance)  # type: ignore
+
+
+# cmd_camera_transform_t (400 bits)
+class CmdCameraTransform(LogicObject):
+    reserved: int = LogicField(UInt(16))  # type: ignore
+    transform: CmdTransform = LogicField(CmdTransform)  # type: ignore
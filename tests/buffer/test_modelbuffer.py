@@ -9,6 +9,7 @@ from core.types.types_ import (
     TriangleMeta,
 )
 from tools.pipeline import Producer, Consumer
+from tools.scoreboard import Scoreboard
 from tools.constructors import make_triangle, make_clock
 
 VERILOG_MODULE = "ModelBuffer"
@@ -84,13 +85,6 @@ async def test_write_model(dut: Modelbuffer):
     for data in READ_INPUTS:
         await read_producer.produce(data)
 
-    await ClockCycles(dut.clk, 100)
-
-    triangles = await read_consumer.consume_all()
-
-    assert len(triangles) == len(
-        READ_OUTPUTS
-    ), f"Incorrect number of triangles produced."
-
-    for i, (triangle, actual_triangle) in enumerate(zip(triangles, READ_OUTPUTS)):
-        assert triangle == actual_triangle, f"Failed assertion on index {i}."
+    scoreboard = Scoreboard("read", READ_OUTPUTS)
+    await scoreboard.connect(read_consumer)
+    await scoreboard.wait(dut.clk, max_cycles=100)
@@ -122,4 +122,4 @@ async def test_command(dut: Commandinput, cmd_data: list[int]):
     await tester.add_output_stream("model", data, metadata, processing_time=10)
     data, metadata = zip(*OUTPUTS_CAMERA)
     await tester.add_output_stream("camera", data, metadata, processing_time=10)
-    await tester.run_test(1000)
+    await tester.run_test(max_cycles=1000)
@@ -4,6 +4,7 @@ from cocotb.triggers import ReadOnly
 from stubs.rasterizer import Rasterizer
 import numpy as np
 from PIL import Image
+from tools.parameters import verilog_parameters
 
 from core.types.types_ import (
     RGB,
@@ -15,8 +16,6 @@ from core.types.types_ import (
     TriangleMetadata,
 )
 
-VIEWPORT_WIDTH = 64
-VIEWPORT_HEIGHT = 64
 
 CLOCK_PERIOD = 2  # ns
 
@@ -27,10 +26,12 @@ OVERFLOW_PIXEL = "+"
 UNDERFLOW_PIXEL = "-"
 
 VERILOG_MODULE = "Rasterizer"
-VERILOG_PARAMETERS = {
-    "VIEWPORT_WIDTH": VIEWPORT_WIDTH,
-    "VIEWPORT_HEIGHT": VIEWPORT_HEIGHT,
-}
+# Every test runs once per viewport size
+VERILOG_PARAMETERS = [
+    {"VIEWPORT_WIDTH": 64, "VIEWPORT_HEIGHT": 64},
+    {"VIEWPORT_WIDTH": 160, "VIEWPORT_HEIGHT": 120},
+    {"VIEWPORT_WIDTH": 320, "VIEWPORT_HEIGHT": 240},
+]
 
 TEST_TRIANGLES = [
     ProjectedTriangle(
@@ -120,6 +121,10 @@ async def feed_triangles(clock: Clock, dut: Rasterizer):
 
 @cocotb.test(timeout_time=1, timeout_unit="ms")
 async def test_rasterizer(dut: Rasterizer):
+    parameters = verilog_parameters(VERILOG_PARAMETERS[0])
+    viewport_width = parameters["VIEWPORT_WIDTH"]
+    viewport_height = parameters["VIEWPORT_HEIGHT"]
+
     # Setup clock which will be used to drive the simulation
     clock = Clock(dut.clk, CLOCK_PERIOD, unit="ns")
     clock.start()
@@ -134,8 +139,8 @@ async def test_rasterizer(dut: Rasterizer):
     cocotb.start_soon(feed_triangles(clock, dut))
 
     # Buffers to hold the output data
-    color_buffer = np.zeros((VIEWPORT_HEIGHT, VIEWPORT_WIDTH, 3), dtype=np.uint8)
-    depth_buffer = np.zeros((VIEWPORT_HEIGHT, VIEWPORT_WIDTH), dtype=np.float32)
+    color_buffer = np.zeros((viewport_height, viewport_width, 3), dtype=np.uint8)
+    depth_buffer = np.zeros((viewport_height, viewport_width), dtype=np.float32)
 
     # We are always ready to receive data
     dut.pixel_data_m_ready.value = 1
@@ -147,20 +152,21 @@ async def test_rasterizer(dut: Rasterizer):
             await clock.cycles(1)
             continue
 
-        metadata = PixelDataMetadata.from_logicarray(dut.pixel_data_m_metadata.value)
+        # Views only decode the fields we look at, most pixels are not covered.
+        metadata = PixelDataMetadata.view(dut.pixel_data_m_metadata.value)
         if metadata.last == 1:
             last = True
 
-        pixel = PixelData.from_logicarray(dut.pixel_data_m_data.value)
+        pixel = PixelData.view(dut.pixel_data_m_data.value)
 
         if pixel.covered == 1:
             dut._log.info(f"Got pixel sample: {pixel}")
 
         assert (
-            0 <= pixel.coordinate.x < VIEWPORT_WIDTH
+            0 <= pixel.coordinate.x < viewport_width
         ), f"Pixel x coordinate out of bounds: {pixel.coordinate.x}"
         assert (
-            0 <= pixel.coordinate.y < VIEWPORT_HEIGHT
+            0 <= pixel.coordinate.y < viewport_height
         ), f"Pixel y coordinate out of bounds: {pixel.coordinate.y}"
 
         # Skip non covered pixels.
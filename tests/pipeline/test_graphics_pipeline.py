@@ -9,6 +9,8 @@ from stubs.pipeline import Pipeline
 import numpy as np
 from PIL import Image
 from tools.pipeline import Producer
+from tools.bottleneck import BottleneckProfiler
+from tools.trace import TraceRecorder
 from cocotb.triggers import ClockCycles, RisingEdge, FallingEdge
 import numpy as np
 import os
@@ -25,6 +27,30 @@ VERILOG_PARAMETERS = {
     "IGNORE_DRAW_ACK": 1,
 }
 
+# Simulates several frames, so build without tracing and only with access
+# to the signals used below, see BUILD_PROFILES in testtools/runner_tools.py
+VERILATOR_PROFILE = "fast"
+VERILATOR_PUBLIC = [
+    # Stages of the BottleneckProfiler
+    "*.*_s_valid",
+    "*.*_s_ready",
+    "*.*_m_valid",
+    "*.*_m_ready",
+    "Rasterizer.triangle_s_*",
+    "DrawingManager.write_*",
+    "DrawingManager.frame_done",
+]
+
+# Sample the stages with the BottleneckProfiler every this many cycles,
+# e.g. `make test PROFILE_STAGES=1`. Off by default, as sampling every
+# stage slows down the simulation.
+PROFILE_STAGES = int(os.environ.get("TEST_PROFILE_STAGES") or 0)
+
+# Record the triangles entering the rasterizer to
+# pipeline_output/rasterizer_triangles.npz, e.g. `make test RECORD_TRACES=1`.
+# See tests/tools/trace.py for replaying them.
+RECORD_TRACES = bool(os.environ.get("TEST_RECORD_TRACES"))
+
 CMD_BEGIN_UPLOAD = 0xA0
 CMD_UPLOAD_TRIANGLE = 0xA1
 CMD_ADD_MODEL_INSTANCE = 0xB0
@@ -69,6 +95,18 @@ async def test_graphics_pipeline(dut: Pipeline):
     producer = Producer(dut, "cmd", clock_name="clk_system", processing_time=20)
     cocotb.start_soon(feed_commands(producer, INPUTS))
 
+    profiler = None
+    if PROFILE_STAGES:
+        profiler = BottleneckProfiler(
+            dut, clock_name="clk_system", sample_every=PROFILE_STAGES
+        )
+        await profiler.run()
+
+    recorder = None
+    if RECORD_TRACES:
+        recorder = TraceRecorder(dut.pipeline_math.rasterizer, "triangle", "s")
+        await recorder.run()
+
     write_en = dut.pipeline_tail.drawing_manager_inst.write_en
     write_addr = dut.pipeline_tail.drawing_manager_inst.write_addr
     write_data = dut.pipeline_tail.drawing_manager_inst.write_data
@@ -98,3 +136,11 @@ async def test_graphics_pipeline(dut: Pipeline):
 
         # Wait for frame done to be assserted
         await FallingEdge(dut.pipeline_tail.drawing_manager_inst.frame_done)
+
+    if profiler is not None:
+        dut._log.info(f"Pipeline stage utilization:\n{profiler.report()}")
+        profiler.write("pipeline_output/bottleneck.json")
+
+    if recorder is not None:
+        recorder.save("pipeline_output/rasterizer_triangles.npz")
+        dut._log.info(f"Recorded {len(recorder)} triangles at the rasterizer")
@@ -15,6 +15,7 @@ from tools.constructors import (
     make_identity_transform,
 )
 from tools.pipeline import Producer, Consumer
+from tools.scoreboard import Scoreboard
 
 VERILOG_MODULE = "PipelineHead"
 
@@ -112,12 +113,11 @@ async def test_pipehead(dut):
 
     await ClockCycles(dut.clk, 1000)
     await consumer.run()
-    await ClockCycles(dut.clk, 1000)
 
-    outputs = await consumer.consume_all()
+    scoreboard = Scoreboard("triangle_tf", OUTPUTS_PIPE)
+    await scoreboard.connect(consumer)
+    await scoreboard.wait(dut.clk, max_cycles=1000)
 
-    assert len(outputs) == len(
-        OUTPUTS_PIPE
-    ), f"Incorrect number of elements: {len(outputs)} vs {len(OUTPUTS_PIPE)}"
-    for output, actual_output in zip(outputs, OUTPUTS_PIPE):
-        assert output == actual_output
+    # Nothing more should come out
+    await ClockCycles(dut.clk, 10)
+    assert scoreboard.received == len(OUTPUTS_PIPE)
@@ -1,9 +1,19 @@
 import cocotb
-from tools.pipeline import Producer, Consumer
+import numpy as np
+from tools.pipeline import (
+    Producer,
+    Consumer,
+    Monitor,
+    PipelineTester,
+    latency_histogram,
+)
+from tools.patterns import Bernoulli, Bursty, Constant, Periodic
+from tools.trace import TraceRecorder, replay_trace
+from tools.scoreboard import Scoreboard
 
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, ClockCycles
-from tools.logic_object import LogicObject, UInt, LogicField
+from tools.logic_object import Fixed, LogicObject, UInt, LogicField
 from stubs.pipelinetoolstester import Pipelinetoolstester
 
 VERILOG_MODULE = "PipelineToolsTester"
@@ -25,6 +35,16 @@ class OutputMetadata(LogicObject):
     test: int = LogicField(UInt(4))  # type: ignore
 
 
+class LastMetadata(LogicObject):
+    test: int = LogicField(UInt(3))  # type: ignore
+    last: int = LogicField(UInt(1))  # type: ignore
+
+
+class FixedData(LogicObject):
+    coarse: float = LogicField(Fixed(3, 8))  # type: ignore
+    fine: float = LogicField(Fixed(10, 16))  # type: ignore
+
+
 async def make_clock(dut):
     cocotb.start_soon(Clock(dut.clk, 10, unit="ns").start())
     dut.rstn.value = 0
@@ -80,3 +100,192 @@ async def test_no_metadata(dut: Pipelinetoolstester):
         assert (
             i_data.test == o_data.test
         ), f"Data at index {i} did not match: {i_data.test} != {o_data.test}"
+
+
+@cocotb.test(timeout_time=10 * 1000, timeout_unit="ns")
+async def test_stream_full_rate(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    producer = Producer(dut, "stage")
+    consumer = Consumer(dut, "stage", OutputData, OutputMetadata)
+    await consumer.run()
+
+    input_data = [(InputData(i), InputMetadata(i % 16)) for i in range(20)]
+    stats = await producer.stream(input_data)
+
+    assert stats.transactions == 20
+    assert stats.throughput == 1.0, f"Expected one transaction per cycle: {stats}"
+
+    await ClockCycles(dut.clk, 5)
+    output_data = await consumer.consume_all()
+    assert [data.test for data, _ in output_data] == list(range(20))
+
+
+@cocotb.test(timeout_time=10 * 1000, timeout_unit="ns")
+async def test_stream_async_generator(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    producer = Producer(dut, "stage")
+    consumer = Consumer(dut, "stage", OutputData, None)
+    await consumer.run()
+
+    async def generate():
+        for i in range(10):
+            if i % 3 == 0:
+                await ClockCycles(dut.clk, 2)
+            yield InputData(i)
+
+    stats = await producer.stream(generate())
+
+    assert stats.transactions == 10
+    # Cycles waiting for the generator count, but are not stalls
+    assert stats.cycles > stats.transactions, stats
+    assert stats.stall_cycles == 0, stats
+
+    await ClockCycles(dut.clk, 5)
+    output_data = await consumer.consume_all()
+    assert [data.test for data, _ in output_data] == list(range(10))
+
+
+@cocotb.test(timeout_time=10 * 1000, timeout_unit="ns")
+async def test_monitor(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    producer = Producer(dut, "stage")
+    consumer = Consumer(dut, "stage", OutputData, None, processing_time=2)
+    source = Monitor(dut, "stage", "s", InputData, tag=lambda data: data.test)
+    sink = Monitor(dut, "stage", "m", OutputData, tag=lambda data: data.test)
+    await source.run()
+    await sink.run()
+    await consumer.run()
+
+    await producer.stream([InputData(i) for i in range(10)])
+    await ClockCycles(dut.clk, 10)
+
+    assert source.stats.beats == 10
+    assert sink.stats.beats == 10
+    assert sink.stats.beats_per_cycle < 1
+    assert [handshake.tag for handshake in sink.handshakes] == list(range(10))
+
+    latency = latency_histogram(source, sink)
+    assert sum(latency.values()) == 10
+    assert (
+        min(latency) >= 1
+    ), f"Register stage has at least one cycle latency: {latency}"
+
+
+@cocotb.test(timeout_time=10 * 1000, timeout_unit="ns")
+async def test_trace_record_replay(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    producer = Producer(dut, "stage")
+    consumer = Consumer(dut, "stage", OutputData, OutputMetadata)
+    await consumer.run()
+
+    recorder = TraceRecorder(dut, "stage", "s")
+    await recorder.run()
+
+    async def generate():
+        for i in range(8):
+            if i % 3 != 0:
+                await ClockCycles(dut.clk, i % 3)
+            yield InputData(i), InputMetadata(i)
+
+    await producer.stream(generate())
+    trace = recorder.trace()
+    assert len(trace) == 8
+    assert trace.data_ints() == list(range(8))
+    assert trace.metadata_ints() == list(range(8))
+
+    data, metadata = trace.decode(InputData, InputMetadata)
+    assert list(data["test"]) == list(range(8))
+
+    # Replaying with the original timing keeps the spacing between handshakes
+    replayed = TraceRecorder(dut, "stage", "s")
+    await replayed.run()
+    await replay_trace(producer, trace)
+    assert list(np.diff(replayed.trace().cycles)) == list(np.diff(trace.cycles))
+
+    stats = await replay_trace(producer, trace, timing="full_rate")
+    assert stats.throughput == 1.0
+
+
+@cocotb.test(timeout_time=10 * 1000, timeout_unit="ns")
+async def test_scoreboard(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    producer = Producer(dut, "stage")
+    consumer = Consumer(dut, "stage", OutputData, OutputMetadata)
+    await consumer.run()
+
+    # Outputs with different metadata may be matched in any order
+    expected = [(OutputData(i), OutputMetadata(i % 2)) for i in range(10)]
+    expected = expected[1::2] + expected[0::2]
+    scoreboard = Scoreboard("stage", expected, key=lambda data, meta: meta.test)
+    await scoreboard.connect(consumer)
+
+    await producer.stream([(InputData(i), InputMetadata(i % 2)) for i in range(10)])
+    await scoreboard.wait(dut.clk, max_cycles=10)
+    assert scoreboard.matched == 10
+
+    diff = scoreboard.diff(
+        (OutputData(1), OutputMetadata(0)), (OutputData(2), OutputMetadata(0))
+    )
+    assert diff == ["data.test: 1 != 2"]
+
+    # LogicObject keys are matched by value and need not be frozen
+    scoreboard = Scoreboard(
+        "keys", [(OutputData(1), OutputMetadata(1))], key=lambda data, meta: meta
+    )
+    scoreboard.check(OutputData(1), OutputMetadata(1))
+    assert scoreboard.done
+
+    # Tolerances are in LSBs of each field, not of the default Q.14 format
+    scoreboard = Scoreboard("fixed", [], tolerances={"data.*": 1})
+    assert not scoreboard.diff(
+        (FixedData(1.0, 1.0), None), (FixedData(1.125, 1.0 + 2**-10), None)
+    )
+    assert scoreboard.diff(
+        (FixedData(1.0, 1.0), None), (FixedData(1.25, 1.0 + 2**-9), None)
+    ) == ["data.coarse: 1.0 != 1.25", "data.fine: 1.0 != 1.001953125"]
+
+
+@cocotb.test(timeout_time=100 * 1000, timeout_unit="ns")
+async def test_backpressure_sweep(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    tester = PipelineTester(dut)
+    await tester.add_input_stream(
+        "stage",
+        [InputData(i) for i in range(32)],
+        [InputMetadata(i % 16) for i in range(32)],
+    )
+    await tester.add_output_stream(
+        "stage",
+        [OutputData(i) for i in range(32)],
+        [OutputMetadata(i % 16) for i in range(32)],
+    )
+
+    points = await tester.sweep(
+        [
+            Constant(1.0),
+            Constant(0.5),
+            Bernoulli(0.5, seed=1),
+            Bursty(4, 4, seed=2),
+            Periodic(4),
+        ],
+        valid_pattern=Constant(1.0),
+        quiet_cycles=2,
+    )
+
+    assert [point.backpressure for point in points] == [0.0, 0.5, 0.5, 0.5, 0.75]
+    assert points[0].throughput > points[1].throughput > points[4].throughput
+
+
+@cocotb.test(timeout_time=10 * 1000, timeout_unit="ns")
+async def test_run_until_last(dut: Pipelinetoolstester):
+    await make_clock(dut)
+    tester = PipelineTester(dut)
+    metadata = [LastMetadata(i % 8, int(i == 11)) for i in range(12)]
+    await tester.add_input_stream("stage", [InputData(i) for i in range(12)], metadata)
+    await tester.add_output_stream(
+        "stage", [OutputData(i) for i in range(12)], metadata, until_last=True
+    )
+
+    # The stream completes with its last transaction
+    cycles = await tester.run_test(quiet_cycles=2, idle_timeout=10)
+    assert cycles >= 12
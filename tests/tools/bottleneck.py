@@ -0,0 +1,206 @@
+"""
+Find the stage limiting throughput in a hierarchy of valid/ready stages.
+
+Every module instance with `<name>_s_{valid,ready}` input or
+`<name>_m_{valid,ready}` output ports is treated as a stage. All stages
+are sampled from a single coroutine every `sample_every` cycles.
+
+A stage is self-limited in a cycle when one of its inputs is stalled
+(valid && !ready) while none of its outputs are stalled by the stage
+downstream. The leaf stage with the most self-limited cycles is the
+critical stage.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+
+import cocotb
+import cocotb.handle
+from cocotb.triggers import RisingEdge, ReadOnly, ClockCycles
+
+INTERFACE_RE = re.compile(r"^(?P<name>\w+)_(?P<type>[sm])_valid$")
+
+
+@dataclass
+class InterfaceStats:
+    name: str
+    type: str
+    beats: int = 0
+    stall_cycles: int = 0
+    starvation_cycles: int = 0
+
+
+@dataclass
+class StageStats:
+    path: str
+    depth: int
+    inputs: list[InterfaceStats] = field(default_factory=list)
+    outputs: list[InterfaceStats] = field(default_factory=list)
+    self_limited_cycles: int = 0
+    is_leaf: bool = True
+
+
+# Statistics, valid handle and ready handle of an interface
+_Interface = tuple[
+    InterfaceStats, cocotb.handle.ValueObjectBase, cocotb.handle.ValueObjectBase
+]
+
+
+class BottleneckProfiler:
+    def __init__(self, dut, clock_name: str = "clk", sample_every: int = 1):
+        if sample_every < 1:
+            raise ValueError(f"{sample_every} is not a valid sample interval.")
+        self._dut = dut
+        self._clock_name = clock_name
+        self._sample_every = sample_every
+        self.samples = 0
+        self.stages: list[StageStats] = []
+        self._signals: list[tuple[StageStats, list[_Interface], list[_Interface]]] = []
+
+    def discover(self) -> list[StageStats]:
+        """Walk the hierarchy and find all stages with valid/ready ports."""
+        self.stages = []
+        self._signals = []
+        self._discover(self._dut, self._dut._path, 0)
+
+        # Stages containing other stages are reported, but never critical.
+        for stage in self.stages:
+            stage.is_leaf = not any(
+                other.path.startswith(stage.path + ".") for other in self.stages
+            )
+        return self.stages
+
+    def _discover(self, scope, path: str, depth: int):
+        children = dict(scope._items())
+
+        stage = StageStats(path, depth)
+        inputs: list[_Interface] = []
+        outputs: list[_Interface] = []
+        for key, child in children.items():
+            match = INTERFACE_RE.match(str(key))
+            if match is None:
+                continue
+            ready = children.get(f"{match['name']}_{match['type']}_ready")
+            if ready is None:
+                continue
+
+            interface = InterfaceStats(match["name"], match["type"])
+            if match["type"] == "s":
+                stage.inputs.append(interface)
+                inputs.append((interface, child, ready))
+            else:
+                stage.outputs.append(interface)
+                outputs.append((interface, child, ready))
+
+        if inputs or outputs:
+            self.stages.append(stage)
+            self._signals.append((stage, inputs, outputs))
+
+        for key, child in children.items():
+            if isinstance(
+                child,
+                (cocotb.handle.HierarchyObject, cocotb.handle.HierarchyArrayObject),
+            ):
+                self._discover(child, f"{path}.{key}", depth + 1)
+
+    async def run(self):
+        """Discover stages if needed, and start sampling them."""
+        if not self.stages:
+            self.discover()
+        cocotb.start_soon(self._run_loop())
+
+    async def _run_loop(self):
+        clk = getattr(self._dut, self._clock_name)
+        while True:
+            if self._sample_every > 1:
+                await ClockCycles(clk, self._sample_every)
+            else:
+                await RisingEdge(clk)
+            await ReadOnly()
+            self.samples += 1
+
+            for stage, inputs, outputs in self._signals:
+                input_stalled = self._sample(inputs)
+                output_stalled = self._sample(outputs)
+                if input_stalled and not output_stalled:
+                    stage.self_limited_cycles += 1
+
+    @staticmethod
+    def _sample(interfaces) -> bool:
+        """Count the current cycle, returns whether any interface stalled."""
+        stalled = False
+        for interface, valid, ready in interfaces:
+            is_valid = valid.value == 1
+            is_ready = ready.value == 1
+            if is_valid and is_ready:
+                interface.beats += 1
+            elif is_valid:
+                interface.stall_cycles += 1
+                stalled = True
+            elif is_ready:
+                interface.starvation_cycles += 1
+        return stalled
+
+    def critical_stage(self) -> StageStats | None:
+        """The leaf stage that most often stalled its inputs on its own."""
+        leaves = [stage for stage in self.stages if stage.is_leaf]
+        if not leaves or self.samples == 0:
+            return None
+        critical = max(leaves, key=lambda stage: stage.self_limited_cycles)
+        return critical if critical.self_limited_cycles > 0 else None
+
+    def _fraction(self, cycles: int) -> float:
+        return cycles / self.samples if self.samples > 0 else 0.0
+
+    def report(self) -> str:
+        """Stage-by-stage utilization and backpressure table."""
+        lines = [
+            f"{'stage':<48} {'interface':<24} {'util':>6} {'stall':>6} {'starve':>6} {'self':>6}",
+        ]
+        for stage in self.stages:
+            name = "  " * stage.depth + stage.path.rsplit(".", 1)[-1]
+            self_limited = f"{self._fraction(stage.self_limited_cycles):>6.1%}"
+            for interface in stage.inputs + stage.outputs:
+                lines.append(
+                    f"{name:<48} {interface.name + '_' + interface.type:<24}"
+                    f" {self._fraction(interface.beats):>6.1%}"
+                    f" {self._fraction(interface.stall_cycles):>6.1%}"
+                    f" {self._fraction(interface.starvation_cycles):>6.1%}"
+                    f" {self_limited}"
+                )
+                name = ""
+                self_limited = ""
+
+        critical = self.critical_stage()
+        if critical is None:
+            lines.append("No stage limited throughput on its own")
+        else:
+            lines.append(
+                f"Critical stage: {critical.path} (self-limited"
+                f" {self._fraction(critical.self_limited_cycles):.1%} of"
+                f" {self.samples} sampled cycles)"
+            )
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """Write the statistics of all stages as JSON."""
+        critical = self.critical_stage()
+        summary = {
+            "samples": self.samples,
+            "sample_every": self._sample_every,
+            "critical_stage": critical.path if critical is not None else None,
+            "stages": [
+                {
+                    "path": stage.path,
+                    "leaf": stage.is_leaf,
+                    "self_limited_cycles": stage.self_limited_cycles,
+                    "interfaces": [
+                        vars(interface) for interface in stage.inputs + stage.outputs
+                    ],
+                }
+                for stage in self.stages
+            ],
+        }
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
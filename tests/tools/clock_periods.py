@@ -0,0 +1,48 @@
+"""
+Record the clock period of every test, to report simulated clock cycles.
+
+The test runner in testtools loads this module into every simulation.
+It records the period of the fastest clock started by each test in the
+JSON file given in TEST_CLOCK_PERIODS, in ns by the full test name.
+"""
+
+import json
+import os
+import warnings
+
+import cocotb.regression
+from cocotb.clock import Clock
+from cocotb.simtime import convert
+
+# This module only hooks into Clock and has no tests of its own
+warnings.filterwarnings("ignore", f"No tests were discovered in module: {__name__}")
+
+_periods: dict[str, float] = {}
+
+
+def _current_test() -> str:
+    test = getattr(cocotb.regression._manager_inst, "_test", None)
+    return test.fullname if test is not None else ""
+
+
+def _record(clock: Clock):
+    period = float(convert(clock.period, clock.unit, to="ns", round_mode="round"))
+    test = _current_test()
+    if period <= 0 or (test in _periods and _periods[test] <= period):
+        return
+    _periods[test] = period
+
+    path = os.environ["TEST_CLOCK_PERIODS"]
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(_periods, f)
+    os.replace(f"{path}.tmp", path)
+
+
+if os.environ.get("TEST_CLOCK_PERIODS"):
+    _start = Clock.start
+
+    def _start_recorded(self: Clock, *args, **kwargs):
+        _record(self)
+        return _start(self, *args, **kwargs)
+
+    Clock.start = _start_recorded  # type: ignore
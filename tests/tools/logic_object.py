@@ -1,9 +1,11 @@
-from dataclasses import dataclass, Field, field, fields
-from typing import dataclass_transform, Literal
+from dataclasses import dataclass, Field, field, fields, MISSING
+from operator import attrgetter
+from typing import dataclass_transform, Literal, Sequence
+import math
 
-from numpy import isin
+import numpy as np
 
-from tools.utils import quantize, to_fixed, to_float
+from tools.utils import quantize, np_round_away, STANDARD_FRACTIONAL_BITS
 from cocotb.types import LogicArray, Logic, Range
 
 
@@ -52,78 +54,527 @@ def concat(a: LogicArray, *arr: LogicArray) -> LogicArray:
     return result
 
 
-@dataclass_transform()
+@dataclass(frozen=True)
+class LayoutEntry:
+    """A single leaf field of a (possibly nested) LogicObject.
+
+    The offset is the absolute position of the least significant bit of
+    the field within the packed value of the outermost LogicObject.
+    """
+
+    path: tuple[str, ...]
+    offset: int
+    width: int
+    kind: "type[_LogicType]"
+    fractional_bits: int = 0
+    byteorder: Literal["big", "little"] = "big"
+
+
+def _build_layout(cls: "type[LogicObject]", offset: int = 0) -> list[LayoutEntry]:
+    """Flatten the fields of `cls` into leaf entries, LSB first."""
+    layout: list[LayoutEntry] = []
+    for key in reversed(cls.__dataclass_fields__.keys()):
+        field_type = cls._get_field(key)
+        if isinstance(field_type, type):
+            for entry in field_type._layout:
+                layout.append(
+                    LayoutEntry(
+                        path=(key, *entry.path),
+                        offset=offset + entry.offset,
+                        width=entry.width,
+                        kind=entry.kind,
+                        fractional_bits=entry.fractional_bits,
+                        byteorder=entry.byteorder,
+                    )
+                )
+        else:
+            layout.append(
+                LayoutEntry(
+                    path=(key,),
+                    offset=offset,
+                    width=field_type.size,
+                    kind=type(field_type),
+                    fractional_bits=getattr(field_type, "fractional_bits", 0),
+                    byteorder=getattr(field_type, "byteorder", "big"),
+                )
+            )
+        offset += cls._get_field_size(key)
+    return layout
+
+
+def _unpack_expression(
+    cls: "type[LogicObject]", namespace: dict, offset: int = 0
+) -> str:
+    """Python expression constructing `cls` from the packed integer `v`."""
+    type_name = f"_T{len(namespace)}"
+    namespace[type_name] = cls
+
+    args = []
+    for key in reversed(cls.__dataclass_fields__.keys()):
+        field_type = cls._get_field(key)
+        size = cls._get_field_size(key)
+        mask = (1 << size) - 1
+        sign = 1 << (size - 1)
+
+        if isinstance(field_type, type):
+            args.append(_unpack_expression(field_type, namespace, offset))
+        elif isinstance(field_type, UInt):
+            args.append(f"v >> {offset} & {mask}")
+        elif isinstance(field_type, Int):
+            args.append(f"((v >> {offset} & {mask}) ^ {sign}) - {sign}")
+        elif isinstance(field_type, Fixed):
+            args.append(
+                f"(((v >> {offset} & {mask}) ^ {sign}) - {sign})"
+                f" / {1 << field_type.fractional_bits}"
+            )
+        elif isinstance(field_type, Bytes):
+            args.append(
+                f"(v >> {offset} & {mask})"
+                f".to_bytes({(size + 7) // 8}, '{field_type.byteorder}')"
+            )
+        else:
+            raise ValueError(f"Invalid value type '{type(field_type)}'")
+
+        offset += size
+
+    return f"{type_name}({', '.join(reversed(args))})"
+
+
+def _compile_codec(cls: "type[LogicObject]"):
+    """
+    Generate straight-line functions converting between an instance of
+    `cls` and a single packed integer, using the flattened layout.
+    """
+    namespace: dict = {"_floor": math.floor, "_ceil": math.ceil}
+    unpack_src = f"def _unpack(v):\n    return {_unpack_expression(cls, namespace)}\n"
+
+    pack_lines = ["def _pack(self):", "    v = 0"]
+    for entry in cls._layout:
+        attribute = ".".join(("self", *entry.path))
+        name = ".".join(entry.path)
+        mask = (1 << entry.width) - 1
+
+        pack_lines.append(f"    x = {attribute}")
+        if entry.kind is Bytes:
+            length = (entry.width + 7) // 8
+            pack_lines.append(f"    if len(x) != {length}:")
+            pack_lines.append(
+                f"        raise ValueError(f\"Value {{x!r}} of field '{name}' is not {length} bytes long\")"
+            )
+            pack_lines.append(f"    x = int.from_bytes(x, '{entry.byteorder}')")
+        elif entry.kind is Fixed:
+            # Round away from zero, as System Verilog does.
+            scale = 1 << entry.fractional_bits
+            pack_lines.append(f"    x = x * {scale}")
+            pack_lines.append("    x = _floor(x + 0.5) if x >= 0.0 else _ceil(x - 0.5)")
+        else:
+            pack_lines.append("    x = int(x)")
+
+        if entry.kind in (UInt, Bytes):
+            low, high = 0, mask
+        else:
+            low, high = -(1 << (entry.width - 1)), (1 << (entry.width - 1)) - 1
+        pack_lines.append(f"    if not {low} <= x <= {high}:")
+        pack_lines.append(
+            f"        raise ValueError(f\"Value {{x}} of field '{name}' will not fit in {entry.width} bits\")"
+        )
+        pack_lines.append(f"    v |= (x & {mask}) << {entry.offset}")
+    pack_lines.append("    return v")
+
+    exec(unpack_src, namespace)
+    exec("\n".join(pack_lines), namespace)
+    return namespace["_pack"], namespace["_unpack"]
+
+
+class LogicView:
+    """
+    Read-only view of a packed LogicObject. Fields are only decoded when
+    accessed, and nested views share the backing integer of their parent.
+    """
+
+    __slots__ = ("_value", "_offset")
+    _object_type: "type[LogicObject]"
+
+    def __init__(self, value: int, offset: int = 0):
+        self._value = value
+        self._offset = offset
+
+    def materialize(self) -> "LogicObject":
+        """Decode every field into a normal LogicObject."""
+        return self._object_type.from_int(self._value >> self._offset)
+
+    def to_int(self) -> int:
+        """The packed integer representation of the viewed LogicObject."""
+        return (self._value >> self._offset) & ((1 << self._object_type._size) - 1)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LogicView):
+            other = other.materialize()
+        if not isinstance(other, LogicObject):
+            return NotImplemented
+        return self.materialize() == other
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"view({self.materialize()!r})"
+
+
+def _view_property(
+    field_type: "_LogicType | type[LogicObject]", offset: int
+) -> property:
+    """Property decoding a single field of a view at `offset`."""
+    if isinstance(field_type, type):
+        view_type = field_type._view_type
+        return property(lambda self: view_type(self._value, self._offset + offset))
+
+    mask = (1 << field_type.size) - 1
+    sign = 1 << (field_type.size - 1)
+    if isinstance(field_type, UInt):
+        return property(lambda self: self._value >> (self._offset + offset) & mask)
+    if isinstance(field_type, Int):
+        return property(
+            lambda self: ((self._value >> (self._offset + offset) & mask) ^ sign) - sign
+        )
+    if isinstance(field_type, Fixed):
+        scale = 1 << field_type.fractional_bits
+        return property(
+            lambda self: quantize(
+                (((self._value >> (self._offset + offset) & mask) ^ sign) - sign)
+                / scale
+            )
+        )
+    if isinstance(field_type, Bytes):
+        length = (field_type.size + 7) // 8
+        byteorder = field_type.byteorder
+        return property(
+            lambda self: (self._value >> (self._offset + offset) & mask).to_bytes(
+                length, byteorder
+            )
+        )
+    raise ValueError(f"Invalid value type '{type(field_type)}'")
+
+
+def _make_view_type(cls: "type[LogicObject]") -> type[LogicView]:
+    namespace: dict = {"__slots__": (), "_object_type": cls}
+    offset = 0
+    for key in reversed(cls.__dataclass_fields__.keys()):
+        namespace[key] = _view_property(cls._get_field(key), offset)
+        offset += cls._get_field_size(key)
+    return type(f"{cls.__name__}View", (LogicView,), namespace)
+
+
+def _compile_post_init(cls: type):
+    """
+    Generate a `__post_init__` quantizing all Fixed fields of `cls` in a
+    single straight-line function, or None if there are no Fixed fields.
+    """
+    logic_fields: dict[str, Field] = {}
+    for base in reversed(cls.__mro__):
+        logic_fields.update(getattr(base, "__dataclass_fields__", {}))
+    logic_fields.update(
+        (name, value) for name, value in vars(cls).items() if isinstance(value, Field)
+    )
+    names = [
+        name
+        for name, value_field in logic_fields.items()
+        if isinstance(value_field.metadata.get("type"), Fixed)
+    ]
+    if len(names) == 0:
+        return None
+
+    # Quantize to the standard fixed point format, like `quantize()`.
+    scale = 1 << STANDARD_FRACTIONAL_BITS
+    lines = ["def __post_init__(self):"]
+    for name in names:
+        lines += [
+            f"    x = self.{name}",
+            "    if not isinstance(x, (int, float)):",
+            f"        raise TypeError(f\"Field '{name}' must be of type 'int' or 'float', got '{{type(x)}}'\")",
+            f"    x = x * {scale}",
+            "    x = _floor(x + 0.5) if x >= 0.0 else _ceil(x - 0.5)",
+            f"    _setattr(self, '{name}', x / {scale})",
+        ]
+
+    namespace: dict = {
+        "_floor": math.floor,
+        "_ceil": math.ceil,
+        "_setattr": object.__setattr__,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["__post_init__"]
+
+
+def _compile_frozen_init(cls: type):
+    """
+    Generate an `__init__` for a frozen slotted dataclass, which stores the
+    fields through their slot descriptors instead of calling
+    `object.__setattr__` for every field like the dataclass one.
+    """
+    closure: dict = {"_MISSING": MISSING}
+    params = ["self"]
+    body = []
+    for value_field in fields(cls):
+        name = value_field.name
+        closure[f"_set_{name}"] = getattr(cls, name).__set__
+        if value_field.default is not MISSING:
+            closure[f"_default_{name}"] = value_field.default
+            default = f"_default_{name}"
+        elif value_field.default_factory is not MISSING:
+            closure[f"_factory_{name}"] = value_field.default_factory
+            default = "_MISSING"
+        elif value_field.init:
+            default = None
+        else:
+            # Left unset, like the dataclass __init__ does
+            continue
+
+        if not value_field.init:
+            body.append(f"    {name} = {default}")
+        elif default is None:
+            params.append(name)
+        else:
+            params.append(f"{name}={default}")
+        if value_field.default_factory is not MISSING:
+            body.append(f"    if {name} is _MISSING:")
+            body.append(f"        {name} = _factory_{name}()")
+        body.append(f"    _set_{name}(self, {name})")
+    if hasattr(cls, "__post_init__"):
+        body.append("    self.__post_init__()")
+
+    # Closure variables are faster to look up than globals
+    lines = [
+        f"def _make({', '.join(closure)}):",
+        f"  def __init__({', '.join(params)}):",
+    ]
+    lines += [f"  {line}" for line in body or ["    pass"]]
+    lines.append("  return __init__")
+    namespace: dict = {}
+    exec("\n".join(lines), namespace)
+    init = namespace["_make"](**closure)
+    init.__qualname__ = f"{cls.__qualname__}.__init__"
+    return init
+
+
+@dataclass_transform(frozen_default=False)
 class _Meta(type):
-    def __new__(cls, *args, **kwargs):
-        cls = super().__new__(cls, *args, **kwargs)
-        return dataclass(cls)
+    def __new__(cls, name, bases, namespace, frozen: bool = False, **kwargs):
+        cls = super().__new__(cls, name, bases, namespace, **kwargs)
+        if "__dataclass_fields__" in namespace:
+            # Class recreated by dataclass to add __slots__, handled below
+            return cls
+        if not any(isinstance(base, _Meta) for base in bases):
+            # The LogicObject base is not a dataclass itself, as that would
+            # prevent subclasses from choosing whether they are frozen.
+            cls._layout = ()
+            cls._size = 0
+            return cls
+
+        post_init = _compile_post_init(cls)
+        if post_init is not None:
+            cls.__post_init__ = post_init
+        cls = dataclass(cls, frozen=frozen, slots=True)
+        if frozen:
+            cls.__init__ = _compile_frozen_init(cls)
+            cls.__hash__ = LogicObject._cached_hash
+
+        # Precompute the bit layout and codec once per class, so packing
+        # and unpacking does not need to inspect the dataclass fields.
+        cls._layout = tuple(_build_layout(cls))
+        cls._size = sum(entry.width for entry in cls._layout)
+        cls._range = Range(max(cls._size - 1, 0), "downto", 0)
+        cls._values = attrgetter(*cls.__dataclass_fields__.keys(), "__class__")
+        if cls._layout:
+            cls._pack_int, cls._unpack_int = _compile_codec(cls)
+            cls._view_type = _make_view_type(cls)
+        return cls
 
 
 class LogicObject(metaclass=_Meta):
+    """
+    Base class of Python mirrors of packed System Verilog structs.
+
+    Subclasses are slotted dataclasses. Declare them with
+    `class Name(LogicObject, frozen=True)` to make instances immutable and
+    hashable by their packed value, with the hash cached after first use.
+    """
+
+    __slots__ = ("_hash",)
+
     @classmethod
     def from_logicarray(cls, logic_array: LogicArray):
         if isinstance(logic_array, Logic):
-            logic_array = LogicArray(int(logic_array), Range(0, 0))
-        values = {}
-        index = 0
-        for key in reversed(cls.__dataclass_fields__.keys()):
-            size = cls._get_field_size(key)
-            field = cls._get_field(key)
-
-            sliced = logic_array[index + size - 1 : index]
-            sliced.range = Range(size - 1, "downto", 0)
-
-            if isinstance(field, Int):
-                values[key] = sliced.to_signed()
-            elif isinstance(field, UInt):
-                values[key] = sliced.to_unsigned()
-            elif isinstance(field, Fixed):
-                values[key] = to_float(sliced.to_signed(), field.fractional_bits)
-            elif isinstance(field, Bytes):
-                values[key] = sliced.to_bytes(byteorder="big")  # TODO: expose byteorder
-            elif isinstance(field, type) and issubclass(field, LogicObject):
-                values[key] = field.from_logicarray(sliced)
-            else:
-                raise ValueError(f"Invalid value type '{type(field)}'")
-
-            index += size
-        return cls(**values)
+            return cls.from_int(int(logic_array))
+        return cls.from_int(logic_array.to_unsigned())
 
     def to_logicarray(self) -> LogicArray:
-        arrays = []
-        for key in self.__dataclass_fields__.keys():
-            value = getattr(self, key)
-            size = self._get_field_size(key)
-
-            field = self._get_field(key)
-            arr_range = Range(size - 1, "downto", 0)
-
-            if isinstance(field, Int):
-                arr = LogicArray.from_signed(value, arr_range)
-            elif isinstance(field, UInt):
-                arr = LogicArray.from_unsigned(value, arr_range)
-            elif isinstance(field, Bytes):
-                raise NotImplemented
-            elif isinstance(field, Fixed):
-                value = to_fixed(value, field.fractional_bits)
-                arr = LogicArray.from_signed(value, arr_range)
-            elif isinstance(field, type) and issubclass(field, LogicObject):
-                if isinstance(value, LogicObject):
-                    value = value.to_logicarray()
-                    arr = LogicArray(value, arr_range)
-                else:
-                    raise TypeError(
-                        f"value is '{type(value)}', not LogicObject when field type is LogicObject."
-                    )
-            else:
-                raise ValueError(f"Invalid field type '{type(field)}'")
+        return LogicArray.from_unsigned(self.to_int(), self._range)
 
-            arrays.append(arr)
+    @classmethod
+    def view(cls, value: "int | LogicArray | Logic") -> LogicView:
+        """
+        Lazily decoding view of a packed value. Use this when only a few
+        fields are needed; call `materialize()` to get a normal object.
+        """
+        if len(cls._layout) == 0:
+            raise ValueError("Cannot view empty LogicObject")
+        if isinstance(value, Logic):
+            value = int(value)
+        elif isinstance(value, LogicArray):
+            value = value.to_unsigned()
+        return cls._view_type(value)
 
-        if len(arrays) == 0:
+    @classmethod
+    def from_int(cls, value: int):
+        """Unpack a LogicObject from its packed integer representation."""
+        if len(cls._layout) == 0:
+            raise ValueError("Cannot unpack empty LogicObject")
+        return cls._unpack_int(value)
+
+    def to_int(self) -> int:
+        """Pack the LogicObject into a single unsigned integer."""
+        if len(self._layout) == 0:
             raise ValueError("Cannot pack empty logicarray")
+        try:
+            return self._pack_int()
+        except AttributeError as e:
+            raise TypeError(
+                f"Field value of '{type(self).__name__}' is not a LogicObject: {e!s}"
+            ) from e
+
+    @classmethod
+    def layout(cls) -> tuple[LayoutEntry, ...]:
+        """Flattened leaf fields of the LogicObject, least significant first"""
+        return cls._layout
+
+    @classmethod
+    def word_count(cls) -> int:
+        """Number of 64-bit words needed to hold the packed LogicObject"""
+        return max((cls._size + 63) // 64, 1)
+
+    @classmethod
+    def dtype(cls, raw: bool = False) -> np.dtype:
+        """
+        NumPy structured dtype with one column per leaf field, named by the
+        dotted path of the field (e.g. `v0.position.x`). Fixed fields are
+        float64, or their raw two's complement value as int64 if `raw`.
+        """
+        columns = []
+        for entry in reversed(cls._layout):
+            if entry.kind is Bytes or entry.width > (64 if entry.kind is UInt else 63):
+                raise TypeError(
+                    f"Field '{'.'.join(entry.path)}' of '{cls.__name__}' cannot be represented in a NumPy column"
+                )
+            if entry.kind is UInt:
+                column_type = np.uint64
+            elif entry.kind is Fixed and not raw:
+                column_type = np.float64
+            else:
+                column_type = np.int64
+            columns.append((".".join(entry.path), column_type))
+        return np.dtype(columns)
+
+    @classmethod
+    def to_records(cls, objects: "Sequence[LogicObject]", raw: bool = False):
+        """Convert a list of LogicObjects into a NumPy structured array."""
+        names = [".".join(entry.path) for entry in reversed(cls._layout)]
+        getter = attrgetter(*names)
+        if len(names) == 1:
+            rows = [(getter(obj),) for obj in objects]
+        else:
+            rows = [getter(obj) for obj in objects]
+        records = np.array(rows, dtype=cls.dtype())
+        if not raw:
+            return records
+
+        raw_records = np.empty(len(records), dtype=cls.dtype(raw=True))
+        for entry in cls._layout:
+            name = ".".join(entry.path)
+            if entry.kind is Fixed:
+                scale = 1 << entry.fractional_bits
+                raw_records[name] = np_round_away(records[name] * scale)
+            else:
+                raw_records[name] = records[name]
+        return raw_records
 
-        return concat(*arrays)
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> list:
+        """Convert a NumPy structured array into a list of LogicObjects."""
+        data = cls.pack_many(records).astype("<u8").tobytes()
+        step = 8 * cls.word_count()
+        return [
+            cls._unpack_int(int.from_bytes(data[i : i + step], "little"))
+            for i in range(0, len(data), step)
+        ]
+
+    @classmethod
+    def pack_many(cls, items: "Sequence[LogicObject] | np.ndarray") -> np.ndarray:
+        """
+        Pack LogicObjects, given as a list or a structured array, into an
+        array of shape (N, word_count()) of uint64. Word 0 holds the least
+        significant 64 bits of each packed value.
+
+        Fixed columns holding floats are rounded to fixed point, while
+        integer columns are taken as raw fixed point values.
+        """
+        if not isinstance(items, np.ndarray):
+            items = cls.to_records(items)
+
+        # Work on one contiguous row per word, as strided column access is slow
+        words = np.zeros((cls.word_count(), len(items)), dtype=np.uint64)
+        for entry in cls._layout:
+            name = ".".join(entry.path)
+            column = np.ascontiguousarray(items[name])
+            if entry.kind is Fixed and column.dtype.kind == "f":
+                column = np_round_away(column * (1 << entry.fractional_bits))
+
+            # Checked before casting, as unsigned values of 64 bits do not
+            # fit in an int64 and negative values do not fit in a uint64
+            if entry.kind is UInt:
+                low, high = 0, (1 << entry.width) - 1
+            else:
+                low, high = -(1 << (entry.width - 1)), (1 << (entry.width - 1)) - 1
+            if len(column) > 0 and (column.min() < low or column.max() > high):
+                raise ValueError(
+                    f"Values of field '{name}' will not fit in {entry.width} bits"
+                )
+            values = column.astype(np.uint64 if entry.kind is UInt else np.int64)
+
+            bits = values.astype(np.uint64) & np.uint64((1 << entry.width) - 1)
+            word, shift = divmod(entry.offset, 64)
+            words[word] |= bits << np.uint64(shift)
+            if shift + entry.width > 64:
+                words[word + 1] |= bits >> np.uint64(64 - shift)
+        return np.ascontiguousarray(words.T)
+
+    @classmethod
+    def unpack_many(cls, words: np.ndarray, raw: bool = False) -> np.ndarray:
+        """
+        Unpack an array of shape (N, word_count()) of uint64, as produced
+        by `pack_many`, into a NumPy structured array.
+        """
+        words = np.asarray(words, dtype=np.uint64).reshape(-1, cls.word_count())
+        words = np.ascontiguousarray(words.T)
+
+        records = np.empty(words.shape[1], dtype=cls.dtype(raw))
+        for entry in cls._layout:
+            word, shift = divmod(entry.offset, 64)
+            bits = words[word] >> np.uint64(shift)
+            if shift + entry.width > 64:
+                bits |= words[word + 1] << np.uint64(64 - shift)
+            bits &= np.uint64((1 << entry.width) - 1)
+
+            if entry.kind is UInt:
+                values = bits
+            else:
+                # Sign extend from the field width
+                sign = np.int64(1 << (entry.width - 1))
+                values = (bits.astype(np.int64) ^ sign) - sign
+                if entry.kind is Fixed and not raw:
+                    values = values / (1 << entry.fractional_bits)
+
+            records[".".join(entry.path)] = values
+        return records
 
     @classmethod
     def _get_field_size(cls, field_name: str) -> int:
@@ -185,26 +636,17 @@ class LogicObject(metaclass=_Meta):
     @classmethod
     def size(cls) -> int:
         """Total size of the LogicObject in bits"""
-        total_size = 0
-        for field_name in cls.__dataclass_fields__.keys():
-            field_size = cls._get_field_size(field_name)
-            total_size += field_size
-
-        return total_size
-
-    def __post_init__(self):
-        for field in fields(self):
-            value = getattr(self, field.name)
-            logic_type = field.metadata.get("type")
-
-            # Quantize float to fixed point representation.
-            if isinstance(logic_type, Fixed):
-                if not isinstance(value, (int, float)):
-                    raise TypeError(
-                        f"Field '{field.name}' must be of type 'int' or 'float', got '{type(value)}'"
-                    )
-
-                setattr(self, field.name, quantize(value))
+        return cls._size
+
+    def _cached_hash(self) -> int:
+        # Hashed by the packed value, as nested LogicObject fields need not
+        # be frozen themselves. Equal objects always pack to the same value.
+        try:
+            return self._hash
+        except AttributeError:
+            value = hash((self.__class__, self.to_int() if self._layout else 0))
+            object.__setattr__(self, "_hash", value)
+            return value
 
 
 class LogicField(Field):
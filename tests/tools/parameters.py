@@ -0,0 +1,23 @@
+"""
+Parameters of the toplevel the running test was built with.
+
+Test modules with several sets of `VERILOG_PARAMETERS`, or a
+`VERILOG_PARAMETER_MATRIX`, run every test once per set. The test runner
+passes the set of the current build in TEST_VERILOG_PARAMETERS.
+"""
+
+import json
+import os
+
+
+def verilog_parameters(default: dict | None = None) -> dict:
+    """
+    Parameters of the current build, or `default` when the test is not run
+    by the test runner in testtools.
+    """
+    value = os.environ.get("TEST_VERILOG_PARAMETERS")
+    if value is None:
+        if default is None:
+            raise RuntimeError("TEST_VERILOG_PARAMETERS is not set")
+        return dict(default)
+    return json.loads(value)
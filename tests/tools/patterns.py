@@ -0,0 +1,166 @@
+"""
+Seeded cycle patterns for valid insertion and ready deassertion in BFMs.
+
+A pattern decides, cycle by cycle, whether a `Producer` may present a new
+transaction or whether a `Consumer` is ready. Schedules are computed with
+NumPy in blocks of `BLOCK_CYCLES`, so iterating over them costs no more
+than a list lookup per cycle. The same seed always gives the same schedule.
+"""
+
+import abc
+from typing import Iterator, Sequence
+
+import numpy as np
+
+BLOCK_CYCLES = 4096
+
+
+class Pattern(abc.ABC):
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    @property
+    @abc.abstractmethod
+    def rate(self) -> float:
+        """Expected fraction of active cycles"""
+
+    @abc.abstractmethod
+    def _generate(self, rng: np.random.Generator, start: int, n: int) -> np.ndarray:
+        """
+        Compute the schedule from cycle `start`. Must return at least `n`
+        cycles, and may return more if that keeps the pattern continuous.
+        """
+
+    def schedule(self, cycles: int) -> np.ndarray:
+        """The first `cycles` cycles of the pattern, as a boolean array."""
+        rng = np.random.default_rng(self.seed)
+        blocks = []
+        start = 0
+        while start < cycles:
+            block = self._generate(rng, start, BLOCK_CYCLES)
+            blocks.append(block)
+            start += len(block)
+        return np.concatenate(blocks)[:cycles].astype(bool)
+
+    def cycles(self) -> Iterator[bool]:
+        """Endless iterator over the pattern, one value per cycle."""
+        rng = np.random.default_rng(self.seed)
+        start = 0
+        while True:
+            block = self._generate(rng, start, BLOCK_CYCLES)
+            start += len(block)
+            yield from block.astype(bool).tolist()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.rate:.2f})"
+
+
+class Constant(Pattern):
+    """Active a fixed fraction of the cycles, spread out as evenly as possible."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        if not 0.0 < rate <= 1.0:
+            raise ValueError(f"{rate} is not a valid rate. Must be in (0, 1].")
+        self._rate = rate
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _generate(self, rng, start, n):
+        index = np.arange(start, start + n + 1)
+        return np.diff(np.ceil(index * self._rate)) > 0
+
+
+class Bernoulli(Pattern):
+    """Active with probability `p` every cycle, independently."""
+
+    def __init__(self, p: float, seed: int = 0):
+        super().__init__(seed)
+        if not 0.0 < p <= 1.0:
+            raise ValueError(f"{p} is not a valid probability. Must be in (0, 1].")
+        self._p = p
+
+    @property
+    def rate(self) -> float:
+        return self._p
+
+    def _generate(self, rng, start, n):
+        return rng.random(n) < self._p
+
+
+class Bursty(Pattern):
+    """
+    Alternating bursts of active and inactive cycles, with geometrically
+    distributed lengths of mean `mean_on` and `mean_off` cycles.
+    """
+
+    def __init__(self, mean_on: float, mean_off: float, seed: int = 0):
+        super().__init__(seed)
+        if mean_on < 1 or mean_off < 1:
+            raise ValueError("Mean burst lengths must be at least one cycle")
+        self._mean_on = mean_on
+        self._mean_off = mean_off
+
+    @property
+    def rate(self) -> float:
+        return self._mean_on / (self._mean_on + self._mean_off)
+
+    def _generate(self, rng, start, n):
+        # Enough bursts to cover n cycles on average, plus some margin.
+        # Every block starts with a burst of active cycles.
+        pairs = int(n / (self._mean_on + self._mean_off)) + 8
+        lengths = np.empty(2 * pairs, dtype=np.int64)
+        lengths[0::2] = rng.geometric(1 / self._mean_on, pairs)
+        lengths[1::2] = rng.geometric(1 / self._mean_off, pairs)
+        values = np.zeros(2 * pairs, dtype=bool)
+        values[0::2] = True
+        return np.repeat(values, lengths)
+
+
+class Periodic(Pattern):
+    """Active for the first `active` cycles of every `period` cycles."""
+
+    def __init__(self, period: int, active: int = 1):
+        super().__init__()
+        if not 0 < active <= period:
+            raise ValueError(f"Cannot be active {active} of {period} cycles")
+        self._period = period
+        self._active = active
+
+    @property
+    def rate(self) -> float:
+        return self._active / self._period
+
+    def _generate(self, rng, start, n):
+        return np.arange(start, start + n) % self._period < self._active
+
+
+class TraceDriven(Pattern):
+    """
+    Repeat a recorded sequence of active cycles, for example the cycle
+    stamps of a `Trace` or the ready signal of a VGA sink.
+    """
+
+    def __init__(self, schedule: Sequence[bool] | np.ndarray):
+        super().__init__()
+        self._schedule = np.asarray(schedule, dtype=bool)
+        if len(self._schedule) == 0 or not self._schedule.any():
+            raise ValueError("A trace-driven pattern needs at least one active cycle")
+
+    @classmethod
+    def from_cycles(cls, cycles: Sequence[int] | np.ndarray) -> "TraceDriven":
+        """Pattern active on the given cycle stamps, relative to the first one."""
+        cycles = np.asarray(cycles, dtype=np.int64)
+        schedule = np.zeros(cycles[-1] - cycles[0] + 1, dtype=bool)
+        schedule[cycles - cycles[0]] = True
+        return cls(schedule)
+
+    @property
+    def rate(self) -> float:
+        return float(self._schedule.mean())
+
+    def _generate(self, rng, start, n):
+        index = np.arange(start, start + n) % len(self._schedule)
+        return self._schedule[index]
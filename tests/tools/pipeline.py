@@ -1,13 +1,32 @@
 import abc
-from typing import Protocol, Type, TypeVar, Generic, Literal, Sequence
+import collections
+import csv
+import json
+from dataclasses import dataclass
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Hashable,
+    Iterable,
+    Protocol,
+    Type,
+    TypeVar,
+    Generic,
+    Literal,
+    Sequence,
+)
 
 import cocotb
 import cocotb.handle
-from cocotb.triggers import RisingEdge, ClockCycles
+import cocotb.utils
+from cocotb.triggers import RisingEdge, ClockCycles, First, ReadOnly
 from cocotb.queue import Queue
 from cocotb.handle import Force
 
 from tools.logic_object import LogicObject
+from tools.patterns import Pattern
+from tools.scoreboard import Scoreboard
 
 
 class PipelineDut(Protocol):
@@ -18,12 +37,32 @@ _Data = TypeVar("_Data", bound=LogicObject)
 _Metadata = TypeVar("_Metadata", bound=LogicObject)
 
 
+def _to_value(item):
+    return item.to_logicarray() if isinstance(item, LogicObject) else item
+
+
 class PipelineBase(abc.ABC):
     def __init__(self, dut: PipelineDut, name: str, type: str, clock_name: str = "clk"):
         self._dut = dut
         self._name = name
         self._type = type
         self._clock_name = clock_name
+        self._task: cocotb.task.Task | None = None
+
+        # Resolve the handles once, they are accessed several times per cycle
+        self._valid = self._get_signal("valid")
+        self._ready = self._get_signal("ready")
+        self._data = self._get_signal("data")
+        self._metadata_signal = (
+            self._get_signal("metadata")
+            if hasattr(dut, f"{name}_{type}_metadata")
+            else None
+        )
+        self._clk = getattr(dut, clock_name)
+
+        # Ports of the toplevel can be assigned directly, but signals inside
+        # the hierarchy must be forced to override their drivers
+        self._force = dut is not cocotb.top
 
     def _get_signal(self, name: str) -> cocotb.handle.ValueObjectBase:
         signal_name = f"{self._name}_{self._type}_{name}"
@@ -36,34 +75,44 @@ class PipelineBase(abc.ABC):
             )
         return signal
 
-    @property
-    def _valid(self):
-        return self._get_signal("valid")
-
-    @property
-    def _ready(self):
-        return self._get_signal("ready")
-
-    @property
-    def _data(self):
-        return self._get_signal("data")
-
     @property
     def _metadata(self):
-        return self._get_signal("metadata")
+        if self._metadata_signal is None:
+            return self._get_signal("metadata")
+        return self._metadata_signal
 
-    @property
-    def _clk(self):
-        return getattr(self._dut, self._clock_name)
+    def _drive(self, signal: cocotb.handle.ValueObjectBase, value):
+        signal.value = Force(value) if self._force else value
 
     async def run(self):
         """Run the pipeline handler"""
-        cocotb.start_soon(self._run_loop())
+        self._task = cocotb.start_soon(self._run_loop())
+
+    def stop(self):
+        """Stop the pipeline handler, leaving the signals as they are"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
 
     @abc.abstractmethod
     async def _run_loop(self): ...
 
 
+@dataclass
+class StreamStats:
+    """Statistics of a streamed sequence of transactions."""
+
+    transactions: int = 0
+    cycles: int = 0
+    # Cycles where valid was asserted, but the DUT was not ready
+    stall_cycles: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Accepted transactions per cycle"""
+        return self.transactions / self.cycles if self.cycles > 0 else 0.0
+
+
 class Producer(PipelineBase, Generic[_Data, _Metadata]):
     def __init__(
         self,
@@ -71,9 +120,16 @@ class Producer(PipelineBase, Generic[_Data, _Metadata]):
         name: str,
         clock_name: str = "clk",
         processing_time: int = 1,
+        pattern: Pattern | None = None,
     ):
+        """
+        If `pattern` is given, it decides in which cycles a new transaction
+        may be presented, instead of `processing_time`.
+        """
         super().__init__(dut, name, "s", clock_name=clock_name)
         self._input_queue: Queue[tuple[_Data, _Metadata | None]] = Queue()
+        self.stats: StreamStats | None = None
+        self._pattern = pattern
 
         if processing_time < 1:
             raise ValueError(
@@ -89,40 +145,164 @@ class Producer(PipelineBase, Generic[_Data, _Metadata]):
         for item, item_meta in zip(data, metadata, strict=True):
             await self.produce(item, item_meta)
 
+    async def stream(
+        self,
+        items: Iterable | AsyncIterable,
+    ) -> StreamStats:
+        """
+        Drive all `items` into the DUT as fast as it accepts them.
+
+        Items are either data, or (data, metadata) pairs. Data and metadata
+        are LogicObjects, or raw values like integers. `valid` is kept
+        asserted back-to-back, and the next item is driven right after
+        the clock edge where `valid && ready` was sampled at ReadOnly, so
+        a DUT that is always ready receives one transaction per cycle.
+        `processing_time` is ignored, and this should not be combined
+        with `run()`. A `pattern` still delays new transactions.
+
+        Returns the number of transactions and cycles it took, including
+        the cycles spent waiting for the next item of an async source.
+        """
+        if isinstance(items, AsyncIterable):
+            iterator = aiter(items)
+            is_async = True
+        else:
+            iterator = iter(items)
+            is_async = False
+        schedule = self._pattern.cycles() if self._pattern is not None else None
+
+        stats = StreamStats()
+        while True:
+            try:
+                if is_async:
+                    item = await self._next_item(iterator, stats)  # type: ignore
+                else:
+                    item = next(iterator)  # type: ignore
+            except (StopIteration, StopAsyncIteration):
+                break
+
+            if schedule is not None:
+                # Wait for a cycle where the pattern allows a new item
+                while not next(schedule):
+                    self._drive(self._valid, 0)
+                    await RisingEdge(self._clk)
+                    stats.cycles += 1
+
+            data, metadata = item if isinstance(item, tuple) else (item, None)
+            if metadata is not None:
+                self._drive(self._metadata, _to_value(metadata))
+            self._drive(self._data, _to_value(data))
+            self._drive(self._valid, 1)
+
+            # Hold the item until it is accepted on a clock edge
+            while True:
+                await ReadOnly()
+                accepted = bool(self._ready.value)
+                await RisingEdge(self._clk)
+                stats.cycles += 1
+                if accepted:
+                    stats.transactions += 1
+                    break
+                stats.stall_cycles += 1
+                if schedule is not None:
+                    next(schedule)
+
+            if is_async:
+                # The next item may take a while, do not present stale data
+                self._drive(self._valid, 0)
+
+        self._drive(self._valid, 0)
+        self.stats = stats
+        cocotb.log.info(
+            f"Producer `{self._name}` streamed {stats.transactions} transactions"
+            f" in {stats.cycles} cycles ({stats.throughput:.3f} per cycle)"
+        )
+        return stats
+
+    async def _next_item(self, iterator: AsyncIterator, stats: StreamStats):
+        """
+        Get the next item of an async source, counting the clock edges
+        while waiting for it as cycles of the stream.
+        """
+
+        async def next_item():
+            return await anext(iterator)
+
+        task = cocotb.start_soon(next_item())
+        while not task.done():
+            if await First(task.complete, RisingEdge(self._clk)) is not task.complete:
+                stats.cycles += 1
+        return task.result()
+
     async def _run_loop(self):
         """
         Coroutine that will constantly push items from the production
         queue into the DUT.
         """
+        if self._pattern is not None:
+            return await self._run_pattern_loop(self._pattern)
+
+        clk = self._clk
+        valid = self._valid
+        ready = self._ready
         while True:
-            # Get the next item to produce
+            # Get the next item to produce, waiting without polling the clock
             data, metadata = await self._input_queue.get()
 
             # If metadata is enabled, we want to set the metadata signal
             if metadata is not None:
-                self._metadata.value = Force(metadata.to_logicarray())
+                self._drive(self._metadata, metadata.to_logicarray())
 
             # Set the data, and mark the data as valid
-            self._data.value = Force(data.to_logicarray())
-            self._valid.value = Force(1)
-
-            # Make sure the data actually makes it to the DUT
-            await RisingEdge(self._clk)
-
-            # Wait for item to be consumed
-            while not self._ready.value:
-                await RisingEdge(self._clk)
+            self._drive(self._data, data.to_logicarray())
+            self._drive(valid, 1)
+
+            # Hold the item until ready is sampled on a clock edge. While
+            # the DUT is stalled, wait for ready to change instead of
+            # checking every cycle.
+            await ReadOnly()
+            while ready.value != 1:
+                await ready.value_change
+                await ReadOnly()
+            await RisingEdge(clk)
 
             # Wait fake "processing_time" to produce next item
             # (simulate pipeline bubble)
             if self._processing_time > 1:
-                self._valid.value = Force(0)
-                await ClockCycles(self._clk, self._processing_time - 1)
+                self._drive(valid, 0)
+                await ClockCycles(clk, self._processing_time - 1)
 
             # Set data as invalid if we do not have more items
             if self._input_queue.empty():
-                self._valid.value = Force(0)
-                await RisingEdge(self._clk)
+                self._drive(valid, 0)
+
+    async def _run_pattern_loop(self, pattern: Pattern):
+        clk = self._clk
+        valid = self._valid
+        ready = self._ready
+        schedule = pattern.cycles()
+        while True:
+            if self._input_queue.empty():
+                self._drive(valid, 0)
+            data, metadata = await self._input_queue.get()
+
+            while not next(schedule):
+                self._drive(valid, 0)
+                await RisingEdge(clk)
+
+            if metadata is not None:
+                self._drive(self._metadata, metadata.to_logicarray())
+            self._drive(self._data, data.to_logicarray())
+            self._drive(valid, 1)
+
+            # Valid may not be deasserted before the item is accepted
+            while True:
+                await ReadOnly()
+                accepted = ready.value == 1
+                await RisingEdge(clk)
+                if accepted:
+                    break
+                next(schedule)
 
 
 class Consumer(PipelineBase, Generic[_Data, _Metadata]):
@@ -134,7 +314,12 @@ class Consumer(PipelineBase, Generic[_Data, _Metadata]):
         metadata_type: Type[_Metadata] | None = None,
         clock_name: str = "clk",
         processing_time: int = 1,
+        pattern: Pattern | None = None,
     ):
+        """
+        If `pattern` is given, it decides in which cycles ready is asserted,
+        instead of `processing_time`.
+        """
         super().__init__(dut, name, "m", clock_name=clock_name)
 
         # Store the output type so we can use them to convert LogicArray
@@ -149,6 +334,7 @@ class Consumer(PipelineBase, Generic[_Data, _Metadata]):
                 f"{processing_time} is not a valid processing time. Must be 1 or higher."
             )
         self._processing_time = processing_time
+        self._pattern = pattern
 
     async def consume(self) -> tuple[_Data, _Metadata | None]:
         """Retrieve a transaction from the DUT."""
@@ -160,39 +346,267 @@ class Consumer(PipelineBase, Generic[_Data, _Metadata]):
             items.append(await self._output_queue.get())
         return items
 
+    def _read(self) -> tuple[_Data, _Metadata | None]:
+        data = self._data_type.from_logicarray(self._data.value)
+        metadata = (
+            self._metadata_type.from_logicarray(self._metadata.value)
+            if self._metadata_type is not None
+            else None
+        )
+        return data, metadata
+
     async def _run_loop(self):
+        if self._pattern is not None:
+            return await self._run_pattern_loop(self._pattern)
+
+        clk = self._clk
+        valid = self._valid
+        ready = self._ready
         while True:
             # Sleep for processing_time clock cycles
-            self._ready.value = 0
             if self._processing_time > 1:
-                await ClockCycles(self._clk, self._processing_time - 1)
-            self._ready.value = 1
-            await ClockCycles(self._clk, 1)
-
-            # Wait for data to become valid
-            while not self._valid.value:
-                await ClockCycles(self._clk, 1)
-
-            # Read the output data
-            data = self._data_type.from_logicarray(self._data.value)
-            metadata = (
-                self._metadata_type.from_logicarray(self._metadata.value)
-                if self._metadata_type is not None
-                else None
-            )
+                ready.value = 0
+                await ClockCycles(clk, self._processing_time - 1)
+            ready.value = 1
+
+            # Wait for data to become valid. When idle, wait for valid to
+            # change instead of checking every cycle.
+            await ReadOnly()
+            while valid.value != 1:
+                await valid.value_change
+                await ReadOnly()
+
+            # Read the output data before the clock edge accepting it
+            item = self._read()
+            await RisingEdge(clk)
 
             # Store it for consumption by the end user
-            await self._output_queue.put((data, metadata))
+            self._output_queue.put_nowait(item)
+
+    async def _run_pattern_loop(self, pattern: Pattern):
+        clk = self._clk
+        valid = self._valid
+        for ready in pattern.cycles():
+            self._ready.value = ready
+            await ReadOnly()
+            if ready and valid.value == 1:
+                self._output_queue.put_nowait(self._read())
+            await RisingEdge(clk)
+
+
+@dataclass
+class MonitorStats:
+    """Handshake statistics of a valid/ready interface."""
+
+    name: str
+    cycles: int = 0
+    beats: int = 0
+    stall_cycles: int = 0
+    starvation_cycles: int = 0
+
+    @property
+    def beats_per_cycle(self) -> float:
+        return self.beats / self.cycles if self.cycles > 0 else 0.0
+
+    @property
+    def idle_cycles(self) -> int:
+        """Cycles where neither valid nor ready was asserted"""
+        return self.cycles - self.beats - self.stall_cycles - self.starvation_cycles
+
+    def summary(self) -> dict[str, str | int | float]:
+        return {
+            "name": self.name,
+            "cycles": self.cycles,
+            "beats": self.beats,
+            "beats_per_cycle": self.beats_per_cycle,
+            "stall_cycles": self.stall_cycles,
+            "starvation_cycles": self.starvation_cycles,
+            "idle_cycles": self.idle_cycles,
+        }
+
+
+@dataclass
+class Handshake:
+    cycle: int
+    time: int
+    tag: Hashable = None
+
+
+class Monitor(PipelineBase, Generic[_Data]):
+    """
+    Passive monitor of a `<name>_{s,m}_{valid,ready,data}` interface.
+
+    Samples valid and ready at ReadOnly every cycle, and counts accepted
+    beats, stall cycles (valid && !ready) and starvation cycles
+    (ready && !valid). If `tag` is given, it is called with a lazy view
+    of every accepted data beat, and the result is recorded so latency
+    between two monitors can be computed with `latency_histogram`.
+    """
+
+    def __init__(
+        self,
+        dut: PipelineDut,
+        name: str,
+        type: Literal["s", "m"],
+        data_type: Type[_Data] | None = None,
+        tag: Callable[[_Data], Hashable] | None = None,
+        clock_name: str = "clk",
+    ):
+        super().__init__(dut, name, type, clock_name=clock_name)
+        if tag is not None and data_type is None:
+            raise ValueError("A data type is required to tag transactions")
+        self._data_type = data_type
+        self._tag = tag
+
+        self.stats = MonitorStats(f"{name}_{type}")
+        self.handshakes: list[Handshake] = []
+        self.period: int | None = None
+
+    async def _run_loop(self):
+        valid = self._valid
+        ready = self._ready
+        data = self._data
+        clk = self._clk
+        stats = self.stats
+
+        previous_time = None
+        while True:
+            await RisingEdge(clk)
+            await ReadOnly()
+            time = cocotb.utils.get_sim_time("step")
+            if self.period is None and previous_time is not None:
+                self.period = time - previous_time
+            previous_time = time
+            stats.cycles += 1
+
+            is_valid = bool(valid.value)
+            is_ready = bool(ready.value)
+            if is_valid and is_ready:
+                stats.beats += 1
+                tag = None
+                if self._tag is not None:
+                    tag = self._tag(self._data_type.view(data.value))  # type: ignore
+                self.handshakes.append(Handshake(stats.cycles, time, tag))
+            elif is_valid:
+                stats.stall_cycles += 1
+            elif is_ready:
+                stats.starvation_cycles += 1
+
+
+def latency_histogram(source: Monitor, sink: Monitor) -> dict[int, int]:
+    """
+    Histogram of latencies in cycles from `source` to `sink`, matching
+    handshakes in order of arrival by their tag.
+    """
+    if source.period is None and sink.period is None:
+        return {}
+    period = source.period or sink.period
+
+    pending: dict[Hashable, collections.deque[int]] = collections.defaultdict(
+        collections.deque
+    )
+    for handshake in source.handshakes:
+        pending[handshake.tag].append(handshake.time)
+
+    histogram: collections.Counter[int] = collections.Counter()
+    for handshake in sink.handshakes:
+        if pending[handshake.tag]:
+            start = pending[handshake.tag].popleft()
+            histogram[round((handshake.time - start) / period)] += 1  # type: ignore
+    return dict(sorted(histogram.items()))
+
+
+def write_monitor_summary(
+    path: str,
+    monitors: Sequence[Monitor],
+    latencies: dict[str, dict[int, int]] | None = None,
+):
+    """
+    Write the statistics of `monitors` to `path` as JSON or CSV, based on
+    the file extension. Latency histograms are only included in JSON.
+    """
+    rows = [monitor.stats.summary() for monitor in monitors]
+
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+
+    summary = {"interfaces": rows, "latency": latencies or {}}
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+@dataclass
+class _InputStream:
+    name: str
+    data: Sequence[LogicObject]
+    metadata: Sequence[LogicObject | None]
+    processing_time: int
+
+
+@dataclass
+class _OutputStream:
+    name: str
+    data: Sequence[LogicObject]
+    metadata: Sequence[LogicObject | None]
+    data_type: Type[LogicObject]
+    metadata_type: Type[LogicObject] | None
+    processing_time: int
+    key: Callable[[LogicObject, LogicObject | None], Hashable] | None
+    tolerances: dict[str, float] | None
+    until_last: bool
+
+
+@dataclass
+class SweepPoint:
+    """Throughput of a test run with a ready pattern on all outputs."""
+
+    pattern: str
+    backpressure: float
+    cycles: int
+    transactions: int
+
+    @property
+    def throughput(self) -> float:
+        """Output transactions per cycle"""
+        return self.transactions / self.cycles if self.cycles > 0 else 0.0
+
+
+def write_sweep(path: str, points: Sequence[SweepPoint]):
+    """Write a throughput-vs-backpressure curve as CSV."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["pattern", "backpressure", "cycles", "transactions", "throughput"]
+        )
+        for point in points:
+            writer.writerow(
+                [
+                    point.pattern,
+                    f"{point.backpressure:.4f}",
+                    point.cycles,
+                    point.transactions,
+                    f"{point.throughput:.4f}",
+                ]
+            )
 
 
 class PipelineTester:
     def __init__(self, dut: PipelineDut, clock_name: str = "clk"):
+        self._inputs: list[_InputStream] = []
+        self._outputs: list[_OutputStream] = []
         self._producers: list[Producer] = []
-        self._consumers: list[
-            tuple[Consumer, Sequence[LogicObject], Sequence[LogicObject | None]]
-        ] = []
+        self._consumers: list[tuple[Consumer, Scoreboard, int]] = []
         self._clock_name = clock_name
         self._dut = dut
+        self.cycles: int | None = None
+
+        # Patterns of all producers and consumers, set while sweeping
+        self._valid_pattern: Pattern | None = None
+        self._ready_pattern: Pattern | None = None
 
     async def add_input_stream(
         self,
@@ -201,17 +615,11 @@ class PipelineTester:
         metadata: Sequence[LogicObject | None] | None = None,
         processing_time: int = 2,
     ):
-        producer = Producer(
-            dut=self._dut,
-            name=signal_name,
-            clock_name=self._clock_name,
-            processing_time=processing_time,
-        )
         if metadata is None:
             metadata = [None] * len(data)
-        for item, item_meta in zip(data, metadata, strict=True):
-            await producer.produce(item, item_meta)
-        self._producers.append(producer)
+        if len(metadata) != len(data):
+            raise ValueError("data and metadata must have the same length")
+        self._inputs.append(_InputStream(signal_name, data, metadata, processing_time))
 
     async def add_output_stream(
         self,
@@ -219,7 +627,22 @@ class PipelineTester:
         data: Sequence[LogicObject],
         metadata: Sequence[LogicObject] | Sequence[None] | None = None,
         processing_time: int = 3,
+        key: Callable[[LogicObject, LogicObject | None], Hashable] | None = None,
+        tolerances: dict[str, float] | None = None,
+        until_last: bool = False,
     ):
+        """
+        Expect `data` and `metadata` on an output stream. With `key`, the
+        outputs may arrive in any order with respect to different keys.
+        `tolerances` maps field path patterns to Fixed tolerances in LSBs,
+        see `Scoreboard`.
+
+        With `until_last`, the stream is complete once it receives a
+        transaction whose metadata has `last == 1`, and fails if any
+        expected transaction is missing at that point.
+        """
+        if until_last and (metadata is None or metadata[0] is None):
+            raise ValueError("until_last needs metadata with a `last` field")
         if len(data) == 0:
             raise ValueError("stream must have at least one output")
         output_type = type(data[0])
@@ -231,61 +654,183 @@ class PipelineTester:
             else:
                 output_metadata_type = type(metadata[0])
 
-        consumer = Consumer(
-            self._dut,
-            name=signal_name,
-            data_type=output_type,
-            metadata_type=output_metadata_type,
-            clock_name=self._clock_name,
-            processing_time=processing_time,
-        )
         if metadata is None:
             metadata = [None] * len(data)
-        self._consumers.append((consumer, data, metadata))
+        self._outputs.append(
+            _OutputStream(
+                signal_name,
+                data,
+                metadata,
+                output_type,
+                output_metadata_type,
+                processing_time,
+                key,
+                tolerances,
+                until_last,
+            )
+        )
 
     async def _init_streams(self):
+        # Stop the BFMs of a previous run, they drive the same signals
+        for producer in self._producers:
+            producer.stop()
+        for consumer, _, _ in self._consumers:
+            consumer.stop()
+
+        self._producers = []
+        for stream in self._inputs:
+            producer = Producer(
+                dut=self._dut,
+                name=stream.name,
+                clock_name=self._clock_name,
+                processing_time=stream.processing_time,
+                pattern=self._valid_pattern,
+            )
+            for item, item_meta in zip(stream.data, stream.metadata):
+                await producer.produce(item, item_meta)
+            self._producers.append(producer)
+
+        self._consumers = []
+        for stream in self._outputs:
+            consumer = Consumer(
+                self._dut,
+                name=stream.name,
+                data_type=stream.data_type,
+                metadata_type=stream.metadata_type,
+                clock_name=self._clock_name,
+                processing_time=stream.processing_time,
+                pattern=self._ready_pattern,
+            )
+            scoreboard = Scoreboard(
+                stream.name,
+                zip(stream.data, stream.metadata, strict=True),
+                key=stream.key,
+                tolerances=stream.tolerances,
+            )
+            self._consumers.append((consumer, scoreboard, len(stream.data)))
+
         for producer in self._producers:
             await producer.run()
 
         for consumer, _, _ in self._consumers:
             await consumer.run()
 
-    async def run_test(self, delay: int):
+    async def run_test(
+        self,
+        max_cycles: int = 100_000,
+        quiet_cycles: int = 10,
+        idle_timeout: int | None = 1000,
+    ) -> int:
+        """
+        Run until every output stream has received all of its expected
+        transactions, or its `last` transaction for streams added with
+        `until_last`, then keep running for `quiet_cycles` to catch any
+        unexpected extra output.
+
+        Every transaction is compared as soon as it arrives, so the test
+        fails on the first mismatch. It also fails if no output arrives
+        for `idle_timeout` cycles after the first output, or if the
+        streams are not complete after `max_cycles`. The cycles before
+        the first output, e.g. the latency of a deep pipeline, are only
+        bounded by `max_cycles`.
+
+        Returns the number of cycles the test needed to complete.
+        """
         await self._init_streams()
-        # TODO: better timeout control
-        await ClockCycles(getattr(self._dut, self._clock_name), delay)
-
-        # The test should now be executed, we can consume from all consumers and compare.
-        # list of expected vs actual results
-        results = []
-        for consumer, data, meta in self._consumers:
-            actual = await consumer.consume_all()
-            if len(actual) > 0:
-                actual_data, actual_meta = zip(*actual)
-            else:
-                actual_data = []
-                actual_meta = []
-            results.append((data, meta, actual_data, actual_meta))
-
-        for result in results:
-            self._assert_result(*result)
+        clk = getattr(self._dut, self._clock_name)
+
+        cycles = 0
+        last_activity: int | None = None
+        completed_at: int | None = None
+        # Streams completed by a `last` transaction
+        until_last = [stream.until_last for stream in self._outputs]
+        ended = [False] * len(self._consumers)
+
+        while completed_at is None or cycles - completed_at < quiet_cycles:
+            await RisingEdge(clk)
+            cycles += 1
+
+            for i, (consumer, scoreboard, _) in enumerate(self._consumers):
+                while not consumer._output_queue.empty():
+                    data, metadata = consumer._output_queue.get_nowait()
+                    scoreboard.check(data, metadata)
+                    last_activity = cycles
+                    if until_last[i] and metadata.last == 1:
+                        scoreboard.assert_done()
+                        ended[i] = True
+
+            if completed_at is None:
+                if all(
+                    ended[i] if until_last[i] else scoreboard.done
+                    for i, (_, scoreboard, _) in enumerate(self._consumers)
+                ):
+                    completed_at = cycles
+                elif cycles >= max_cycles:
+                    raise AssertionError(
+                        f"Streams did not complete within {max_cycles} cycles: "
+                        + self._progress()
+                    )
+                elif (
+                    idle_timeout is not None
+                    and last_activity is not None
+                    and cycles - last_activity > idle_timeout
+                ):
+                    raise AssertionError(
+                        f"No output for {idle_timeout} cycles: " + self._progress()
+                    )
+
+        cocotb.log.info(f"Streams completed after {completed_at} cycles")
+        self.cycles = completed_at
+        return completed_at
+
+    def _progress(self) -> str:
+        return ", ".join(
+            f"`{scoreboard.name}` {scoreboard.matched}/{count}"
+            for _, scoreboard, count in self._consumers
+        )
 
-    def _assert_result(
+    async def sweep(
         self,
-        data: list[LogicObject],
-        meta: list[LogicObject | None],
-        actual_data: list[LogicObject],
-        actual_meta: list[LogicObject | None],
-    ):
-        assert len(data) == len(
-            actual_data
-        ), "Actual length did not match expected data length."
-        assert len(meta) == len(
-            actual_data
-        ), "Actual meta length did not matche expected meta length"
-
-        for item0, item1 in zip(data, actual_data):
-            assert item0 == item1, "Output data did not match expected data"
-
-        for item0, item1 in zip(meta, actual_meta):
-            assert item0 == item1, "Output metadata did not match expected metadata"
+        ready_patterns: Sequence[Pattern],
+        valid_pattern: Pattern | None = None,
+        path: str | None = None,
+        **kwargs,
+    ) -> list[SweepPoint]:
+        """
+        Run the test once for every ready pattern, applied to all output
+        streams, and measure the output throughput. All input streams use
+        `valid_pattern`, or their processing time if it is None. The DUT
+        must return to idle after each run, as it is not reset in between.
+
+        Returns the throughput-vs-backpressure curve, which is also written
+        as CSV to `path` if given. Other arguments are passed to `run_test`.
+        """
+        points: list[SweepPoint] = []
+        self._valid_pattern = valid_pattern
+        try:
+            for pattern in ready_patterns:
+                self._ready_pattern = pattern
+                cycles = await self.run_test(**kwargs)
+                transactions = sum(len(stream.data) for stream in self._outputs)
+                points.append(
+                    SweepPoint(repr(pattern), 1 - pattern.rate, cycles, transactions)
+                )
+        finally:
+            self._valid_pattern = None
+            self._ready_pattern = None
+            for producer in self._producers:
+                producer.stop()
+            for consumer, _, _ in self._consumers:
+                consumer.stop()
+
+        cocotb.log.info(
+            "Throughput vs backpressure:\n"
+            + "\n".join(
+                f"{point.pattern:<24} {point.backpressure:>6.1%}"
+                f" {point.throughput:>8.3f} per cycle"
+                for point in points
+            )
+        )
+        if path is not None:
+            write_sweep(path, points)
+        return points
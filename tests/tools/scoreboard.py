@@ -0,0 +1,262 @@
+"""
+Compare transactions from a DUT against expected transactions as they
+arrive, and fail on the first mismatch.
+
+Expected transactions come from an iterable, which is only consumed as
+far as needed, from `expect()`, or from a reference model called with
+the input transactions given to `observe()`. With a `key` function,
+transactions are matched out of order by key, keeping the order of
+transactions with the same key. Keys may be LogicObjects, which are
+matched by their packed value.
+
+Fixed point fields are compared within a tolerance in LSBs of their own
+fixed point format. Tolerances are given per field with glob patterns on
+the dotted field path, e.g. `{"data.*.position.*": 2}`.
+"""
+
+import collections
+import fnmatch
+from operator import attrgetter
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+from tools.logic_object import Fixed, LogicObject, LogicView
+
+if TYPE_CHECKING:
+    # tools.pipeline uses the scoreboard in PipelineTester
+    from tools.pipeline import Consumer
+
+_Data = TypeVar("_Data", bound=LogicObject)
+_Metadata = TypeVar("_Metadata", bound=LogicObject)
+
+# Number of differing fields to show for a mismatch
+MAX_DIFF_LINES = 16
+
+
+def _normalize(item) -> tuple:
+    return item if isinstance(item, tuple) else (item, None)
+
+
+def _hashable(key: Hashable) -> Hashable:
+    """
+    Keys that are LogicObjects or views are matched by their packed value,
+    so they need not be frozen.
+    """
+    if isinstance(key, LogicObject):
+        return (key.__class__, key.to_int())
+    if isinstance(key, LogicView):
+        return (key._object_type, key.to_int())
+    return key
+
+
+class Scoreboard(Generic[_Data, _Metadata]):
+    def __init__(
+        self,
+        name: str,
+        expected: Iterable | None = None,
+        model: Callable[..., object] | None = None,
+        key: Callable[[_Data, _Metadata | None], Hashable] | None = None,
+        tolerances: dict[str, float] | None = None,
+    ):
+        self.name = name
+        self.matched = 0
+        self.received = 0
+        self._expected: Iterator | None = (
+            iter(expected) if expected is not None else None
+        )
+        self._model = model
+        self._key = key
+        self._tolerances = tolerances or {}
+        self._leaf_cache: dict[tuple[type, str], tuple] = {}
+
+        # Expected transactions that have not been received yet, in order,
+        # or grouped by key when matching out of order.
+        self._pending: collections.deque[tuple] = collections.deque()
+        self._pending_by_key: dict[Hashable, collections.deque[tuple]] = (
+            collections.defaultdict(collections.deque)
+        )
+        self._pending_count = 0
+
+    def expect(self, data: _Data, metadata: _Metadata | None = None):
+        """Add an expected transaction."""
+        self._add_pending((data, metadata))
+
+    def observe(self, *args, **kwargs):
+        """
+        Pass an input transaction to the reference model, and expect the
+        transactions it returns. The model may return a single transaction,
+        a list of transactions, or None.
+        """
+        if self._model is None:
+            raise TypeError(f"Scoreboard `{self.name}` has no reference model")
+        result = self._model(*args, **kwargs)
+        if result is None:
+            return
+        if isinstance(result, list):
+            for item in result:
+                self._add_pending(_normalize(item))
+        else:
+            self._add_pending(_normalize(result))
+
+    def _add_pending(self, item: tuple):
+        if self._key is None:
+            self._pending.append(item)
+        else:
+            self._pending_by_key[_hashable(self._key(*item))].append(item)
+        self._pending_count += 1
+
+    def _pull(self) -> bool:
+        """Move the next transaction of the expected iterable to pending."""
+        if self._expected is None:
+            return False
+        try:
+            item = next(self._expected)
+        except StopIteration:
+            self._expected = None
+            return False
+        self._add_pending(_normalize(item))
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Expected transactions not received yet, peeking one ahead."""
+        if self._pending_count == 0:
+            self._pull()
+        return self._pending_count
+
+    @property
+    def done(self) -> bool:
+        return self.pending == 0
+
+    def check(self, data: _Data, metadata: _Metadata | None = None):
+        """Compare a received transaction, raises AssertionError on mismatch."""
+        index = self.received
+        self.received += 1
+
+        if self._key is None:
+            if not self._pending and not self._pull():
+                raise AssertionError(
+                    f"Scoreboard `{self.name}` received unexpected transaction"
+                    f" {index}: {data}, {metadata}"
+                )
+            expected = self._pending.popleft()
+        else:
+            key = self._key(data, metadata)
+            queue = self._pending_by_key[_hashable(key)]
+            while not queue and self._pull():
+                pass
+            if not queue:
+                raise AssertionError(
+                    f"Scoreboard `{self.name}` received transaction {index} with"
+                    f" unexpected key {key!r}: {data}, {metadata}"
+                )
+            expected = queue.popleft()
+        self._pending_count -= 1
+
+        diff = self.diff((data, metadata), expected)
+        if diff:
+            raise AssertionError(
+                f"Transaction {index} of `{self.name}` did not match expected"
+                f" (actual != expected):\n  " + "\n  ".join(diff)
+            )
+        self.matched += 1
+
+    def diff(self, actual: tuple, expected: tuple) -> list[str]:
+        """Differences between the fields of two (data, metadata) pairs."""
+        lines: list[str] = []
+        for path, a, b in zip(("data", "metadata"), actual, expected):
+            self._diff(path, a, b, lines)
+        if len(lines) > MAX_DIFF_LINES:
+            hidden = len(lines) - MAX_DIFF_LINES
+            lines = lines[:MAX_DIFF_LINES] + [f"... and {hidden} more fields"]
+        return lines
+
+    def _diff(self, path: str, actual, expected, lines: list[str]):
+        if not isinstance(actual, LogicObject) or type(actual) is not type(expected):
+            if actual != expected:
+                lines.append(f"{path}: {actual} != {expected}")
+            return
+
+        for getter, name, tolerance in self._leaves(type(actual), path):
+            a, b = getter(actual), getter(expected)
+            if tolerance is not None:
+                equal = abs(a - b) <= tolerance
+            else:
+                equal = a == b
+            if not equal:
+                lines.append(f"{name}: {a} != {b}")
+
+    def _leaves(self, cls: type[LogicObject], path: str) -> tuple:
+        """
+        Getters, names and tolerances of the leaf fields, MSB first.
+        Tolerances are converted from LSBs to values of the field.
+        """
+        cached = self._leaf_cache.get((cls, path))
+        if cached is not None:
+            return cached
+
+        leaves = []
+        for entry in reversed(cls.layout()):
+            name = ".".join((path, *entry.path))
+            tolerance = None
+            if entry.kind is Fixed:
+                for pattern, value in self._tolerances.items():
+                    if fnmatch.fnmatchcase(name, pattern):
+                        # A tolerance of 0 is an exact comparison
+                        if value:
+                            tolerance = value * 2**-entry.fractional_bits
+                        break
+            leaves.append((attrgetter(".".join(entry.path)), name, tolerance))
+
+        self._leaf_cache[(cls, path)] = cached = tuple(leaves)
+        return cached
+
+    def assert_done(self):
+        """Fail if any expected transaction was not received."""
+        if self.pending == 0:
+            return
+        if self._key is None:
+            missing = list(self._pending)[:3]
+        else:
+            missing = [
+                item for queue in self._pending_by_key.values() for item in queue
+            ][:3]
+        more = " (and more from the iterable)" if self._expected is not None else ""
+        raise AssertionError(
+            f"Scoreboard `{self.name}` matched {self.matched} transactions, but"
+            f" {self._pending_count} expected transactions{more} were not"
+            f" received. First missing: {missing}"
+        )
+
+    async def connect(self, consumer: "Consumer[_Data, _Metadata]"):
+        """Check every transaction of `consumer` as it arrives."""
+        cocotb.start_soon(self._run_loop(consumer))
+
+    async def _run_loop(self, consumer: "Consumer[_Data, _Metadata]"):
+        while True:
+            data, metadata = await consumer.consume()
+            # An exception here fails the test right away
+            self.check(data, metadata)
+
+    async def wait(self, clk, max_cycles: int = 100_000) -> int:
+        """
+        Wait until all expected transactions have been received, and
+        return the number of cycles it took.
+        """
+        cycles = 0
+        while not self.done:
+            if cycles >= max_cycles:
+                self.assert_done()
+            await RisingEdge(clk)
+            cycles += 1
+        return cycles
@@ -0,0 +1,243 @@
+"""
+Record the transactions of a valid/ready interface, and replay them later.
+
+A `TraceRecorder` stores every handshake of an interface, for example
+`dut.pipeline_math.rasterizer` `triangle_s`, while a full system test is
+running. The trace is saved as a compressed `.npz` file with the cycle of
+every handshake and the raw data and metadata bits, split into 64-bit
+words with word 0 holding the least significant bits, like
+`LogicObject.pack_many`.
+
+`replay_trace` feeds a trace into the same interface of the isolated
+sub-module test, either with the original spacing between transactions
+or at full rate.
+
+This is a debugging tool, and no test in the regression depends on a
+recorded trace. To debug the rasterizer with the triangles of a full
+pipeline run, record them with `make test RECORD_TRACES=1`, which writes
+`tests/pipeline_output/rasterizer_triangles.npz`. Then replay them from
+a temporary test in `tests/graphics/test_rasterizer.py`, built with the
+viewport size of the pipeline:
+
+    trace = Trace.load("pipeline_output/rasterizer_triangles.npz")
+    producer = Producer(dut, "triangle")
+    await replay_trace(producer, trace, timing="full_rate")
+"""
+
+from dataclasses import dataclass
+from typing import AsyncIterator, Literal, Type
+
+import numpy as np
+import cocotb
+import cocotb.handle
+from cocotb.triggers import RisingEdge, ReadOnly, ClockCycles
+
+from tools.logic_object import LogicObject
+from tools.pipeline import PipelineBase, PipelineDut, Producer, StreamStats
+
+
+def _word_count(width: int) -> int:
+    return max(1, (width + 63) // 64)
+
+
+def _ints_to_words(values: list[int], width: int) -> np.ndarray:
+    words = _word_count(width)
+    buffer = b"".join(value.to_bytes(words * 8, "little") for value in values)
+    return np.frombuffer(buffer, dtype="<u8").reshape(len(values), words).copy()
+
+
+def _words_to_ints(words: np.ndarray) -> list[int]:
+    buffer = np.ascontiguousarray(words, dtype="<u8").tobytes()
+    size = words.shape[1] * 8
+    return [
+        int.from_bytes(buffer[i : i + size], "little")
+        for i in range(0, len(buffer), size)
+    ]
+
+
+def _signal_width(signal: cocotb.handle.ValueObjectBase) -> int:
+    try:
+        return len(signal)  # type: ignore
+    except TypeError:
+        # Single bit signals have no length
+        return 1
+
+
+@dataclass
+class Trace:
+    """Handshakes of an interface, with raw data and metadata bits."""
+
+    cycles: np.ndarray
+    data: np.ndarray
+    data_width: int
+    metadata: np.ndarray | None = None
+    metadata_width: int = 0
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+    @classmethod
+    def from_ints(
+        cls,
+        cycles: list[int],
+        data: list[int],
+        data_width: int,
+        metadata: list[int] | None = None,
+        metadata_width: int = 0,
+    ) -> "Trace":
+        return cls(
+            np.array(cycles, dtype=np.int64),
+            _ints_to_words(data, data_width),
+            data_width,
+            _ints_to_words(metadata, metadata_width) if metadata is not None else None,
+            metadata_width,
+        )
+
+    def data_ints(self) -> list[int]:
+        return _words_to_ints(self.data)
+
+    def metadata_ints(self) -> list[int] | None:
+        return _words_to_ints(self.metadata) if self.metadata is not None else None
+
+    def decode(
+        self,
+        data_type: Type[LogicObject],
+        metadata_type: Type[LogicObject] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        """Decode the trace into structured record arrays of the given types."""
+        if data_type.size() != self.data_width:
+            raise ValueError(
+                f"{data_type.__name__} is {data_type.size()} bits, but the trace"
+                f" data is {self.data_width} bits"
+            )
+        data = data_type.unpack_many(self.data)
+        if metadata_type is None or self.metadata is None:
+            return data, None
+        if metadata_type.size() != self.metadata_width:
+            raise ValueError(
+                f"{metadata_type.__name__} is {metadata_type.size()} bits, but the"
+                f" trace metadata is {self.metadata_width} bits"
+            )
+        return data, metadata_type.unpack_many(self.metadata)
+
+    def save(self, path: str):
+        arrays = {
+            "cycles": self.cycles,
+            "data": self.data,
+            "data_width": np.int64(self.data_width),
+        }
+        if self.metadata is not None:
+            arrays["metadata"] = self.metadata
+            arrays["metadata_width"] = np.int64(self.metadata_width)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "Trace":
+        with np.load(path) as arrays:
+            has_metadata = "metadata" in arrays
+            return cls(
+                arrays["cycles"],
+                arrays["data"],
+                int(arrays["data_width"]),
+                arrays["metadata"] if has_metadata else None,
+                int(arrays["metadata_width"]) if has_metadata else 0,
+            )
+
+
+class TraceRecorder(PipelineBase):
+    """
+    Passively record every handshake of a `<name>_{s,m}` interface.
+
+    `dut` can be any scope of the hierarchy, so internal interfaces can be
+    recorded, e.g. `TraceRecorder(dut.pipeline_math.rasterizer, "triangle", "s")`.
+    Metadata is recorded if the interface has a metadata signal. Cycles
+    are counted from when the recorder is started.
+    """
+
+    def __init__(
+        self,
+        dut: PipelineDut,
+        name: str,
+        type: Literal["s", "m"],
+        clock_name: str = "clk",
+    ):
+        super().__init__(dut, name, type, clock_name=clock_name)
+        self._cycles: list[int] = []
+        self._data_values: list[int] = []
+        self._metadata_values: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._cycles)
+
+    async def _run_loop(self):
+        valid = self._valid
+        ready = self._ready
+        data = self._data
+        metadata = self._metadata_signal
+        clk = self._clk
+
+        cycle = 0
+        while True:
+            await RisingEdge(clk)
+            await ReadOnly()
+            cycle += 1
+            if valid.value == 1 and ready.value == 1:
+                self._cycles.append(cycle)
+                self._data_values.append(data.value.to_unsigned())
+                if metadata is not None:
+                    self._metadata_values.append(metadata.value.to_unsigned())
+
+    def trace(self) -> Trace:
+        """The handshakes recorded so far."""
+        return Trace.from_ints(
+            self._cycles,
+            self._data_values,
+            _signal_width(self._data),
+            self._metadata_values if self._metadata_signal is not None else None,
+            (
+                _signal_width(self._metadata_signal)
+                if self._metadata_signal is not None
+                else 0
+            ),
+        )
+
+    def save(self, path: str):
+        self.trace().save(path)
+
+
+async def _original_timing(
+    clk, data: list[int], metadata: list[int | None], cycles: np.ndarray
+) -> AsyncIterator[tuple[int, int | None]]:
+    for i, item in enumerate(zip(data, metadata)):
+        if i > 0:
+            # The previous transaction was accepted on the last clock edge,
+            # keep the same spacing to this one as in the recording
+            gap = int(cycles[i] - cycles[i - 1])
+            if gap > 1:
+                await ClockCycles(clk, gap - 1)
+        yield item
+
+
+async def replay_trace(
+    producer: Producer,
+    trace: Trace,
+    timing: Literal["original", "full_rate"] = "original",
+) -> StreamStats:
+    """
+    Drive the transactions of `trace` into the interface of `producer`.
+
+    With `original` timing, transactions are spaced like in the recording.
+    If the DUT stalls a transaction, the following transactions are
+    delayed by the same amount. With `full_rate` timing the transactions
+    are driven back-to-back.
+    """
+    data = trace.data_ints()
+    metadata = trace.metadata_ints() or [None] * len(data)
+
+    if timing == "full_rate":
+        return await producer.stream(zip(data, metadata))
+    if timing == "original":
+        return await producer.stream(
+            _original_timing(producer._clk, data, metadata, trace.cycles)
+        )
+    raise ValueError(f"Unknown replay timing `{timing}`")
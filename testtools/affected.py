@@ -0,0 +1,199 @@
+"""
+Select the test modules affected by the changes since a git ref.
+
+Changed System Verilog files select the test modules of every toplevel
+whose compile order in `build/file_compile_order.txt` includes them.
+Changed Python files in `tests/` select the test modules that import them,
+directly or through other helpers. Changes to the test tools select
+everything, while changes to their own unit tests select nothing. The
+selected test modules are written to OUTPUT, one per line, and the reason
+each was selected is printed.
+
+Usage: python testtools/affected.py [ref]
+"""
+
+import ast
+import os
+import subprocess
+import sys
+
+DIR_TESTS = "tests"
+DIR_TOOLS = "testtools"
+OUTPUT = "build/test/affected.txt"
+
+# Changes to these select all tests
+INFRASTRUCTURE = ("testtools/", "Makefile", "requirements.txt")
+# Unit tests of the test tools, which do not affect the tests
+TOOL_TESTS = "testtools/tests/"
+VERILOG_EXTENSIONS = (".sv", ".svh", ".v", ".vh")
+
+# Directories where new, untracked files can affect tests
+SOURCES = ("src", DIR_TESTS, DIR_TOOLS)
+
+abs_path = os.path.abspath(".")
+sys.path.insert(0, os.path.join(abs_path, DIR_TOOLS))
+
+from gentest import find_test_modules
+from runner_tools import read_dependencies_file
+
+
+def changed_files(ref: str) -> list[str]:
+    """Files changed since `ref` in the working tree, including new files."""
+
+    def git(*args: str) -> list[str]:
+        result = subprocess.run(
+            ["git", *args], check=True, capture_output=True, text=True
+        )
+        return [line for line in result.stdout.splitlines() if line]
+
+    changed = git("diff", "--name-only", ref, "--")
+    # New files, outside of generated directories
+    changed += git("ls-files", "--others", "--exclude-standard", "--", *SOURCES)
+    return sorted(set(changed))
+
+
+def python_module(path: str, testdir: str) -> str:
+    """Dotted name of a file in `testdir`, which is on sys.path of the tests"""
+    name = os.path.relpath(path, testdir).rsplit(".py", 1)[0]
+    return name.replace(os.sep, ".").removesuffix(".__init__")
+
+
+def imported_files(path: str, testdir: str, files: dict[str, str]) -> set[str]:
+    """Files of `files` (dotted name to path) that the module at `path` imports."""
+    with open(path) as f:
+        try:
+            tree = ast.parse(f.read())
+        except SyntaxError:
+            return set()
+
+    package = python_module(path, testdir).split(".")
+    if not path.endswith("__init__.py"):
+        package = package[:-1]
+
+    names = []
+    for node in ast.walk(tree):
+        match node:
+            case ast.Import(names=aliases):
+                names += [alias.name for alias in aliases]
+            case ast.ImportFrom(module=module, names=aliases, level=level):
+                base = package[: len(package) - level + 1] if level else []
+                prefix = ".".join([*base, *([module] if module else [])])
+                names.append(prefix)
+                # `from package import module`
+                names += [f"{prefix}.{alias.name}".lstrip(".") for alias in aliases]
+
+    imported = set()
+    for name in names:
+        # `import a.b.c` also imports the packages a and a.b
+        parts = name.split(".")
+        for i in range(1, len(parts) + 1):
+            module = ".".join(parts[:i])
+            if module in files:
+                imported.add(files[module])
+    imported.discard(path)
+    return imported
+
+
+def importers(testdir: str) -> dict[str, set[str]]:
+    """The files importing each Python file in `testdir`."""
+    files = {}
+    for root, _, names in os.walk(testdir):
+        for name in names:
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                files[python_module(path, testdir)] = path
+
+    graph: dict[str, set[str]] = {path: set() for path in files.values()}
+    for path in files.values():
+        for imported in imported_files(path, testdir, files):
+            graph[imported].add(path)
+    return graph
+
+
+def affected_tests(
+    changed: list[str],
+    compile_orders: dict[str, list[str]],
+    toplevels: dict[str, str],
+    graph: dict[str, set[str]],
+) -> tuple[dict[str, list[str]], dict[str, str]]:
+    """
+    Map the changed files to the test modules they affect. `toplevels`
+    maps test module paths to their toplevel. Returns the reasons each
+    test module is selected for, and what each changed file affects.
+    """
+    selected: dict[str, list[str]] = {}
+    impact: dict[str, str] = {}
+
+    def select(test: str, reason: str):
+        selected.setdefault(test, []).append(reason)
+
+    for path in changed:
+        if path.startswith(TOOL_TESTS):
+            impact[path] = "no tests, run `make test-tools`"
+
+        elif path.startswith(INFRASTRUCTURE):
+            for test in toplevels:
+                select(test, f"test tools changed ({path})")
+            impact[path] = "all tests"
+
+        elif path.endswith(VERILOG_EXTENSIONS):
+            modules = {m for m, files in compile_orders.items() if path in files}
+            tests = [t for t, toplevel in toplevels.items() if toplevel in modules]
+            for test in tests:
+                select(test, f"{toplevels[test]} compiles {path}")
+            impact[path] = (
+                f"toplevels {', '.join(sorted(modules))}"
+                if modules
+                else "not in the compile order of any module"
+            )
+
+        elif path.startswith(f"{DIR_TESTS}/") and path.endswith(".py"):
+            # Everything importing the file, directly or through other files
+            seen = {path}
+            stack = [path]
+            while stack:
+                for importer in graph.get(stack.pop(), ()):
+                    if importer not in seen:
+                        seen.add(importer)
+                        stack.append(importer)
+            tests = [t for t in toplevels if t in seen]
+            for test in tests:
+                select(test, "changed" if test == path else f"imports {path}")
+            impact[path] = f"{len(tests)} test modules" if tests else "no test modules"
+
+        else:
+            impact[path] = "no tests"
+
+    return selected, impact
+
+
+def main(ref: str = "HEAD", output: str = OUTPUT):
+    changed = changed_files(ref)
+    modules = find_test_modules(DIR_TESTS)
+    toplevels = {
+        os.path.join(DIR_TESTS, path): module.verilog_toplevel
+        for path, module in modules.items()
+    }
+    selected, impact = affected_tests(
+        changed, read_dependencies_file(), toplevels, importers(DIR_TESTS)
+    )
+
+    print(f"{len(changed)} files changed since {ref}:")
+    for path in changed:
+        print(f"  {path}: {impact[path]}")
+
+    print(f"\nRunning {len(selected)} of {len(toplevels)} test modules:")
+    for test in sorted(selected):
+        reasons = selected[test]
+        more = f" (and {len(reasons) - 1} more)" if len(reasons) > 1 else ""
+        print(f"  {os.path.relpath(test, DIR_TESTS)}: {reasons[0]}{more}")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        f.writelines(
+            f"{os.path.relpath(test, DIR_TESTS)}\n" for test in sorted(selected)
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,112 @@
+"""
+Wall-clock benchmark of the pipeline BFMs in tests/tools/pipeline.py.
+
+Runs test_pipehead and reports simulated cycles per second of wall-clock
+time. If a git ref is given, the test is also run with the pipeline.py
+of that ref, to compare the BFM core before and after a change. Both
+runs share the Verilator build of the test runner.
+
+Usage: python testtools/bench_bfm.py [ref] [repeat]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+DIR_TESTS = "tests"
+DIR_TOOLS = "testtools"
+
+abs_path = os.path.abspath(".")
+test_path = os.path.join(abs_path, DIR_TESTS)
+sys.path.insert(0, os.path.join(abs_path, DIR_TOOLS))
+sys.path.insert(0, abs_path)
+sys.path.insert(0, test_path)
+
+from runner_tools import build_directory, build_simulator
+
+TOPLEVEL = "PipelineHead"
+TEST_MODULE = "pipeline.test_pipehead"
+TESTCASE = "test_pipehead"
+CLOCK_PERIOD_NS = 10  # make_clock in tools.constructors
+
+
+def run(tools_dir: str | None) -> tuple[float, float]:
+    """Run the test, returns simulated cycles and wall-clock seconds."""
+    build_dir = build_directory(TOPLEVEL, {}, "off")
+    runner = build_simulator(TOPLEVEL, build_dir, {}, "off")
+
+    # The runner passes sys.path on to the simulator
+    if tools_dir is not None:
+        sys.path.insert(0, tools_dir)
+    try:
+        results = runner.test(
+            hdl_toplevel=TOPLEVEL,
+            test_module=TEST_MODULE,
+            test_filter=TESTCASE,
+            build_dir=build_dir,
+            test_dir=test_path,
+            results_xml=f"{build_dir}/bench_results.xml",
+        )
+    finally:
+        if tools_dir is not None:
+            sys.path.remove(tools_dir)
+
+    testcase = ET.parse(results).getroot().find(".//testcase")
+    if testcase is None or testcase.find("failure") is not None:
+        raise RuntimeError(f"{TESTCASE} did not pass")
+    cycles = float(testcase.get("sim_time_ns", 0)) / CLOCK_PERIOD_NS
+    return cycles, float(testcase.get("time", 0))
+
+
+def tools_from_ref(ref: str, directory: str) -> str:
+    """
+    Copy the current tests/tools package to `directory`, with pipeline.py
+    replaced by the one at `ref`.
+    """
+    tools_dir = os.path.join(directory, "tools")
+    shutil.copytree(
+        os.path.join(test_path, "tools"),
+        tools_dir,
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    source = subprocess.run(
+        ["git", "show", f"{ref}:{DIR_TESTS}/tools/pipeline.py"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    with open(os.path.join(tools_dir, "pipeline.py"), "w") as f:
+        f.write(source)
+    return directory
+
+
+def report(name: str, samples: list[tuple[float, float]]):
+    cycles = samples[0][0]
+    seconds = min(seconds for _, seconds in samples)
+    print(
+        f"{name:<16} {cycles:>10.0f} {seconds:>10.2f} s"
+        f" {cycles / seconds:>12.0f} cycles/s"
+    )
+    return cycles / seconds
+
+
+def main(ref: str | None, repeat: int):
+    print(f"{'BFMs':<16} {'cycles':>10} {'wall':>12} {'rate':>21}")
+    current = report("current", [run(None) for _ in range(repeat)])
+    if ref is None:
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        tools_dir = tools_from_ref(ref, directory)
+        before = report(ref, [run(tools_dir) for _ in range(repeat)])
+    print(f"{'speedup':<16} {current / before:>34.2f}x")
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else None,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    )
@@ -0,0 +1,252 @@
+"""
+Micro-benchmark for LogicObject packing and unpacking.
+
+Compares the precompiled bit-offset codec against a reference
+implementation that walks the dataclass fields and slices a LogicArray
+per field, like LogicObject did before the codec was introduced, times
+the vectorized batch codec on large record arrays, and compares memory
+use and construction speed of a frame of PixelData against plain
+dataclasses quantizing through `quantize()` field by field.
+
+Usage: python testtools/bench_logic_object.py [iterations] [records]
+"""
+
+from dataclasses import dataclass, field, fields
+import sys
+import os
+import timeit
+import tracemalloc
+
+DIR_TESTS = "tests"
+
+abs_path = os.path.abspath(".")
+test_path = os.path.join(abs_path, DIR_TESTS)
+sys.path.insert(0, abs_path)
+sys.path.insert(0, test_path)
+
+from cocotb.types import LogicArray, Range
+
+from tools.logic_object import (
+    LogicObject,
+    LogicField,
+    Int,
+    UInt,
+    Fixed,
+    concat,
+)
+from tools.utils import quantize, to_fixed, to_float
+from tools.constructors import make_triangle, make_transform
+from core.types.types_ import (
+    PipelineEntry,
+    PixelData,
+    PixelCoordinate,
+    RGB,
+)
+
+
+def reference_from_logicarray(cls: type[LogicObject], logic_array: LogicArray):
+    values = {}
+    index = 0
+    for key in reversed(cls.__dataclass_fields__.keys()):
+        size = cls._get_field_size(key)
+        field = cls._get_field(key)
+
+        sliced = logic_array[index + size - 1 : index]
+        sliced.range = Range(size - 1, "downto", 0)
+
+        if isinstance(field, Int):
+            values[key] = sliced.to_signed()
+        elif isinstance(field, UInt):
+            values[key] = sliced.to_unsigned()
+        elif isinstance(field, Fixed):
+            values[key] = to_float(sliced.to_signed(), field.fractional_bits)
+        else:
+            values[key] = reference_from_logicarray(field, sliced)  # type: ignore
+
+        index += size
+    return cls(**values)
+
+
+def reference_to_logicarray(obj: LogicObject) -> LogicArray:
+    arrays = []
+    for key in obj.__dataclass_fields__.keys():
+        value = getattr(obj, key)
+        field = obj._get_field(key)
+        arr_range = Range(obj._get_field_size(key) - 1, "downto", 0)
+
+        if isinstance(field, Int):
+            arr = LogicArray.from_signed(value, arr_range)
+        elif isinstance(field, UInt):
+            arr = LogicArray.from_unsigned(value, arr_range)
+        elif isinstance(field, Fixed):
+            arr = LogicArray.from_signed(
+                to_fixed(value, field.fractional_bits), arr_range
+            )
+        else:
+            arr = LogicArray(reference_to_logicarray(value), arr_range)
+        arrays.append(arr)
+
+    return concat(*arrays)
+
+
+def bench(name: str, obj: LogicObject, iterations: int):
+    cls = type(obj)
+    logic_array = obj.to_logicarray()
+
+    assert reference_to_logicarray(obj) == logic_array
+    assert reference_from_logicarray(cls, logic_array) == cls.from_logicarray(
+        logic_array
+    )
+
+    def round_trip_reference():
+        reference_from_logicarray(cls, reference_to_logicarray(obj))
+
+    def round_trip_codec():
+        cls.from_logicarray(obj.to_logicarray())
+
+    reference = timeit.timeit(round_trip_reference, number=iterations)
+    codec = timeit.timeit(round_trip_codec, number=iterations)
+
+    print(
+        f"{name:<16} {cls.size():>5} bits"
+        f" {reference / iterations * 1e6:>10.1f} us"
+        f" {codec / iterations * 1e6:>10.1f} us"
+        f" {reference / codec:>8.1f}x"
+    )
+
+
+def bench_batch(name: str, obj: LogicObject, count: int):
+    cls = type(obj)
+    records = cls.to_records([obj] * count)
+
+    words = cls.pack_many(records)
+    assert (cls.unpack_many(words) == records).all()
+
+    pack = min(timeit.repeat(lambda: cls.pack_many(records), number=1, repeat=5))
+    unpack = min(timeit.repeat(lambda: cls.unpack_many(words), number=1, repeat=5))
+
+    print(
+        f"{name:<16} {count:>10}"
+        f" {pack * 1e3:>10.1f} ms"
+        f" {unpack * 1e3:>10.1f} ms"
+        f" {count / (pack + unpack) / 1e6:>6.2f} M/s"
+    )
+
+
+@dataclass
+class DictRGB:
+    r: int
+    g: int
+    b: int
+
+
+@dataclass
+class DictPixelCoordinate:
+    x: int
+    y: int
+
+
+@dataclass
+class DictPixelData:
+    covered: int
+    depth: float = field(metadata={"type": Fixed(20)})
+    color: DictRGB = field(metadata={"type": DictRGB})
+    coordinate: DictPixelCoordinate = field(metadata={"type": DictPixelCoordinate})
+
+    def __post_init__(self):
+        for value_field in fields(self):
+            if isinstance(value_field.metadata.get("type"), Fixed):
+                setattr(
+                    self, value_field.name, quantize(getattr(self, value_field.name))
+                )
+
+
+class FrozenRGB(LogicObject, frozen=True):
+    r: int = LogicField(UInt(4))  # type: ignore
+    g: int = LogicField(UInt(4))  # type: ignore
+    b: int = LogicField(UInt(4))  # type: ignore
+
+
+class FrozenPixelCoordinate(LogicObject, frozen=True):
+    x: int = LogicField(UInt(10))  # type: ignore
+    y: int = LogicField(UInt(10))  # type: ignore
+
+
+class FrozenPixelData(LogicObject, frozen=True):
+    covered: int = LogicField(UInt(1))  # type: ignore
+    depth: float = LogicField(Fixed(20))  # type: ignore
+    color: FrozenRGB = LogicField(FrozenRGB)  # type: ignore
+    coordinate: FrozenPixelCoordinate = LogicField(FrozenPixelCoordinate)  # type: ignore
+
+
+def bench_frame(name: str, types: tuple[type, type, type], width: int, height: int):
+    pixel_type, rgb_type, coordinate_type = types
+
+    def make_frame():
+        return [
+            pixel_type(
+                1,
+                (x ^ y) / 1024,
+                rgb_type(x & 15, y & 15, 3),
+                coordinate_type(x, y),
+            )
+            for y in range(height)
+            for x in range(width)
+        ]
+
+    tracemalloc.start()
+    frame = make_frame()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del frame
+
+    seconds = min(timeit.repeat(make_frame, number=1, repeat=3))
+    print(
+        f"{name:<16} {width * height:>10}"
+        f" {memory / 2**20:>10.1f} MB"
+        f" {seconds * 1e3:>10.1f} ms"
+    )
+
+
+def main(iterations: int, records: int):
+    print(f"{'type':<16} {'size':>10} {'reference':>13} {'codec':>13} {'speedup':>9}")
+    bench("Triangle", make_triangle(7), iterations)
+    bench(
+        "PipelineEntry",
+        PipelineEntry(make_triangle(7), make_transform(3), make_transform(5)),
+        iterations,
+    )
+    bench(
+        "PixelData",
+        PixelData(1, 0.25, RGB(1, 2, 3), PixelCoordinate(10, 20)),
+        iterations,
+    )
+
+    print()
+    print(f"{'type':<16} {'records':>10} {'pack_many':>13} {'unpack_many':>13}")
+    bench_batch("Triangle", make_triangle(7), records)
+    bench_batch(
+        "PipelineEntry",
+        PipelineEntry(make_triangle(7), make_transform(3), make_transform(5)),
+        records,
+    )
+    bench_batch(
+        "PixelData",
+        PixelData(1, 0.25, RGB(1, 2, 3), PixelCoordinate(10, 20)),
+        records,
+    )
+
+    print()
+    print(f"{'PixelData':<16} {'pixels':>10} {'memory':>13} {'construct':>13}")
+    types = (DictPixelData, DictRGB, DictPixelCoordinate)
+    bench_frame("dataclass", types, 320, 240)
+    bench_frame("LogicObject", (PixelData, RGB, PixelCoordinate), 320, 240)
+    types = (FrozenPixelData, FrozenRGB, FrozenPixelCoordinate)
+    bench_frame("frozen", types, 320, 240)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100_000,
+    )
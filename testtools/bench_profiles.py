@@ -0,0 +1,102 @@
+"""
+Benchmark of the Verilator build profiles in runner_tools.py.
+
+Builds the toplevel of test_graphics_pipeline with every profile, runs
+the test and reports the build time, the wall-clock simulation time and
+simulated clock cycles per second. Builds restored from the build cache are marked,
+clear it with `python testtools/build_cache.py clear` to compare build
+times.
+
+Usage: python testtools/bench_profiles.py [profiles...]
+"""
+
+import ast
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+DIR_TESTS = "tests"
+DIR_TOOLS = "testtools"
+
+abs_path = os.path.abspath(".")
+test_path = os.path.join(abs_path, DIR_TESTS)
+sys.path.insert(0, os.path.join(abs_path, DIR_TOOLS))
+sys.path.insert(0, abs_path)
+sys.path.insert(0, test_path)
+
+from gentest import scan_module
+from runner_tools import (
+    BUILD_PROFILES,
+    CLOCK_MODULE,
+    add_cycles,
+    build_directory,
+    build_simulator,
+)
+
+TEST_FILE = f"{DIR_TESTS}/pipeline/test_graphics_pipeline.py"
+TEST_MODULE = "pipeline.test_graphics_pipeline"
+TESTCASE = "test_graphics_pipeline"
+
+
+def run(profile: str) -> tuple[str, float, float, float]:
+    """
+    Build and run the test, returns the build cache result, build seconds,
+    wall-clock seconds and simulated clock cycles.
+    """
+    with open(TEST_FILE) as f:
+        module = scan_module(f.read(), TEST_MODULE)
+    assert module is not None
+    toplevel = module.verilog_toplevel
+    # The first parameter set, if the module has several
+    parameters = ast.literal_eval(module.verilog_parameters[0].parameters or "{}")
+    public = ast.literal_eval(module.public or "[]")
+    build_dir = build_directory(toplevel, parameters, "off", profile, public)
+
+    start = time.perf_counter()
+    runner = build_simulator(toplevel, build_dir, parameters, "off", profile, public)
+    build_seconds = time.perf_counter() - start
+
+    # Read by verilog_parameters in tests/tools/parameters.py
+    os.environ["TEST_VERILOG_PARAMETERS"] = json.dumps(parameters)
+    periods_file = os.path.abspath(f"{build_dir}/bench_clocks.json")
+    os.environ["TEST_CLOCK_PERIODS"] = periods_file
+    results = runner.test(
+        hdl_toplevel=toplevel,
+        test_module=f"{CLOCK_MODULE},{TEST_MODULE}",
+        test_filter=TESTCASE,
+        build_dir=build_dir,
+        test_dir=test_path,
+        results_xml=f"{build_dir}/bench_results.xml",
+    )
+
+    add_cycles(str(results), periods_file)
+    testcase = ET.parse(results).getroot().find(".//testcase")
+    if testcase is None or testcase.find("failure") is not None:
+        raise RuntimeError(f"{TESTCASE} did not pass with the {profile} profile")
+    return (
+        runner.build_result or "",
+        build_seconds,
+        float(testcase.get("time", 0)),
+        float(testcase.get("sim_cycles", 0)),
+    )
+
+
+def main(profiles: list[str]):
+    print(
+        f"{'profile':<10} {'build':>10} {'cache':>9} {'simulation':>11}"
+        f" {'rate':>16} {'speedup':>8}"
+    )
+    baseline = None
+    for profile in profiles:
+        cache, build_seconds, seconds, cycles = run(profile)
+        baseline = baseline or seconds
+        print(
+            f"{profile:<10} {build_seconds:>9.1f}s {cache:>9} {seconds:>10.1f}s"
+            f" {cycles / seconds:>7.0f} cycles/s {baseline / seconds:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or list(BUILD_PROFILES))
@@ -0,0 +1,233 @@
+"""
+Content-addressed cache of Verilator builds.
+
+Builds are keyed by a hash of the ordered source files and their
+contents, the toplevel, the parameters, the build arguments and the
+Verilator version. A build directory that was built for the same key is
+reused as is, and otherwise the simulator executable is restored from
+the cache directory, both without invoking Verilator. The cache is kept
+below a size limit by evicting the least recently used builds.
+
+Usage: python testtools/build_cache.py [stats|clear]
+"""
+
+import contextlib
+import fcntl
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+DIR_CACHE = "build/cache/verilator"
+
+# Bump when the layout of cached builds changes
+CACHE_VERSION = 1
+
+# Size limit of the cache, can be overridden with VERILATOR_CACHE_SIZE (MB)
+DEFAULT_CACHE_SIZE_MB = 4096
+
+KEY_FILENAME = ".build_key"
+STATS_FILENAME = "stats.json"
+
+
+@functools.cache
+def verilator_version() -> str:
+    result = subprocess.run(
+        ["verilator", "--version"], capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def build_key(
+    toplevel: str,
+    sources: list[str],
+    parameters: dict[str, Any],
+    build_args: list[str],
+) -> str:
+    """Hash of everything that affects the simulator executable."""
+    sha = hashlib.sha256(f"verilator-cache-{CACHE_VERSION}".encode())
+    sha.update(verilator_version().encode())
+    sha.update(toplevel.encode())
+    sha.update(repr(sorted(parameters.items())).encode())
+    sha.update(repr(build_args).encode())
+    for path in sources:
+        sha.update(path.encode())
+        with open(path, "rb") as f:
+            sha.update(hashlib.sha256(f.read()).digest())
+    return sha.hexdigest()
+
+
+@contextlib.contextmanager
+def _locked(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_key(build_dir: str) -> str | None:
+    try:
+        with open(os.path.join(build_dir, KEY_FILENAME)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _write_key(build_dir: str, key: str | None):
+    path = os.path.join(build_dir, KEY_FILENAME)
+    if key is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, "w") as f:
+        f.write(key)
+
+
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+class BuildCache:
+    def __init__(self, directory: str = DIR_CACHE, max_size_mb: int | None = None):
+        if max_size_mb is None:
+            max_size_mb = int(
+                os.environ.get("VERILATOR_CACHE_SIZE", DEFAULT_CACHE_SIZE_MB)
+            )
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size_mb * 2**20
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def build(
+        self,
+        key: str,
+        build_dir: str,
+        toplevel: str,
+        build: Callable[[], None],
+    ) -> str:
+        """
+        Make sure `build_dir` contains the executable for `key`, calling
+        `build` only if it is not in the build directory or the cache.
+        Returns `reused`, `restored` or `built`.
+        """
+        executable = os.path.join(build_dir, toplevel)
+        entry = self._entry(key)
+        cached = os.path.join(entry, toplevel)
+        if _read_key(build_dir) == key and os.path.exists(executable):
+            # Keep the entry of a build that is used from its build
+            # directory from being evicted as least recently used
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(entry)
+            self._record("reused")
+            return "reused"
+
+        with _locked(os.path.join(self.directory, ".lock")):
+            if os.path.exists(cached):
+                os.makedirs(build_dir, exist_ok=True)
+                shutil.copy2(cached, f"{executable}.tmp")
+                os.replace(f"{executable}.tmp", executable)
+                _write_key(build_dir, key)
+                # Mark the entry as recently used
+                os.utime(entry)
+                self._record("restored")
+                return "restored"
+
+        # The build directory no longer matches its key while rebuilding
+        if os.path.exists(build_dir):
+            _write_key(build_dir, None)
+        build()
+        _write_key(build_dir, key)
+
+        with _locked(os.path.join(self.directory, ".lock")):
+            os.makedirs(entry, exist_ok=True)
+            shutil.copy2(executable, f"{cached}.tmp")
+            os.replace(f"{cached}.tmp", cached)
+            with open(os.path.join(entry, "build.json"), "w") as f:
+                json.dump({"toplevel": toplevel, "created": time.time()}, f)
+            self._evict(keep=entry)
+        self._record("built")
+        return "built"
+
+    def entries(self) -> list[tuple[str, int, float]]:
+        """Cached builds as (path, size, last use), least recently used first."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                path = os.path.join(prefix_dir, key)
+                entries.append((path, _dir_size(path), os.path.getmtime(path)))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def _evict(self, keep: str):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self._record("evicted")
+
+    def _record(self, event: str):
+        path = os.path.join(self.directory, STATS_FILENAME)
+        with _locked(os.path.join(self.directory, ".stats.lock")):
+            stats = self.stats()
+            stats[event] = stats.get(event, 0) + 1
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(stats, f, indent=2)
+            os.replace(f"{path}.tmp", path)
+
+    def stats(self) -> dict[str, int]:
+        try:
+            with open(os.path.join(self.directory, STATS_FILENAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def main(command: str):
+    cache = BuildCache()
+    if command == "clear":
+        cache.clear()
+        return
+
+    stats = cache.stats()
+    hits = stats.get("reused", 0) + stats.get("restored", 0)
+    misses = stats.get("built", 0)
+    entries = cache.entries()
+    size = sum(size for _, size, _ in entries)
+    print(f"hits:      {hits} ({stats.get('restored', 0)} restored from cache)")
+    print(f"misses:    {misses}")
+    if hits + misses > 0:
+        print(f"hit rate:  {hits / (hits + misses):.1%}")
+    print(f"evicted:   {stats.get('evicted', 0)}")
+    print(
+        f"size:      {size / 2**20:.1f} / {cache.max_size / 2**20:.0f} MB"
+        f" in {len(entries)} builds"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "stats")
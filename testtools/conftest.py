@@ -1,10 +1,129 @@
-def pytest_collection_modifyitems(items):
+import os
+import uuid
+
+import pytest
+
+
+def pytest_configure(config):
+    # Identifies the records of this run in the timing database. Set before
+    # pytest-xdist starts its workers, so they share it.
+    if not hasattr(config, "workerinput"):
+        os.environ["TEST_RUN_ID"] = uuid.uuid4().hex
+
+
+# After the tests are deselected with `-k`, so shards are balanced
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
     """Hacky solution to rename tests away from testrunner.py"""
+    if not is_testrunner(items):
+        return
+
     for item in items:
         filename = item.keywords["module"].args[0]
-        testname = item.keywords["module"].args[2]
+        testname = display_name(item)
 
         parts = item.nodeid.split("::")
+        # Keep the group suffix pytest-xdist may have added
+        _, _, group = parts[1].partition("@")
         parts[0] = filename
-        parts[1] = testname
+        parts[1] = f"{testname}@{group}" if group else testname
         item._nodeid = "::".join(parts)
+
+        # Written to JUnit results, for the durations of sharding.py
+        item.user_properties.append(("test", f"{filename}::{testname}"))
+        item.user_properties.append(("build", build_group(item)))
+
+    # Test modules selected by `make test-affected`, see affected.py
+    if os.environ.get("TEST_FILES"):
+        files = set(os.environ["TEST_FILES"].split())
+        deselect(config, items, lambda item: item.keywords["module"].args[0] in files)
+
+    if os.environ.get("TEST_SHARD"):
+        select_shard(config, items, os.environ["TEST_SHARD"])
+
+    # Run the slowest groups of tests first when running in parallel, so
+    # no worker is left with a long test at the end
+    if hasattr(config, "workerinput"):
+        sort_longest_first(items)
+
+
+def is_testrunner(items) -> bool:
+    """
+    Whether the tests are the cocotb tests of testrunner.py, and not the
+    unit tests of the test tools in testtools/tests
+    """
+    return any(item.get_closest_marker("module") for item in items)
+
+
+def build_group(item) -> str:
+    return item.get_closest_marker("xdist_group").args[0]
+
+
+def select_shard(config, items, spec: str):
+    """Deselect the tests of the other shards, see sharding.py"""
+    from runner_tools import read_dependencies_file
+    from sharding import select_shard, shard_durations, source_sizes, write_tests
+
+    tests = [(dict(item.user_properties)["test"], build_group(item)) for item in items]
+    try:
+        builds = select_shard(
+            tests, spec, shard_durations(), source_sizes(read_dependencies_file())
+        )
+    except ValueError as e:
+        raise pytest.UsageError(str(e)) from e
+
+    # So merging the results of all shards can check that none is missing
+    if config.option.xmlpath:
+        write_tests(config.option.xmlpath, [test for test, _ in tests])
+
+    deselect(config, items, lambda item: build_group(item) in builds)
+
+
+def deselect(config, items, keep):
+    selected = [item for item in items if keep(item)]
+    deselected = [item for item in items if not keep(item)]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = selected
+
+
+def display_name(item) -> str:
+    """Name of the cocotb test of an item, with its parameter set"""
+    from runner_tools import report_name
+
+    return report_name(*item.keywords["module"].args[2:4])
+
+
+def sort_longest_first(items):
+    """
+    Sort tests by the duration of their xdist group, from previous runs in
+    the timing database. Groups without a recorded duration go first.
+    Every worker must collect the same order, so records of the current
+    run are ignored.
+    """
+    from timing_db import expected_durations
+
+    durations = expected_durations(exclude_run=os.environ.get("TEST_RUN_ID"))
+    groups: dict[str, float] = {}
+    for item in items:
+        group = build_group(item)
+        test = f"{item.keywords['module'].args[0]}::{display_name(item)}"
+        duration = durations.get((test, group), float("inf"))
+        groups[group] = groups.get(group, 0.0) + duration
+
+    # Stable sort, so tests of a group keep their order
+    items.sort(key=lambda item: -groups[build_group(item)])
+
+
+def pytest_collection_finish(session):
+    """Only run the selected tests when running tests in batches"""
+    from runner_tools import select_tests
+
+    if not is_testrunner(session.items):
+        return
+    select_tests(
+        {
+            (item.keywords["module"].args[1], item.keywords["module"].args[2])
+            for item in session.items
+        }
+    )
@@ -0,0 +1,367 @@
+"""
+Generate the compile order of every System Verilog module, without Vivado.
+
+Scans `src/**/*.sv` for module and package definitions, instantiations,
+`import pkg::*` and `pkg::name` references, and writes the files each
+module depends on, packages first, in the format of
+`build/file_compile_order.txt`:
+
+    <module> <file1>:<file2>:...:<file defining module>
+
+`ifdef`s are evaluated with `SIMULATION` defined, so the mocks of Xilinx
+primitives in `src/test/` are used. Scan results are cached per file,
+keyed by modification time and size, with a content hash as fallback, so
+only changed files are scanned again.
+
+Usage: python testtools/gendependencies.py [output]
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+
+DIR_SOURCES = "src"
+OUTPUT = "build/file_compile_order.txt"
+CACHE_FILE = "build/cache/dependencies/scan.json"
+
+# Bump when the scan results change, to invalidate the cache
+SCANNER_VERSION = 2
+
+DEFINES = {"SIMULATION"}
+
+DIRECTIVE_RE = re.compile(
+    r"`(ifdef|ifndef|elsif|else|endif|define|undef)\b[ \t]*(\w*)[^\n]*"
+)
+UNIT_RE = re.compile(
+    r"\b(module|package)\s+(?:automatic\s+|static\s+)?(\w+)(.*?)\bend\1\b", re.S
+)
+IMPORT_RE = re.compile(r"\b(\w+)::")
+# <module> [#(...)] <instance> [[...]] (
+INSTANCE_RE = re.compile(r"\b(\w+)(?:\s*#\s*\(|\s+\w+\s*(?:\[[^\]]*\]\s*)*\()")
+# <module> [#(...)] <instance>, for the interface of a module
+INSTANCE_NAME_RE = re.compile(
+    r"\b(\w+)\s*(?:#\s*\((?:[^()]|\([^()]*\))*\)\s*)?(\w+)\s*(?:\[[^\]]*\]\s*)*\("
+)
+# <type> [[...]] <name> [= ...], e.g. `triangle_t triangle;`
+DECLARATION_RE = re.compile(
+    r"^(?:\w+::)?\w+\s+(?:(?:signed|unsigned)\s+)?(?:\[[^\]]*\]\s*)*"
+    r"\w+(?:\s*\[[^\]]*\])*\s*(?:=[^=].*)?$",
+    re.S,
+)
+DECLARATION_KEYWORDS = {
+    "logic",
+    "wire",
+    "reg",
+    "bit",
+    "byte",
+    "int",
+    "integer",
+    "shortint",
+    "longint",
+    "real",
+    "parameter",
+    "localparam",
+    "typedef",
+    "genvar",
+    "input",
+    "output",
+    "inout",
+}
+STATEMENT_KEYWORDS = {
+    "assign",
+    "always",
+    "always_ff",
+    "always_comb",
+    "always_latch",
+    "initial",
+    "final",
+    "if",
+    "else",
+    "for",
+    "while",
+    "case",
+    "begin",
+    "end",
+    "return",
+    "default",
+    "assert",
+}
+
+
+@dataclass
+class Unit:
+    kind: str
+    name: str
+    packages: list[str] = field(default_factory=list)
+    # Identifiers that look like instantiations, filtered against the
+    # known modules when building the graph
+    instances: list[str] = field(default_factory=list)
+    # Hash of the ports, parameters, declarations and instances, but not
+    # the logic, i.e. everything that ends up in a typing stub
+    interface: str = ""
+
+
+@dataclass
+class FileScan:
+    path: str
+    mtime: float
+    size: int
+    digest: str
+    units: list[Unit]
+
+
+def strip_comments(source: str) -> str:
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"//[^\n]*", "", source)
+    return re.sub(r'"(?:\\.|[^"\\\n])*"', '""', source)
+
+
+def preprocess(source: str, defines: set[str]) -> str:
+    """Remove the code excluded by `ifdef`s, and the directives themselves."""
+    defines = set(defines)
+    output = []
+    # Each level holds (active, a branch was taken)
+    stack: list[tuple[bool, bool]] = []
+    active = True
+    position = 0
+    for match in DIRECTIVE_RE.finditer(source):
+        if active:
+            output.append(source[position : match.start()])
+        position = match.end()
+
+        directive, name = match.groups()
+        if directive in ("ifdef", "ifndef"):
+            taken = (name in defines) == (directive == "ifdef")
+            stack.append((active, taken))
+            active = active and taken
+        elif directive == "elsif":
+            parent, done = stack[-1]
+            taken = not done and name in defines
+            stack[-1] = (parent, done or taken)
+            active = parent and taken
+        elif directive == "else":
+            parent, done = stack[-1]
+            stack[-1] = (parent, True)
+            active = parent and not done
+        elif directive == "endif":
+            active, _ = stack.pop()
+        elif active and directive == "define":
+            defines.add(name)
+        elif active and directive == "undef":
+            defines.discard(name)
+    if active:
+        output.append(source[position:])
+    return "".join(output)
+
+
+def interface_hash(kind: str, name: str, body: str) -> str:
+    """
+    Hash the parts of a module or package that are visible from Python:
+    the header with ports and parameters, declarations and instances.
+    Statements are split on `;`, so declarations inside of procedural
+    blocks also count, which at worst regenerates a stub too often.
+    """
+    sha = hashlib.sha256(f"{kind} {name}".encode())
+    header, _, body = body.partition(";") if kind == "module" else ("", "", body)
+    sha.update(" ".join(header.split()).encode())
+    for statement in body.split(";"):
+        statement = " ".join(statement.split())
+        # Drop leading labels and block keywords, e.g. `end else begin : g`
+        statement = re.sub(
+            r"^(?:(?:begin|end\w*|else|generate)\b\s*(?::\s*\w+\s*)?)+", "", statement
+        )
+        for instance in INSTANCE_NAME_RE.finditer(statement):
+            if instance.group(1) not in STATEMENT_KEYWORDS:
+                sha.update(f"instance {instance.group(1)} {instance.group(2)}".encode())
+        first = statement.split(" ", 1)[0]
+        if first in STATEMENT_KEYWORDS:
+            continue
+        if first in DECLARATION_KEYWORDS or DECLARATION_RE.match(statement):
+            sha.update(statement.encode())
+    return sha.hexdigest()
+
+
+def scan_source(source: str, defines: set[str] = DEFINES) -> list[Unit]:
+    source = preprocess(strip_comments(source), defines)
+
+    units = []
+    outside = []
+    position = 0
+    for match in UNIT_RE.finditer(source):
+        outside.append(source[position : match.start()])
+        position = match.end()
+
+        kind, name, body = match.groups()
+        packages = IMPORT_RE.findall(body)
+        instances = []
+        if kind == "module":
+            instances = [
+                instance for instance in INSTANCE_RE.findall(body) if instance != name
+            ]
+        interface = interface_hash(kind, name, body)
+        units.append(Unit(kind, name, packages, instances, interface))
+    outside.append(source[position:])
+
+    # Imports outside of any module or package apply to the whole file
+    file_packages = IMPORT_RE.findall("".join(outside))
+    for unit in units:
+        unit.packages = list(
+            dict.fromkeys(p for p in file_packages + unit.packages if p != unit.name)
+        )
+        unit.instances = list(dict.fromkeys(unit.instances))
+    return units
+
+
+def hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_cache(path: str = CACHE_FILE) -> dict[str, FileScan]:
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if cache.get("version") != SCANNER_VERSION:
+        return {}
+    return {
+        scan["path"]: FileScan(
+            **{**scan, "units": [Unit(**unit) for unit in scan["units"]]}
+        )
+        for scan in cache["files"]
+    }
+
+
+def write_cache(scans: list[FileScan], path: str = CACHE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(
+            {"version": SCANNER_VERSION, "files": [asdict(scan) for scan in scans]},
+            f,
+        )
+    os.replace(f"{path}.tmp", path)
+
+
+def scan_files(paths: list[str], cache: dict[str, FileScan]) -> list[FileScan]:
+    """Scan the files, reusing the cached results of unchanged files."""
+    scans = []
+    for path in paths:
+        stat = os.stat(path)
+        cached = cache.get(path)
+        if (
+            cached is not None
+            and cached.mtime == stat.st_mtime
+            and cached.size == stat.st_size
+        ):
+            scans.append(cached)
+            continue
+
+        digest = hash_file(path)
+        if cached is not None and cached.digest == digest:
+            # Touched, but not changed
+            units = cached.units
+        else:
+            with open(path) as f:
+                units = scan_source(f.read())
+        scans.append(FileScan(path, stat.st_mtime, stat.st_size, digest, units))
+    return scans
+
+
+def dependency_closures(
+    scans: list[FileScan],
+) -> dict[str, list[tuple[Unit, str]]]:
+    """
+    Units and their files each module depends on, including the module
+    itself last, dependencies first.
+    """
+    units: dict[tuple[str, str], tuple[Unit, str]] = {}
+    for scan in scans:
+        for unit in scan.units:
+            units[(unit.kind, unit.name)] = (unit, scan.path)
+
+    def dependencies(unit: Unit) -> list[tuple[str, str]]:
+        packages = [("package", name) for name in unit.packages]
+        modules = [("module", name) for name in unit.instances]
+        return [key for key in packages + modules if key in units]
+
+    closures = {}
+    for (kind, name), (unit, _) in units.items():
+        if kind != "module":
+            continue
+
+        closure: dict[tuple[str, str], tuple[Unit, str]] = {}
+
+        def visit(key: tuple[str, str], stack: tuple[tuple[str, str], ...]):
+            if key in closure:
+                return
+            if key in stack:
+                if key[0] == "package":
+                    raise RuntimeError(f"Circular import of package '{key[1]}'")
+                raise RuntimeError(f"Module '{key[1]}' instantiates itself")
+            for child in dependencies(units[key][0]):
+                visit(child, (*stack, key))
+            closure[key] = units[key]
+
+        visit((kind, name), ())
+        closures[name] = list(closure.values())
+    return closures
+
+
+def compile_orders(scans: list[FileScan]) -> dict[str, list[str]]:
+    """Files to compile for each module, dependencies first."""
+    return {
+        module: list(dict.fromkeys(path for _, path in closure))
+        for module, closure in dependency_closures(scans).items()
+    }
+
+
+def interface_hashes(scans: list[FileScan]) -> dict[str, str]:
+    """
+    Hash of the interface of each module, including the interfaces of the
+    modules it instantiates and the packages it imports.
+    """
+    hashes = {}
+    for module, closure in dependency_closures(scans).items():
+        sha = hashlib.sha256(f"interface-{SCANNER_VERSION}".encode())
+        for unit, _ in closure:
+            sha.update(unit.interface.encode())
+        hashes[module] = sha.hexdigest()
+    return hashes
+
+
+def scan_sources() -> list[FileScan]:
+    """Scan all source files, updating the scan cache."""
+    paths = sorted(glob.glob(f"{DIR_SOURCES}/**/*.*v", recursive=True))
+    scans = scan_files(paths, read_cache())
+    write_cache(scans)
+    return scans
+
+
+def main(output: str = OUTPUT) -> bool:
+    """Write the compile orders to `output`. Returns False if it was up to date."""
+    scans = scan_sources()
+    content = "".join(
+        f"{module} {':'.join(files)}\n"
+        for module, files in compile_orders(scans).items()
+    )
+    try:
+        with open(output) as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(f"{output}.tmp", "w") as f:
+        f.write(content)
+    os.replace(f"{output}.tmp", output)
+    return True
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
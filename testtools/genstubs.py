@@ -1,10 +1,30 @@
+"""
+Generate typing stubs for the given Verilog modules.
+
+Stubs are generated by running a dummy test per module, which builds the
+module. Only modules whose interface changed since their stub was
+generated are run again, see `interface_hashes` in gendependencies.py,
+and the dummy tests run in parallel.
+
+Usage: python testtools/genstubs.py [--jobs N] modules...
+"""
+
+import argparse
+import json
+import subprocess
 import sys
 import os
 
 import jinja2
 
+from gendependencies import interface_hashes, scan_sources
+
 DIR_TESTS = "testtools/stubs"
 DIR_TOOLS = "testtools"
+DIR_STUBS = "tests/stubs"
+
+# Interface hash of every module when its stub was generated
+HASHES_FILE = f"{DIR_STUBS}/interfaces.json"
 
 abs_path = os.path.abspath(".")
 test_path = os.path.join(abs_path, DIR_TESTS)
@@ -12,7 +32,36 @@ sys.path.insert(0, abs_path)
 sys.path.insert(0, test_path)
 
 
-def main(modules):
+def stub_path(module: str) -> str:
+    return os.path.join(DIR_STUBS, module.lower() + ".pyi")
+
+
+def read_hashes() -> dict[str, str]:
+    try:
+        with open(HASHES_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_hashes(hashes: dict[str, str]):
+    os.makedirs(DIR_STUBS, exist_ok=True)
+    with open(f"{HASHES_FILE}.tmp", "w") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    os.replace(f"{HASHES_FILE}.tmp", HASHES_FILE)
+
+
+def outdated_modules(modules: list[str], hashes: dict[str, str]) -> list[str]:
+    generated = read_hashes()
+    return [
+        module
+        for module in modules
+        if generated.get(module) != hashes.get(module)
+        or not os.path.exists(stub_path(module))
+    ]
+
+
+def render(modules: list[str]):
     env = jinja2.Environment(loader=jinja2.FileSystemLoader(DIR_TOOLS))
     template = env.get_template("stub_dummytests.py.jinja2")
     testrunner = template.render(modules=modules)
@@ -20,6 +69,35 @@ def main(modules):
         f.write(testrunner)
 
 
+def main(modules: list[str], jobs: int = 1) -> int:
+    hashes = interface_hashes(scan_sources())
+    outdated = outdated_modules(modules, hashes)
+    print(f"Generating typing stubs for {len(outdated)} of {len(modules)} modules")
+    render(outdated)
+    if not outdated:
+        return 0
+
+    # Stubs that fail to generate should not be mistaken for new ones
+    for module in outdated:
+        if os.path.exists(stub_path(module)):
+            os.remove(stub_path(module))
+
+    args = ["pytest", f"{DIR_TOOLS}/stub_dummytests.py"]
+    if jobs > 1:
+        args += ["-n", str(min(jobs, len(outdated))), "--dist", "loadgroup"]
+    result = subprocess.run(args, stdout=subprocess.DEVNULL)
+
+    generated = read_hashes()
+    for module in outdated:
+        if os.path.exists(stub_path(module)) and module in hashes:
+            generated[module] = hashes[module]
+    write_hashes(generated)
+    return result.returncode
+
+
 if __name__ == "__main__":
-    modules = sys.argv[1:]
-    main(modules)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", "-j", type=int, default=1)
+    parser.add_argument("modules", nargs="*")
+    args = parser.parse_args()
+    sys.exit(main(args.modules, args.jobs))
@@ -1,16 +1,41 @@
+"""
+Generate testtools/testrunner.py with a pytest test for every cocotb test.
+
+Test modules are discovered without importing them, by reading the
+`VERILOG_MODULE`, `VERILOG_PARAMETERS`, `WAVES`, `VERILATOR_PROFILE` and
+`VERILATOR_PUBLIC` literals and the functions
+decorated with `cocotb.test` or `cocotb.parametrize` from the AST.
+Module level constants used in the values are resolved, and modules that
+cannot be read statically are imported instead. Static results are cached
+per file hash.
+
+`VERILOG_PARAMETERS` is either one dict of parameters or a list of them,
+and `VERILOG_PARAMETER_MATRIX` maps parameters to lists of values, whose
+product is applied to every set. Every test runs once per parameter set,
+each with its own build.
+"""
+
+import ast
 import glob
+import hashlib
 import importlib
+import itertools
+import json
+import operator
 from types import ModuleType
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 import warnings
 import sys
 import os
 
 import jinja2
-import cocotb._decorators
 
 DIR_TESTS = "tests"
 DIR_TOOLS = "testtools"
+CACHE_FILE = "build/cache/tests/discovery.json"
+
+# Bump when the discovery results change, to invalidate the cache
+DISCOVERY_VERSION = 5
 
 # TODO: clean up paths accross modules?
 abs_path = os.path.abspath(".")
@@ -18,28 +43,72 @@ test_path = os.path.join(abs_path, DIR_TESTS)
 sys.path.insert(0, abs_path)
 sys.path.insert(0, test_path)
 
+COCOTB_DECORATORS = {"test", "parametrize"}
+
+# Module level values read from test modules
+MODULE_VALUES = {
+    "VERILOG_MODULE",
+    "VERILOG_PARAMETERS",
+    "VERILOG_PARAMETER_MATRIX",
+    "WAVES",
+    "VERILATOR_PROFILE",
+    "VERILATOR_PUBLIC",
+}
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_,
+    ast.BitAnd: operator.and_,
+    ast.USub: operator.neg,
+}
+
 
 @dataclass
 class TestFunction:
     name: str
-    func: cocotb._decorators.Test
+
+
+@dataclass
+class ParameterSet:
+    # Readable id of the set, empty if the module has only one
+    id: str
+    # repr of the parameters dict, or None
+    parameters: str | None
 
 
 @dataclass
 class TestModule:
     name: str
-    module: ModuleType
     tests: dict[str, TestFunction]
     verilog_toplevel: str
-    verilog_parameters: str | None
+    verilog_parameters: list[ParameterSet]
+    waves: str | None = None
+    profile: str | None = None
+    public: str | None = None
 
 
-def import_module(module_name: str, testdir: str) -> TestModule:
-    # Find and import the module
+class NotStatic(Exception):
+    """The module can not be discovered without importing it"""
+
+
+def dotted_name(path: str, testdir: str) -> str:
     # Remove prefix and suffix, and replace remaining / with .
-    name = module_name.rsplit(".py", 1)[0]
+    name = path.rsplit(".py", 1)[0]
     name = name.split(f"{testdir}/", 1)[1]
-    name = name.replace("/", ".")
+    return name.replace("/", ".")
+
+
+def import_module(module_name: str, testdir: str) -> TestModule:
+    # Find and import the module
+    name = dotted_name(module_name, testdir)
 
     module = importlib.import_module(".".join(("tests", name)))
     tests = find_tests(module)
@@ -58,52 +127,269 @@ def import_module(module_name: str, testdir: str) -> TestModule:
         )
 
     # Get parameters to toplevel module if available
-    if hasattr(module, "VERILOG_PARAMETERS"):
-        verilog_parameters = getattr(module, "VERILOG_PARAMETERS")
+    verilog_parameters = parameter_sets(
+        name,
+        getattr(module, "VERILOG_PARAMETERS", None),
+        getattr(module, "VERILOG_PARAMETER_MATRIX", None),
+    )
+
+    # Waveform tracing and Verilator build of the tests, see `waves_config`
+    # and `BUILD_PROFILES` in runner_tools.py
+    waves = getattr(module, "WAVES", None)
+    profile = getattr(module, "VERILATOR_PROFILE", None)
+    public = getattr(module, "VERILATOR_PUBLIC", None)
+
+    return TestModule(
+        name=name,
+        tests=tests,
+        verilog_toplevel=verilog_toplevel,
+        verilog_parameters=verilog_parameters,
+        waves=repr(waves) if waves is not None else None,
+        profile=repr(profile) if profile is not None else None,
+        public=repr(public) if public is not None else None,
+    )
+
+
+def parameter_sets(name: str, parameters: object, matrix: object) -> list[ParameterSet]:
+    """Expand `VERILOG_PARAMETERS` and `VERILOG_PARAMETER_MATRIX` of a module."""
+    if parameters is None and matrix is None:
+        return [ParameterSet("", None)]
+
+    sets = parameters if isinstance(parameters, list) else [parameters or {}]
+    if not sets or not all(isinstance(p, dict) for p in sets):
+        raise ImportError(
+            f"Module '{name}' has invalid value for 'VERILOG_PARAMETERS'."
+            " Expected a dict or a non-empty list of dicts"
+        )
 
-        if not isinstance(verilog_parameters, dict):
+    if matrix is not None:
+        if not isinstance(matrix, dict) or not all(
+            isinstance(values, (list, tuple)) and values for values in matrix.values()
+        ):
             raise ImportError(
-                f"Module '{name}' has non-dict value for 'VERILOG_PARAMETERS."
+                f"Module '{name}' has invalid value for 'VERILOG_PARAMETER_MATRIX'."
+                " Expected a dict of non-empty lists"
             )
+        sets = [
+            {**base, **dict(zip(matrix, values))}
+            for base in sets
+            for values in itertools.product(*matrix.values())
+        ]
 
-        verilog_parameters = repr(verilog_parameters)
-    else:
-        verilog_parameters = None
+    if len(sets) == 1:
+        return [ParameterSet("", repr(sets[0]))]
+
+    # Name sets by the parameters that differ between them
+    keys = list(dict.fromkeys(key for p in sets for key in p))
+    varying = [key for key in keys if len({repr(p.get(key)) for p in sets}) > 1]
+    ids = [",".join(f"{key}={p.get(key)}" for key in varying) for p in sets]
+    if len(set(ids)) != len(ids):
+        ids = [f"{i}" + (f"-{id_}" if id_ else "") for i, id_ in enumerate(ids)]
+    return [ParameterSet(id_, repr(p)) for id_, p in zip(ids, sets)]
+
+
+def evaluate(node: ast.AST, constants: dict[str, object]) -> object:
+    """Evaluate a literal expression, which may use module level constants."""
+    match node:
+        case ast.Constant(value=value):
+            return value
+        case ast.Name(id=name) if name in constants:
+            return constants[name]
+        case ast.Dict(keys=keys, values=values) if None not in keys:
+            return {
+                evaluate(key, constants): evaluate(value, constants)  # type: ignore
+                for key, value in zip(keys, values)
+            }
+        case ast.List(elts=elements):
+            return [evaluate(element, constants) for element in elements]
+        case ast.Tuple(elts=elements):
+            return tuple(evaluate(element, constants) for element in elements)
+        case ast.BinOp(left=left, op=op, right=right) if type(op) in OPERATORS:
+            return OPERATORS[type(op)](
+                evaluate(left, constants), evaluate(right, constants)
+            )
+        case ast.UnaryOp(op=op, operand=operand) if type(op) in OPERATORS:
+            return OPERATORS[type(op)](evaluate(operand, constants))
+        case ast.JoinedStr(values=parts):
+            return "".join(str(evaluate(part, constants)) for part in parts)
+        case ast.FormattedValue(value=value, conversion=-1, format_spec=None):
+            return evaluate(value, constants)
+    raise NotStatic(f"'{ast.unparse(node)}' is not a literal")
+
+
+def is_cocotb_test(function: ast.AsyncFunctionDef, cocotb_names: set[str]) -> bool:
+    for decorator in function.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorator = decorator.func
+        match decorator:
+            case ast.Attribute(value=ast.Name(id="cocotb"), attr=attr):
+                if attr in COCOTB_DECORATORS:
+                    return True
+            case ast.Name(id=name) if name in cocotb_names:
+                return True
+    return False
+
+
+def scan_module(source: str, name: str) -> TestModule | None:
+    """
+    Discover a test module from its source. Returns None if it has no
+    `VERILOG_MODULE`, and raises NotStatic if it must be imported.
+    """
+    tree = ast.parse(source)
+
+    constants: dict[str, object] = {}
+    values: dict[str, object] = {}
+    tests: dict[str, TestFunction] = {}
+    # Decorators imported with `from cocotb import test`
+    cocotb_names: set[str] = set()
+
+    for node in tree.body:
+        match node:
+            case ast.ImportFrom(module="cocotb", names=names):
+                cocotb_names.update(
+                    alias.asname or alias.name
+                    for alias in names
+                    if alias.name in COCOTB_DECORATORS
+                )
+            # Annotated assignments without a value do not define anything
+            case ast.Assign(targets=[ast.Name(id=target)], value=value) | ast.AnnAssign(
+                target=ast.Name(id=target), value=ast.expr() as value
+            ):
+                if target in MODULE_VALUES:
+                    values[target] = evaluate(value, constants)
+                elif target.startswith("test_"):
+                    raise NotStatic(f"'{target}' is assigned, not defined")
+                else:
+                    try:
+                        constants[target] = evaluate(value, constants)
+                    except NotStatic:
+                        constants.pop(target, None)
+            case ast.AsyncFunctionDef(name=test) if test.startswith("test_"):
+                if is_cocotb_test(node, cocotb_names):
+                    tests[test] = TestFunction(test)
+            case ast.FunctionDef(name=test) if test.startswith("test_"):
+                # cocotb tests must be coroutines, but may be created by
+                # other decorators
+                if node.decorator_list:
+                    raise NotStatic(f"'{test}' is decorated, but not a coroutine")
+
+    if "VERILOG_MODULE" not in values:
+        return None
+
+    verilog_toplevel = values["VERILOG_MODULE"]
+    if not isinstance(verilog_toplevel, str):
+        raise NotStatic("'VERILOG_MODULE' is not a string")
 
+    profile = values.get("VERILATOR_PROFILE")
+    if profile is not None and not isinstance(profile, str):
+        raise NotStatic("'VERILATOR_PROFILE' is not a string")
+
+    public = values.get("VERILATOR_PUBLIC")
+    if public is not None and not isinstance(public, (list, tuple)):
+        raise NotStatic("'VERILATOR_PUBLIC' is not a list")
+
+    waves = values.get("WAVES")
     return TestModule(
         name=name,
-        module=module,
         tests=tests,
         verilog_toplevel=verilog_toplevel,
-        verilog_parameters=verilog_parameters,
+        verilog_parameters=parameter_sets(
+            name,
+            values.get("VERILOG_PARAMETERS"),
+            values.get("VERILOG_PARAMETER_MATRIX"),
+        ),
+        waves=repr(waves) if waves is not None else None,
+        profile=repr(profile) if profile is not None else None,
+        public=repr(list(public)) if public is not None else None,
     )
 
 
+def read_cache(path: str = CACHE_FILE) -> dict[str, dict]:
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if cache.get("version") != DISCOVERY_VERSION:
+        return {}
+    return cache["files"]
+
+
+def write_cache(files: dict[str, dict], path: str = CACHE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"version": DISCOVERY_VERSION, "files": files}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def discover_module(
+    path: str, testdir: str, cache: dict[str, dict], updated: dict[str, dict]
+) -> TestModule | None:
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    name = dotted_name(path, testdir)
+
+    cached = cache.get(path)
+    if cached is not None and cached["hash"] == digest:
+        updated[path] = cached
+        module = cached["module"]
+        if module is None:
+            return None
+        tests = {test: TestFunction(test) for test in module["tests"]}
+        verilog_parameters = [ParameterSet(**p) for p in module["verilog_parameters"]]
+        return TestModule(
+            **{**module, "tests": tests, "verilog_parameters": verilog_parameters}
+        )
+
+    try:
+        module = scan_module(source.decode(), name)
+    except (NotStatic, SyntaxError):
+        # Only static results are cached, as imports depend on other files
+        return import_module(module_name=path, testdir=testdir)
+
+    updated[path] = {
+        "hash": digest,
+        "module": asdict(module) if module is not None else None,
+    }
+    return module
+
+
 def find_test_modules(testdir: str) -> dict[str, TestModule]:
     modules = {}
-    for module_name in glob.glob(f"{testdir}/**/test_*.py", recursive=True):
+    cache = read_cache()
+    updated: dict[str, dict] = {}
+    for path in sorted(glob.glob(f"{testdir}/**/test_*.py", recursive=True)):
         try:
-            module = import_module(module_name=module_name, testdir=testdir)
+            module = discover_module(path, testdir, cache, updated)
         except (ImportError, ModuleNotFoundError) as e:
-            warnings.warn(f"Failed to import module '{module_name}': {e!s}")
+            warnings.warn(f"Failed to import module '{path}': {e!s}")
+            continue
+        if module is None:
+            warnings.warn(
+                f"Module '{path}' is missing required 'VERILOG_MODULE' definition. Ignoring module"
+            )
             continue
 
-        module_name = module_name.split(f"{testdir}/", 1)[1]
+        modules[path.split(f"{testdir}/", 1)[1]] = module
 
-        modules[module_name] = module
+    if updated != cache:
+        write_cache(updated)
     return modules
 
 
 def find_tests(module: ModuleType) -> dict[str, TestFunction]:
+    import cocotb._decorators
+
     tests: dict[str, TestFunction] = {}
     for var in vars(module):
         if var.startswith("test_"):
             # This is probably a test. Check if it is a cocotb test
             func = getattr(module, var)
             if isinstance(
-                func, (cocotb._decorators.Test, cocotb._decorators.Parameterized)
+                func, (cocotb._decorators.Test, cocotb._decorators.TestGenerator)
             ):
-                tests[var] = TestFunction(var, func)
+                tests[var] = TestFunction(var)
 
     return tests
 
@@ -0,0 +1,287 @@
+"""
+Generate LogicObject classes from the packed structs in the System Verilog
+packages, so the Python types used in tests always match the hardware.
+
+The generated module is cached on disk keyed by a hash of the source
+files, so running this when the packages have not changed only costs
+hashing the sources. `make types` also checks that the hand-written types
+in tests/core/types/types_.py have the same bit layout as the generated
+ones, see testtools/tests/test_gentypes.py.
+
+Usage: python testtools/gentypes.py [output] [sources...]
+"""
+
+import ast
+import hashlib
+import keyword
+import operator
+import os
+import re
+import shutil
+import sys
+from dataclasses import dataclass, field
+
+DIR_CACHE = "build/cache/types"
+
+SOURCES = [
+    "src/core/math/fixed.sv",
+    "src/core/types/types.sv",
+    "src/core/types/cmd_types.sv",
+]
+OUTPUT = "tests/core/types/sv_types.py"
+
+# Bump when the generated code changes, to invalidate cached outputs
+GENERATOR_VERSION = 1
+
+HASH_PREFIX = "# source-hash: "
+
+PACKAGE_RE = re.compile(r"\bpackage\s+(\w+)\s*;(.*?)\bendpackage", re.S)
+IMPORT_RE = re.compile(r"\bimport\s+(\w+)::\*\s*;")
+LOCALPARAM_RE = re.compile(r"\blocalparam\s+(?:int\s+)?(\w+)\s*=\s*([^;]+);")
+TYPEDEF_RE = re.compile(
+    r"\btypedef\s+struct\s+packed\s*\{(?P<body>.*?)\}\s*(?P<struct>\w+)\s*;"
+    r"|\btypedef\s+(?P<decl>[^;{]+);",
+    re.S,
+)
+# <type> [signed] [[msb:lsb]] <name>
+DECLARATION_RE = re.compile(
+    r"^\s*(?:\w+::)?(?P<type>\w+)(?P<signed>\s+signed)?\s*"
+    r"(?:\[(?P<msb>[^\]:]+):(?P<lsb>[^\]]+)\])?\s*(?P<name>\w+)\s*$"
+)
+FIXED_FORMAT_RE = re.compile(r"q(\d+)x(\d+)$")
+
+
+@dataclass
+class Scalar:
+    width: int
+    signed: bool = False
+    fractional_bits: int | None = None
+
+
+@dataclass
+class Struct:
+    name: str
+    members: list[tuple[str, "Scalar | Struct"]] = field(default_factory=list)
+
+    @property
+    def width(self) -> int:
+        return sum(member.width for _, member in self.members)
+
+
+@dataclass
+class Package:
+    name: str
+    body: str
+    imports: list[str]
+
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.floordiv,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.USub: operator.neg,
+}
+
+
+def evaluate(expression: str, params: dict[str, int]) -> int:
+    """Evaluate a constant integer expression using package localparams."""
+
+    def visit(node: ast.AST) -> int:
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in params:
+            return params[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](visit(node.left), visit(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](visit(node.operand))
+        raise ValueError(f"Unsupported constant expression '{expression}'")
+
+    return visit(ast.parse(expression.strip(), mode="eval").body)
+
+
+def strip_comments(source: str) -> str:
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    return re.sub(r"//[^\n]*", "", source)
+
+
+def find_packages(sources: list[str]) -> list[Package]:
+    """Find all packages in the sources, ordered so imports come first."""
+    packages: dict[str, Package] = {}
+    for path in sources:
+        with open(path) as f:
+            source = strip_comments(f.read())
+        for match in PACKAGE_RE.finditer(source):
+            name, body = match.groups()
+            packages[name] = Package(name, body, IMPORT_RE.findall(body))
+
+    ordered: list[Package] = []
+
+    def visit(package: Package, stack: tuple[str, ...]):
+        if package in ordered:
+            return
+        if package.name in stack:
+            raise RuntimeError(f"Circular import of package '{package.name}'")
+        for name in package.imports:
+            if name in packages:
+                visit(packages[name], (*stack, package.name))
+        ordered.append(package)
+
+    for package in packages.values():
+        visit(package, ())
+    return ordered
+
+
+def parse_declaration(
+    declaration: str,
+    types: dict[str, "Scalar | Struct"],
+    params: dict[str, int],
+) -> tuple[str, "Scalar | Struct"]:
+    match = DECLARATION_RE.match(declaration)
+    if match is None:
+        raise ValueError(f"Could not parse declaration '{declaration.strip()}'")
+
+    base, name = match["type"], match["name"]
+    if base in ("logic", "bit"):
+        width = 1
+        if match["msb"] is not None:
+            msb = evaluate(match["msb"], params)
+            lsb = evaluate(match["lsb"], params)
+            width = abs(msb - lsb) + 1
+        return name, Scalar(width, signed=match["signed"] is not None)
+
+    if base not in types:
+        raise ValueError(f"Unknown type '{base}' in declaration of '{name}'")
+    if match["msb"] is not None:
+        raise ValueError(f"Packed arrays of '{base}' are not supported ('{name}')")
+    return name, types[base]
+
+
+def parse_packages(sources: list[str]) -> dict[str, "Scalar | Struct"]:
+    """Parse typedefs of all packages in `sources`, in dependency order."""
+    types: dict[str, Scalar | Struct] = {}
+    params: dict[str, int] = {}
+
+    for package in find_packages(sources):
+        for name, expression in LOCALPARAM_RE.findall(package.body):
+            try:
+                params[name] = evaluate(expression, params)
+            except (ValueError, SyntaxError):
+                # Only integer localparams are used for type widths
+                continue
+
+        for match in TYPEDEF_RE.finditer(package.body):
+            if match["struct"] is not None:
+                struct = Struct(match["struct"])
+                for member in match["body"].split(";"):
+                    if member.strip():
+                        struct.members.append(parse_declaration(member, types, params))
+                types[struct.name] = struct
+                continue
+
+            name, scalar = parse_declaration(match["decl"], types, params)
+            if (
+                isinstance(scalar, Scalar)
+                and scalar.signed
+                and name.startswith("fixed")
+            ):
+                # Fixed point types follow the naming `fixed_q<int>x<frac>`,
+                # with plain `fixed` using the standard format.
+                fixed_format = FIXED_FORMAT_RE.search(name)
+                if fixed_format is not None:
+                    fractional_bits = int(fixed_format[2])
+                else:
+                    fractional_bits = params["STANDARD_FRACTIONAL_BITS"]
+                scalar = Scalar(scalar.width, True, fractional_bits)
+            types[name] = scalar
+
+    return types
+
+
+def class_name(sv_name: str) -> str:
+    """Convert a System Verilog type name like `color_t` to `Color`."""
+    name = sv_name.removesuffix("_t")
+    return "".join(part[:1].upper() + part[1:] for part in name.split("_"))
+
+
+def field_declaration(name: str, member: "Scalar | Struct") -> str:
+    if keyword.iskeyword(name):
+        name += "_"
+    if isinstance(member, Struct):
+        return f"{name}: {class_name(member.name)} = LogicField({class_name(member.name)})  # type: ignore"
+    if member.fractional_bits is not None:
+        return f"{name}: float = LogicField(Fixed({member.fractional_bits}, {member.width}))  # type: ignore"
+    if member.signed:
+        return f"{name}: int = LogicField(Int({member.width}))  # type: ignore"
+    return f"{name}: int = LogicField(UInt({member.width}))  # type: ignore"
+
+
+def render(
+    types: dict[str, "Scalar | Struct"], source_hash: str, sources: list[str]
+) -> str:
+    lines = [
+        f"{HASH_PREFIX}{source_hash}",
+        "# This file is automatically generated by testtools/gentypes.py. Do not edit",
+        f"# Generated from: {', '.join(sources)}",
+        '"""LogicObject types generated from the System Verilog packages"""',
+        "",
+        "from tools.logic_object import Fixed, Int, LogicObject, UInt, LogicField",
+    ]
+    for sv_name, struct in types.items():
+        if not isinstance(struct, Struct) or struct.name != sv_name:
+            continue
+        lines += ["", "", f"# {sv_name} ({struct.width} bits)"]
+        lines.append(f"class {class_name(sv_name)}(LogicObject):")
+        for name, member in struct.members:
+            lines.append(f"    {field_declaration(name, member)}")
+    return "\n".join(lines) + "\n"
+
+
+def hash_sources(sources: list[str]) -> str:
+    sha = hashlib.sha256(f"gentypes-{GENERATOR_VERSION}".encode())
+    for path in sources:
+        with open(path, "rb") as f:
+            sha.update(path.encode())
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def read_hash(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return None
+    if first_line.startswith(HASH_PREFIX):
+        return first_line[len(HASH_PREFIX) :].strip()
+    return None
+
+
+def main(output: str = OUTPUT, sources: list[str] = SOURCES) -> bool:
+    """Generate `output` from `sources`. Returns False if it was up to date."""
+    source_hash = hash_sources(sources)
+    if read_hash(output) == source_hash:
+        return False
+
+    cached = os.path.join(DIR_CACHE, f"{source_hash}.py")
+    if not os.path.exists(cached):
+        code = render(parse_packages(sources), source_hash, sources)
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        with open(f"{cached}.tmp", "w") as f:
+            f.write(code)
+        os.replace(f"{cached}.tmp", cached)
+
+    shutil.copyfile(cached, output)
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        main(sys.argv[1], sys.argv[2:])
+    elif len(sys.argv) == 2:
+        main(sys.argv[1])
+    else:
+        main()
@@ -1,15 +1,50 @@
+import contextlib
+import fcntl
 import functools
+from dataclasses import dataclass
 from typing import Any
 import datetime
+import hashlib
+import json
 import os
 import re
+import sqlite3
+import time
+import warnings
+import xml.etree.ElementTree as ET
 
 import pytest
 import cocotb_tools.runner
 
+from build_cache import BuildCache, build_key
+import timing_db
+import verilator_main
+
 
 DIR_TESTS = os.path.join(os.path.abspath("."), "tests")  # TODO: ability to change path
 
+BUILD_ARGS = [
+    "--structs-packed",
+    "-DSIMULATION",
+    "--public-flat-rw",
+]
+
+# Build arguments of each trace format. Untraced builds have no tracing
+# overhead at all, and each format has its own build directory.
+TRACE_BUILD_ARGS = {
+    "off": [],
+    "vcd": ["--trace", "--trace-structs"],
+    "fst": ["--trace-fst", "--trace-structs"],
+}
+
+BATCH_MODES = ("test", "module", "build")
+
+# Default thread count of the `threads` profile, see VERILATOR_THREADS
+MAX_THREADS = 4
+
+# Loaded into every simulation to record the clock periods of the tests
+CLOCK_MODULE = "tools.clock_periods"
+
 STUB_CODE = """
 # This file was automatically generated by testtools.
 # Required because of importlib's inability to import .pyi files
@@ -22,7 +57,7 @@ def read_dependencies_file(
     file_path: str = "build/file_compile_order.txt",
 ) -> dict[str, list[str]]:
     """
-    Read the dependecies file generated by the dependency.tcl script.
+    Read the dependecies file generated by testtools/gendependencies.py.
     Returns a dictionary mapping module names to a list of source files.
     """
     # TODO: fail more gracefully
@@ -57,80 +92,634 @@ def parameters_to_safe_filename(parameters: dict) -> str:
     return safe
 
 
+def write_atomic(path: str, content: str):
+    """Write a file so concurrent readers never see it partially written."""
+    try:
+        with open(path) as f:
+            if f.read() == content:
+                return
+    except FileNotFoundError:
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def symlink_atomic(target: str, link: str):
+    tmp = f"{link}.{os.getpid()}.tmp"
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+@contextlib.contextmanager
+def build_lock(build_dir: str):
+    """
+    Lock a build directory, so it is not compiled by two processes at once
+    when tests run in parallel.
+    """
+    os.makedirs(os.path.dirname(build_dir), exist_ok=True)
+    with open(f"{build_dir}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@dataclass(frozen=True)
+class Waves:
+    """
+    Waveform tracing of a test. `format` is `off`, `vcd` or `fst`. Only the
+    time between `start_ns` and `stop_ns` is traced, starting when the
+    `trigger` signal is high for the first time.
+    """
+
+    format: str = "off"
+    start_ns: float | None = None
+    stop_ns: float | None = None
+    trigger: str | None = None
+
+    def test_args(self, trace_file: str) -> list[str]:
+        args = ["--trace-file", trace_file]
+        if self.start_ns is not None:
+            args += ["--trace-start", str(self.start_ns)]
+        if self.stop_ns is not None:
+            args += ["--trace-stop", str(self.stop_ns)]
+        if self.trigger is not None:
+            args += ["--trace-trigger", self.trigger]
+        return args
+
+
+def waves_config(config: str | dict | None, testcase: str | None) -> Waves:
+    """
+    Tracing of `testcase`, from the `WAVES` of its test module, either a
+    format or a dict of `Waves` fields with optional overrides per test
+    in `tests`, e.g. `{"format": "fst", "tests": {"test_b": "off"}}`.
+    The TEST_WAVES, TEST_WAVES_WINDOW (`<start_ns>:<stop_ns>`) and
+    TEST_WAVES_TRIGGER environment variables override the test module.
+    """
+    options: dict[str, Any] = {}
+    if isinstance(config, str):
+        options["format"] = config
+    elif isinstance(config, dict):
+        options.update(config)
+        test_config = options.pop("tests", {}).get(testcase)
+        if isinstance(test_config, str):
+            options["format"] = test_config
+        elif isinstance(test_config, dict):
+            options.update(test_config)
+
+    if os.environ.get("TEST_WAVES"):
+        options["format"] = os.environ["TEST_WAVES"]
+    if os.environ.get("TEST_WAVES_WINDOW"):
+        start, _, stop = os.environ["TEST_WAVES_WINDOW"].partition(":")
+        options["start_ns"] = float(start) if start else None
+        options["stop_ns"] = float(stop) if stop else None
+    if os.environ.get("TEST_WAVES_TRIGGER"):
+        options["trigger"] = os.environ["TEST_WAVES_TRIGGER"]
+
+    try:
+        waves = Waves(**options)
+    except TypeError as e:
+        raise RuntimeError(f"Invalid WAVES for {testcase}: {e}") from e
+    if waves.format not in TRACE_BUILD_ARGS:
+        raise RuntimeError(
+            f"Unknown waveform format '{waves.format}', expected one of"
+            f" {', '.join(TRACE_BUILD_ARGS)}"
+        )
+    return waves
+
+
+def verilator_threads() -> int:
+    """Threads of the `threads` profile, set with VERILATOR_THREADS."""
+    if os.environ.get("VERILATOR_THREADS"):
+        return int(os.environ["VERILATOR_THREADS"])
+    return max(1, min(MAX_THREADS, os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class BuildProfile:
+    """
+    Verilator build of a test. Profiles that are not `public` only give
+    access to the signals in the `VERILATOR_PUBLIC` of the test module, so
+    Verilator can optimize the rest of the design, and profiles without
+    `tracing` can not write waveforms.
+    """
+
+    build_args: tuple[str, ...] = ()
+    public: bool = True
+    tracing: bool = True
+    threads: bool = False
+
+    def args(self) -> list[str]:
+        args = list(self.build_args)
+        if self.threads:
+            args += ["--threads", str(verilator_threads())]
+        return args
+
+
+BUILD_PROFILES = {
+    "debug": BuildProfile(),
+    "fast": BuildProfile(
+        ("-O3", "--x-assign", "fast", "--x-initial", "fast"),
+        public=False,
+        tracing=False,
+    ),
+    "threads": BuildProfile(("-O3",), threads=True),
+}
+
+
+def profile_config(config: str | None, waves: Waves) -> str:
+    """
+    Build profile of a test, from the `VERILATOR_PROFILE` of its test
+    module, overridden by the VERILATOR_PROFILE environment variable.
+    Traced tests fall back to `debug` if the profile can not trace.
+    """
+    profile = os.environ.get("VERILATOR_PROFILE") or config or "debug"
+    if profile not in BUILD_PROFILES:
+        raise RuntimeError(
+            f"Unknown Verilator profile '{profile}', expected one of"
+            f" {', '.join(BUILD_PROFILES)}"
+        )
+    if waves.format != "off" and not BUILD_PROFILES[profile].tracing:
+        warnings.warn(f"The Verilator profile '{profile}' can not trace, using 'debug'")
+        profile = "debug"
+    return profile
+
+
+def public_config(public: list[str], path: str) -> str:
+    """
+    Write a Verilator configuration file making the signals in `public`
+    accessible from cocotb, given as `<module>.<signal>` with `*` and `?`
+    wildcards, e.g. `DrawingManager.write_*` or `*.*_s_valid`. The ports
+    of the toplevel are always accessible.
+    """
+    lines = ["`verilator_config"]
+    for signal in public:
+        module, dot, name = signal.rpartition(".")
+        if not dot or not module or not name:
+            raise RuntimeError(
+                f"Invalid VERILATOR_PUBLIC entry '{signal}', expected <module>.<signal>"
+            )
+        lines.append(f'public_flat_rw -module "{module}" -var "{name}"')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, "\n".join(lines) + "\n")
+    return path
+
+
+class Verilator(cocotb_tools.runner.Verilator):
+    """Verilator runner with windowed tracing, see verilator_main.py"""
+
+    # How the build cache provided the simulator, see BuildCache.build
+    build_result: str | None = None
+
+    # Whether all signals are public, the runner of cocotb always makes them
+    public: bool = True
+
+    def _build_command(self):
+        main = verilator_main.generate()
+        return [
+            [
+                main if arg == verilator_main.COCOTB_MAIN else arg
+                for arg in command
+                if self.public or arg != "--public-flat-rw"
+            ]
+            for command in super()._build_command()
+        ]
+
+
+def build_directory(
+    toplevel: str,
+    parameters: dict[str, Any],
+    trace: str,
+    profile: str = "debug",
+    public: list[str] | None = None,
+) -> str:
+    build_dir = f"build/test/simbuild_{toplevel}"
+    build_dir = os.path.abspath(build_dir)
+    if len(parameters) > 0:
+        build_dir += "_" + parameters_to_safe_filename(parameters)
+    if trace != "vcd":
+        build_dir += "_notrace" if trace == "off" else f"_{trace}"
+    if profile != "debug":
+        build_dir += f"_{profile}"
+        if not BUILD_PROFILES[profile].public:
+            # Tests accessing different signals can not share a build
+            digest = hashlib.sha256(repr(sorted(public or [])).encode()).hexdigest()
+            build_dir += f"_{digest[:8]}"
+    return build_dir
+
+
+def build_simulator(
+    toplevel: str,
+    build_dir: str,
+    parameters: dict[str, Any],
+    trace: str = "off",
+    profile: str = "debug",
+    public: list[str] | None = None,
+) -> Verilator:
+    """
+    Build the simulator for `toplevel` in `build_dir`, reusing a cached
+    build with the same sources, parameters and build arguments if there
+    is one. `trace` is the waveform format the simulator can write, and
+    `profile` one of BUILD_PROFILES, with the `public` signals of profiles
+    that do not make all signals public.
+    """
+    files = get_dependencies(toplevel)
+    build_profile = BUILD_PROFILES[profile]
+    runner = Verilator()
+    runner.public = build_profile.public
+
+    build_args = [
+        arg for arg in BUILD_ARGS if build_profile.public or arg != "--public-flat-rw"
+    ]
+    build_args += build_profile.args() + TRACE_BUILD_ARGS[trace]
+    config = []
+    if not build_profile.public:
+        config = [public_config(public or [], os.path.join(build_dir, "public.vlt"))]
+
+    def build():
+        runner.build(
+            sources=config + files,
+            hdl_toplevel=toplevel,
+            includes=["."],
+            build_args=build_args,
+            waves=trace != "off",
+            build_dir=build_dir,
+            parameters=parameters,
+        )
+
+    with build_lock(build_dir):
+        main = verilator_main.generate()
+        key = build_key(toplevel, [*config, *files, main], parameters, build_args)
+        runner.build_result = BuildCache().build(key, build_dir, toplevel, build)
+    return runner
+
+
+# Tests of the test runner by build directory, as (module name, testcase)
+_registered_tests: dict[str, list[tuple[str, str]]] = {}
+
+# Tests selected by pytest, set by conftest.py after collection
+_selected_tests: set[tuple[str, str]] | None = None
+
+# Results of the batches that have run in this process
+_batch_results: dict[tuple, dict[tuple[str, str], list[ET.Element]] | str] = {}
+
+
+def select_tests(tests: set[tuple[str, str]]):
+    """Limit batches to the tests pytest selected, e.g. with `-k`."""
+    global _selected_tests
+    _selected_tests = tests
+
+
+def batch_mode() -> str:
+    """
+    Which tests share a simulator process, set with TEST_BATCH:
+    `test` runs every test in its own process, `module` runs all tests of
+    a test module together and `build` all tests sharing a Verilator build.
+    """
+    mode = os.environ.get("TEST_BATCH", "test")
+    if mode not in BATCH_MODES:
+        raise RuntimeError(
+            f"Unknown TEST_BATCH '{mode}', expected one of {', '.join(BATCH_MODES)}"
+        )
+    return mode
+
+
+def run_simulation(
+    runner: cocotb_tools.runner.Verilator,
+    toplevel: str,
+    build_dir: str,
+    tests: list[tuple[str, str]],
+    name: str,
+    waves: Waves,
+) -> str:
+    """
+    Run the given (module name, testcase) tests in one simulator process,
+    returns the path of the results file.
+    """
+    # Setup stubs. Each build directory gets its own stub directory,
+    # and the stub is moved into place when the test is done. Builds that
+    # only make some signals public would generate incomplete stubs.
+    autostub = ["copra.integration.autostub"] if getattr(runner, "public", True) else []
+    stub_dir = os.path.join(build_dir, "stubs")
+    stub_name = toplevel.lower()
+    os.makedirs(stub_dir, exist_ok=True)
+    os.environ["COPRA_STUB_DIR"] = stub_dir
+    os.environ["COPRA_STUB_FILENAME"] = "".join((stub_name, ".pyi"))
+    os.makedirs(os.path.join(DIR_TESTS, "stubs"), exist_ok=True)
+    write_atomic(os.path.join(DIR_TESTS, "stubs", stub_name + ".py"), STUB_CODE)
+
+    # Write the waveform straight to its own file, instead of the
+    # shared tests/dump.vcd
+    timestamp = datetime.datetime.now(tz=datetime.timezone.utc).strftime("%Y%m%d%H%M%S")
+    trace_name = os.path.abspath(
+        f"waveform/history/{name}_{timestamp}_{os.getpid()}.{waves.format}"
+    )
+    if waves.format != "off":
+        os.makedirs("waveform/history/", exist_ok=True)
+
+    modules = list(dict.fromkeys(module for module, _ in tests))
+    # Clock periods of the tests, to count their simulated cycles
+    periods_file = os.path.abspath(f"{build_dir}/clocks_{name}.json")
+    os.environ["TEST_CLOCK_PERIODS"] = periods_file
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(periods_file)
+    # Match full names, so tests of other modules with the same name, or
+    # whose name starts with the testcase, are not selected, while the
+    # parametrized variants of a test are
+    test_filter = "|".join(
+        (
+            *(
+                re.escape(f"{module}.{testcase}") + "(/|$)"
+                for module, testcase in tests
+            ),
+            *autostub,
+        )
+    )
+    test_filter = f"({test_filter})"
+
+    try:
+        results_file = str(
+            runner.test(
+                hdl_toplevel=toplevel,
+                test_module=",".join((*autostub, CLOCK_MODULE, *modules)),
+                test_filter=test_filter,
+                build_dir=build_dir,
+                test_dir=DIR_TESTS,
+                test_args=waves.test_args(trace_name) if waves.format != "off" else [],
+                waves=waves.format != "off",
+                results_xml=f"{build_dir}/results_{name}.xml",
+            )
+        )
+        add_cycles(results_file, periods_file)
+        return results_file
+    finally:
+        stub_file = os.path.join(stub_dir, stub_name + ".pyi")
+        if os.path.exists(stub_file):
+            os.replace(stub_file, os.path.join(DIR_TESTS, "stubs", stub_name + ".pyi"))
+
+        if waves.format != "off" and os.path.exists(trace_name):
+            for _, testcase in tests:
+                symlink_atomic(trace_name, f"waveform/{testcase}.{waves.format}")
+
+
+def add_cycles(results_file: str, periods_file: str):
+    """
+    Add the simulated cycles of the fastest clock of every testcase to the
+    results file, as `sim_cycles`, using the clock periods recorded by
+    tests/tools/clock_periods.py.
+    """
+    try:
+        with open(periods_file) as f:
+            periods = json.load(f)
+    except FileNotFoundError:
+        return
+    tree = ET.parse(results_file)
+    for element in tree.getroot().iter("testcase"):
+        period = periods.get(f"{element.get('classname')}.{element.get('name')}")
+        if period:
+            cycles = float(element.get("sim_time_ns", 0)) / period
+            element.set("sim_cycles", f"{cycles:.0f}")
+    tree.write(results_file, encoding="UTF-8", xml_declaration=True)
+
+
+def split_results(
+    results_file: str, tests: list[tuple[str, str]]
+) -> dict[tuple[str, str], list[ET.Element]]:
+    """
+    Split a results file into the testcases of each (module name, testcase).
+    Parametrized tests have one testcase per parameter combination.
+    """
+    results: dict[tuple[str, str], list[ET.Element]] = {test: [] for test in tests}
+    for element in ET.parse(results_file).getroot().iter("testcase"):
+        name = element.get("name", "").split("/", 1)[0]
+        key = (element.get("classname", ""), name)
+        if key in results:
+            results[key].append(element)
+    return results
+
+
+def report_result(
+    results: dict[tuple[str, str], list[ET.Element]] | str,
+    module_name: str,
+    testcase: str,
+):
+    """Report the result of one test of a batch to pytest."""
+    __tracebackhide__ = True
+
+    if isinstance(results, str):
+        pytest.fail(results, pytrace=False)
+
+    elements = results.get((module_name, testcase), [])
+    if not elements:
+        pytest.fail(
+            f"{testcase} did not run, see the output of the first test of the batch",
+            pytrace=False,
+        )
+
+    failures = []
+    for element in elements:
+        for outcome in ("failure", "error"):
+            failure = element.find(outcome)
+            if failure is not None:
+                message = failure.get("message") or failure.text or outcome
+                failures.append(f"{element.get('name')}: {message}")
+    if failures:
+        pytest.fail("\n".join(failures), pytrace=False)
+
+    if all(element.find("skipped") is not None for element in elements):
+        skipped = elements[0].find("skipped")
+        pytest.skip(skipped.get("message") or skipped.text or "skipped")
+
+
+def batch_key(build_dir: str, module_name: str) -> tuple:
+    if batch_mode() == "module":
+        return (build_dir, module_name)
+    return (build_dir,)
+
+
+def run_batch(
+    runner: cocotb_tools.runner.Verilator,
+    toplevel: str,
+    build_dir: str,
+    module_name: str,
+    testcase: str,
+    waves: Waves,
+):
+    """
+    Run every selected test of the batch of `testcase` in one simulator
+    process the first time a test of the batch runs, and report the result
+    of `testcase`. Tests sharing a build directory run in the same worker
+    with pytest-xdist, so the other tests of the batch find their result.
+    """
+    __tracebackhide__ = True
+
+    key = batch_key(build_dir, module_name)
+    if key not in _batch_results:
+        tests = [
+            test
+            for test in _registered_tests.get(build_dir, [])
+            if (len(key) == 1 or test[0] == module_name)
+            and (_selected_tests is None or test in _selected_tests)
+        ]
+        if (module_name, testcase) not in tests:
+            tests.append((module_name, testcase))
+
+        name = "_".join(("batch", *(part.rsplit(".", 1)[-1] for part in key)))
+        results_file = f"{build_dir}/results_{name}.xml"
+        try:
+            run_simulation(runner, toplevel, build_dir, tests, name, waves)
+        except SystemExit:
+            # The runner exits on failing tests when running under pytest.
+            # Failures are reported per test from the results file below.
+            pass
+
+        if os.path.exists(results_file):
+            _batch_results[key] = split_results(results_file, tests)
+        else:
+            _batch_results[key] = (
+                f"Simulation of the batch {name} terminated abnormally,"
+                " see the output of the first test of the batch"
+            )
+
+    report_result(_batch_results[key], module_name, testcase)
+
+
+def record_timing(
+    test: str,
+    build_dir: str,
+    module_name: str,
+    testcase: str,
+    runner: Verilator | None,
+    outcome: str,
+    build_seconds: float,
+    wall_seconds: float,
+):
+    """Add the timing of a test to the timing database, see timing_db.py"""
+    if batch_mode() == "test":
+        results_file = f"{build_dir}/results_{testcase}.xml"
+        results = (
+            split_results(results_file, [(module_name, testcase)])
+            if os.path.exists(results_file)
+            else {}
+        )
+    else:
+        results = _batch_results.get(batch_key(build_dir, module_name), {})
+    elements = (
+        results.get((module_name, testcase), []) if isinstance(results, dict) else []
+    )
+
+    try:
+        timing_db.record(
+            timing_db.TestTiming(
+                run_id=os.environ.get("TEST_RUN_ID", ""),
+                test=test,
+                build=os.path.basename(build_dir),
+                outcome=outcome,
+                cache=(runner.build_result or "") if runner is not None else "",
+                build_seconds=build_seconds,
+                sim_seconds=sum(float(e.get("time", 0)) for e in elements),
+                sim_ns=sum(float(e.get("sim_time_ns", 0)) for e in elements),
+                sim_cycles=sum(float(e.get("sim_cycles", 0)) for e in elements),
+                wall_seconds=wall_seconds,
+            )
+        )
+    except sqlite3.Error as e:
+        warnings.warn(f"Could not record the timing of {test}: {e}")
+
+
+def report_name(testcase: str, variant: str = "") -> str:
+    """Name of a test in reports, with the id of its parameter set"""
+    return f"{testcase}[{variant}]" if variant else testcase
+
+
 def create_test(
     toplevel: str,
     filename: str,
     module_name: str,
     testcase: str | None = None,
     parameters: dict[str, Any] | None = None,
+    waves: str | dict | None = None,
+    profile: str | None = None,
+    public: list[str] | None = None,
+    variant: str = "",
 ):
+    """
+    Create a pytest test running `testcase` of a cocotb test module.
+    `variant` is the id of the parameter set of test modules with several,
+    see `parameter_sets` in gentest.py.
+    """
     if parameters is None:
         parameters = {}
 
-    def decorator(func):
-        files = get_dependencies(toplevel)
+    trace = waves_config(waves, testcase)
+    build_profile = profile_config(profile, trace)
+    build_dir = build_directory(
+        toplevel, parameters, trace.format, build_profile, public
+    )
 
+    if testcase is not None:
+        _registered_tests.setdefault(build_dir, []).append((module_name, testcase))
+
+    def decorator(func):
+        # Tests sharing a build directory are run by the same worker when
+        # running in parallel with `pytest -n <jobs> --dist loadgroup`
         @functools.wraps(func)
-        @pytest.mark.module(filename, module_name, testcase)
+        @pytest.mark.module(filename, module_name, testcase, variant)
+        @pytest.mark.xdist_group(os.path.basename(build_dir))
         def wrapper(*args, **kwargs):
             del args, kwargs  # ignore args
+            __tracebackhide__ = True
 
-            # Setup stubs
-            os.environ["COPRA_STUB_DIR"] = os.path.join(DIR_TESTS, "stubs")
-            os.environ["COPRA_STUB_FILENAME"] = "".join((toplevel.lower(), ".pyi"))
-            filename = os.path.join(DIR_TESTS, "stubs", toplevel.lower() + ".py")
-            with open(filename, "w") as f:
-                f.write(STUB_CODE)
-
-            build_dir = f"build/test/simbuild_{toplevel}"
-            build_dir = os.path.abspath(build_dir)
-            if len(parameters) > 0:
-                build_dir += "_" + parameters_to_safe_filename(parameters)
-            runner = cocotb_tools.runner.Verilator()
-            runner.build(
-                sources=files,
-                hdl_toplevel=toplevel,
-                includes=["."],
-                build_args=[
-                    "--structs-packed",
-                    "-DSIMULATION",
-                    "--trace",
-                    "--trace-structs",
-                    "--public-flat-rw",
-                ],
-                waves=True,
-                build_dir=build_dir,
-                parameters=parameters,
-            )
-
+            start = time.perf_counter()
+            runner = None
+            build_seconds = 0.0
+            outcome: str | None = "failed"
+            # Read by verilog_parameters in tests/tools/parameters.py
+            os.environ["TEST_VERILOG_PARAMETERS"] = json.dumps(parameters)
             try:
-                runner.test(
-                    hdl_toplevel=toplevel,
-                    test_module=",".join(("copra.integration.autostub", module_name)),
-                    test_filter=f"({testcase}|copra.integration.autostub)",
-                    build_dir=build_dir,
-                    test_dir=DIR_TESTS,
-                    waves=True,
-                    results_xml=f"{build_dir}/results.xml",
+                runner = build_simulator(
+                    toplevel,
+                    build_dir,
+                    parameters,
+                    trace.format,
+                    build_profile,
+                    public,
                 )
-            except:
+                build_seconds = time.perf_counter() - start
+
+                if batch_mode() == "test" or testcase is None:
+                    run_simulation(
+                        runner,
+                        toplevel,
+                        build_dir,
+                        [(module_name, testcase)],
+                        testcase,
+                        trace,
+                    )
+                else:
+                    run_batch(runner, toplevel, build_dir, module_name, testcase, trace)
+                outcome = "passed"
+            except pytest.skip.Exception:
+                outcome = "skipped"
+                raise
+            except KeyboardInterrupt:
+                outcome = None
                 raise
             finally:
-                # Move the "dump.vcd"-file generated
-                os.makedirs("waveform/history/", exist_ok=True)
-
-                timestamp = datetime.datetime.now(tz=datetime.timezone.utc).strftime(
-                    "%Y%m%d%H%M%S"
-                )
-                vcd_name = os.path.abspath(
-                    f"waveform/history/{testcase}_{timestamp}.vcd"
-                )
-                os.rename(f"{DIR_TESTS}/dump.vcd", vcd_name)
-
-                vcd_symlink = f"waveform/{testcase}.vcd"
-                if os.path.exists(vcd_symlink):
-                    os.remove(vcd_symlink)
-                os.symlink(vcd_name, vcd_symlink)
+                if outcome is not None and testcase is not None:
+                    record_timing(
+                        f"{filename}::{report_name(testcase, variant)}",
+                        build_dir,
+                        module_name,
+                        testcase,
+                        runner,
+                        outcome,
+                        build_seconds,
+                        time.perf_counter() - start,
+                    )
 
         return wrapper
 
@@ -0,0 +1,233 @@
+"""
+Split the tests into shards, to run them on several machines.
+
+`make test SHARD=i/N` runs shard i of N. Tests sharing a Verilator build
+are kept in the same shard, so no build is compiled twice, and builds are
+spread over the shards by their expected duration. Durations are read
+from a JUnit file of a previous run given in TEST_DURATIONS, e.g. the
+merged results of all shards. Builds without a recorded duration are
+estimated from the size of their sources. The local timing database is
+not used, as it differs between machines.
+
+The split only depends on the tests, their sources and the durations
+file, so every machine gets the same split.
+
+`make test SHARD=i/N` writes the results of the shard to
+`build/test/results/shard-<i>-of-<N>.xml`, and the tests collected by
+all shards to `shard-<i>-of-<N>.tests`. `make test-merge` combines the
+results of all shards into `build/test/results/merged.xml`, and fails if
+a test failed, ran in more than one shard or did not run at all.
+
+Usage: python testtools/sharding.py merge <output> <results>...
+"""
+
+import json
+import os
+import statistics
+import sys
+import xml.etree.ElementTree as ET
+
+# Build directories are named simbuild_<toplevel>[_<suffix>], see
+# `build_directory` in runner_tools.py
+BUILD_PREFIX = "simbuild_"
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse `<i>/<N>`, returns the 0-based index and the number of shards."""
+    index, _, count = spec.partition("/")
+    try:
+        i, n = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected <i>/<N>") from None
+    if not 1 <= i <= n:
+        raise ValueError(f"Invalid shard '{spec}', expected 1 <= i <= N")
+    return i - 1, n
+
+
+def junit_durations(path: str) -> dict[tuple[str, str], float]:
+    """
+    Durations of every (test, build) in a JUnit file written by pytest,
+    using the properties added by conftest.py.
+    """
+    durations = {}
+    for testcase in ET.parse(path).getroot().iter("testcase"):
+        properties = {
+            prop.get("name"): prop.get("value") for prop in testcase.iter("property")
+        }
+        if "test" in properties and "build" in properties:
+            key = (properties["test"], properties["build"])
+            durations[key] = float(testcase.get("time", 0))
+    return durations
+
+
+def shard_durations() -> dict[tuple[str, str], float]:
+    """
+    Durations to balance the shards by, from the shared TEST_DURATIONS
+    file. Without it, all durations are estimated from the sources.
+    """
+    if os.environ.get("TEST_DURATIONS"):
+        return junit_durations(os.environ["TEST_DURATIONS"])
+    return {}
+
+
+def tests_path(results: str) -> str:
+    """File listing the tests collected by the shard writing `results`"""
+    return f"{os.path.splitext(results)[0]}.tests"
+
+
+def write_tests(results: str, tests: list[str]):
+    """Write the tests collected by all shards next to the shard results."""
+    path = tests_path(results)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Every pytest-xdist worker writes the same list
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(sorted(tests), f, indent=0)
+    os.replace(tmp, path)
+
+
+def toplevel_of(build: str, modules: set[str]) -> str | None:
+    """Toplevel of a build directory, the longest module name that fits."""
+    name = build.removeprefix(BUILD_PREFIX)
+    matches = [m for m in modules if name == m or name.startswith(f"{m}_")]
+    return max(matches, key=len, default=None)
+
+
+def source_sizes(dependencies: dict[str, list[str]]) -> dict[str, int]:
+    """Total size of the sources of every toplevel, to estimate durations."""
+    sizes = {}
+    for module, files in dependencies.items():
+        sizes[module] = sum(os.path.getsize(f) for f in files if os.path.exists(f))
+    return sizes
+
+
+def build_weights(
+    tests: list[tuple[str, str]],
+    durations: dict[tuple[str, str], float],
+    sizes: dict[str, int],
+) -> dict[str, float]:
+    """
+    Expected duration of every build, the sum of the durations of its
+    (test, build) tests. Tests without a recorded duration are estimated
+    from the source size of their toplevel, scaled by the seconds per byte
+    of the tests that have one.
+    """
+    modules = set(sizes)
+
+    def size(build: str) -> int:
+        toplevel = toplevel_of(build, modules)
+        return max(sizes.get(toplevel, 0) if toplevel else 0, 1)
+
+    rates = [durations[t] / size(t[1]) for t in tests if t in durations]
+    rate = statistics.median(rates) if rates else 1.0
+
+    weights: dict[str, float] = {}
+    for test in tests:
+        _, build = test
+        duration = durations.get(test)
+        if duration is None:
+            duration = rate * size(build)
+        weights[build] = weights.get(build, 0.0) + duration
+    return weights
+
+
+def partition(weights: dict[str, float], count: int) -> list[list[str]]:
+    """
+    Split builds into `count` shards of about equal weight, by adding the
+    heaviest remaining build to the lightest shard. Ties are broken by
+    name and index, so the split is deterministic.
+    """
+    shards: list[list[str]] = [[] for _ in range(count)]
+    loads = [0.0] * count
+    for build in sorted(weights, key=lambda b: (-weights[b], b)):
+        lightest = min(range(count), key=lambda i: (loads[i], i))
+        shards[lightest].append(build)
+        loads[lightest] += weights[build]
+    return shards
+
+
+def select_shard(
+    tests: list[tuple[str, str]],
+    spec: str,
+    durations: dict[tuple[str, str], float],
+    sizes: dict[str, int],
+) -> set[str]:
+    """Builds of the (test, build) tests that belong to shard `spec`."""
+    index, count = parse_shard(spec)
+    weights = build_weights(tests, durations, sizes)
+    return set(partition(weights, count)[index])
+
+
+def test_name(testcase: ET.Element) -> str:
+    """Name of a JUnit testcase, as in the tests file of a shard"""
+    for prop in testcase.iter("property"):
+        if prop.get("name") == "test":
+            return prop.get("value", "")
+    return f"{testcase.get('classname')}::{testcase.get('name')}"
+
+
+def merge(output: str, paths: list[str]) -> bool:
+    """
+    Combine the JUnit files of several shards into `output`. Returns False
+    if any test failed, ran in more than one shard, or was collected but
+    not run by any shard.
+    """
+    root = ET.Element("testsuites", name="pytest tests")
+    totals = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+    time = 0.0
+    seen: dict[str, str] = {}
+    duplicates = []
+    collected: set[str] = set()
+    problems = []
+    for path in paths:
+        try:
+            with open(tests_path(path)) as f:
+                tests = set(json.load(f))
+        except FileNotFoundError:
+            problems.append(f"No list of collected tests for {path}")
+            tests = set()
+        if collected and tests and tests != collected:
+            problems.append(f"{path} collected different tests than the other shards")
+        collected |= tests
+
+        for suite in ET.parse(path).getroot().iter("testsuite"):
+            suite.set("name", os.path.splitext(os.path.basename(path))[0])
+            for key in totals:
+                totals[key] += int(suite.get(key, 0))
+            time += float(suite.get("time", 0))
+            for testcase in suite.iter("testcase"):
+                name = test_name(testcase)
+                if name in seen:
+                    duplicates.append(f"{name} in {seen[name]} and {path}")
+                seen[name] = path
+            root.append(suite)
+    for key, value in totals.items():
+        root.set(key, str(value))
+    root.set("time", f"{time:.3f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    ET.ElementTree(root).write(f"{output}.tmp", encoding="utf-8", xml_declaration=True)
+    os.replace(f"{output}.tmp", output)
+
+    print(
+        f"Merged {len(paths)} shards into {output}: {totals['tests']} tests,"
+        f" {totals['failures']} failures, {totals['errors']} errors,"
+        f" {totals['skipped']} skipped, {time:.1f}s"
+    )
+    missing = sorted(collected - set(seen))
+    for duplicate in duplicates:
+        print(f"Ran in more than one shard: {duplicate}")
+    for test in missing:
+        print(f"Not run by any shard: {test}")
+    for problem in problems:
+        print(problem)
+    return not (
+        totals["failures"] or totals["errors"] or duplicates or missing or problems
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "merge":
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    sys.exit(0 if merge(sys.argv[2], sys.argv[3:]) else 1)
@@ -0,0 +1,91 @@
+import os
+
+from affected import affected_tests, imported_files, importers, python_module
+
+COMPILE_ORDERS = {
+    "Top": ["src/pkg.sv", "src/leaf.sv", "src/top.sv"],
+    "Leaf": ["src/pkg.sv", "src/leaf.sv"],
+}
+TOPLEVELS = {"tests/test_top.py": "Top", "tests/test_leaf.py": "Leaf"}
+
+
+def write_tests(testdir, **sources: str):
+    for name, source in sources.items():
+        path = os.path.join(testdir, *name.split("."))
+        if name.endswith("__init__"):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.py", "w") as f:
+            f.write(source)
+
+
+def test_python_module():
+    assert python_module("tests/tools/pipeline.py", "tests") == "tools.pipeline"
+    assert python_module("tests/tools/__init__.py", "tests") == "tools"
+
+
+def test_importers(tmp_path):
+    testdir = str(tmp_path)
+    write_tests(
+        testdir,
+        **{
+            "tools.__init__": "",
+            "tools.pipeline": "from .scoreboard import Scoreboard\n",
+            "tools.scoreboard": "import numpy\n",
+            "test_top": "from tools.pipeline import Producer\n",
+            "test_leaf": "import tools.scoreboard\n",
+            "test_other": "from tools import pipeline\n",
+        },
+    )
+
+    def path(name: str) -> str:
+        return os.path.join(testdir, f"{name}.py")
+
+    graph = importers(testdir)
+    assert graph[path("tools/scoreboard")] == {
+        path("tools/pipeline"),
+        path("test_leaf"),
+    }
+    assert graph[path("tools/pipeline")] == {path("test_top"), path("test_other")}
+    assert path("tools/__init__") in imported_files(
+        path("test_leaf"), testdir, {"tools": path("tools/__init__")}
+    )
+
+
+def test_verilog_changes():
+    selected, impact = affected_tests(["src/leaf.sv"], COMPILE_ORDERS, TOPLEVELS, {})
+    assert sorted(selected) == ["tests/test_leaf.py", "tests/test_top.py"]
+    assert impact["src/leaf.sv"] == "toplevels Leaf, Top"
+
+    selected, _ = affected_tests(["src/top.sv"], COMPILE_ORDERS, TOPLEVELS, {})
+    assert selected == {"tests/test_top.py": ["Top compiles src/top.sv"]}
+
+    selected, impact = affected_tests(["src/unused.sv"], COMPILE_ORDERS, TOPLEVELS, {})
+    assert selected == {}
+    assert impact["src/unused.sv"] == "not in the compile order of any module"
+
+
+def test_python_changes():
+    graph = {
+        "tests/tools/scoreboard.py": {"tests/tools/pipeline.py"},
+        "tests/tools/pipeline.py": {"tests/test_top.py"},
+        "tests/test_top.py": set(),
+    }
+    selected, impact = affected_tests(
+        ["tests/tools/scoreboard.py", "tests/test_top.py"],
+        COMPILE_ORDERS,
+        TOPLEVELS,
+        graph,
+    )
+    assert selected == {
+        "tests/test_top.py": ["imports tests/tools/scoreboard.py", "changed"]
+    }
+    assert impact["tests/tools/scoreboard.py"] == "1 test modules"
+
+
+def test_infrastructure_changes():
+    changed = ["testtools/runner_tools.py", "readme.md", "testtools/tests/test_x.py"]
+    selected, impact = affected_tests(changed, COMPILE_ORDERS, TOPLEVELS, {})
+    assert sorted(selected) == sorted(TOPLEVELS)
+    assert impact["testtools/runner_tools.py"] == "all tests"
+    assert impact["readme.md"] == "no tests"
+    assert impact["testtools/tests/test_x.py"].startswith("no tests")
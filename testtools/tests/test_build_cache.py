@@ -0,0 +1,54 @@
+import os
+
+from build_cache import BuildCache
+
+
+def make_build(build_dir: str, toplevel: str, size: int = 16):
+    def build():
+        os.makedirs(build_dir, exist_ok=True)
+        with open(os.path.join(build_dir, toplevel), "wb") as f:
+            f.write(b"\0" * size)
+
+    return build
+
+
+def test_build_reuse_restore(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    build_dir = str(tmp_path / "simbuild_Top")
+    builds = []
+
+    def build():
+        builds.append(1)
+        make_build(build_dir, "Top")()
+
+    assert cache.build("aa01", build_dir, "Top", build) == "built"
+    assert cache.build("aa01", build_dir, "Top", build) == "reused"
+
+    # Another key rebuilds, and the first one is restored from the cache
+    assert cache.build("bb02", build_dir, "Top", build) == "built"
+    assert cache.build("aa01", build_dir, "Top", build) == "restored"
+    assert len(builds) == 2
+    assert cache.stats() == {"built": 2, "reused": 1, "restored": 1}
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    cache.max_size = 2560
+
+    first = str(tmp_path / "simbuild_A")
+    second = str(tmp_path / "simbuild_B")
+    cache.build("aa01", first, "A", make_build(first, "A", 1024))
+    cache.build("bb02", second, "B", make_build(second, "B", 512))
+    os.utime(cache._entry("aa01"), (0, 0))
+    os.utime(cache._entry("bb02"), (1, 1))
+
+    # Using a build from its build directory marks it as recently used
+    assert cache.build("aa01", first, "A", make_build(first, "A")) == "reused"
+
+    third = str(tmp_path / "simbuild_C")
+    cache.build("cc03", third, "C", make_build(third, "C", 1024))
+
+    assert not os.path.exists(cache._entry("bb02"))
+    assert os.path.exists(cache._entry("aa01"))
+    assert os.path.exists(cache._entry("cc03"))
+    assert cache.stats()["evicted"] == 1
@@ -0,0 +1,112 @@
+import os
+
+import gendependencies
+from gendependencies import (
+    compile_orders,
+    interface_hashes,
+    preprocess,
+    read_cache,
+    scan_files,
+    scan_source,
+    write_cache,
+)
+
+PACKAGE = """
+package types_pkg;
+    typedef logic [7:0] byte_t;
+endpackage
+"""
+
+LEAF = """
+module Leaf (input logic clk, output types_pkg::byte_t value);
+    always_ff @(posedge clk) value <= value + 1;
+endmodule
+"""
+
+TOP = """
+import types_pkg::*;
+
+module Top (input logic clk);
+    byte_t value;
+`ifdef SIMULATION
+    Leaf leaf (.clk(clk), .value(value));
+`else
+    XilinxLeaf leaf (.clk(clk), .value(value));
+`endif
+endmodule
+"""
+
+
+def write_sources(directory, **sources: str) -> list[str]:
+    paths = []
+    for name, source in sources.items():
+        path = os.path.join(directory, f"{name}.sv")
+        with open(path, "w") as f:
+            f.write(source)
+        paths.append(path)
+    return paths
+
+
+def test_preprocess():
+    source = "a\n`ifdef X\nb\n`elsif Y\nc\n`else\nd\n`endif\ne\n"
+    assert preprocess(source, {"X"}).split() == ["a", "b", "e"]
+    assert preprocess(source, {"Y"}).split() == ["a", "c", "e"]
+    assert preprocess(source, set()).split() == ["a", "d", "e"]
+
+
+def test_scan_source():
+    (top,) = scan_source(TOP)
+    assert (top.kind, top.name) == ("module", "Top")
+    assert top.packages == ["types_pkg"]
+    assert top.instances == ["Leaf"]
+
+
+def test_compile_orders(tmp_path):
+    paths = write_sources(tmp_path, top=TOP, leaf=LEAF, types=PACKAGE)
+    top, leaf, package = paths
+    orders = compile_orders(scan_files(paths, {}))
+    assert orders == {"Top": [package, leaf, top], "Leaf": [package, leaf]}
+
+
+def test_interface_hash_ignores_logic(tmp_path):
+    paths = write_sources(tmp_path, top=TOP, leaf=LEAF, types=PACKAGE)
+    before = interface_hashes(scan_files(paths, {}))
+
+    write_sources(tmp_path, leaf=LEAF.replace("value + 1", "value + 2"))
+    assert interface_hashes(scan_files(paths, {})) == before
+
+    write_sources(tmp_path, leaf=LEAF.replace("byte_t value", "byte_t count"))
+    after = interface_hashes(scan_files(paths, {}))
+    assert after["Leaf"] != before["Leaf"]
+    assert after["Top"] != before["Top"]
+
+
+def test_scan_cache(tmp_path, monkeypatch):
+    paths = write_sources(tmp_path, top=TOP, leaf=LEAF, types=PACKAGE)
+    cache_file = str(tmp_path / "cache" / "scan.json")
+    write_cache(scan_files(paths, {}), cache_file)
+    cache = read_cache(cache_file)
+    assert sorted(cache) == sorted(paths)
+
+    scanned = []
+    scan = gendependencies.scan_source
+    monkeypatch.setattr(
+        gendependencies,
+        "scan_source",
+        lambda source: scanned.append(source) or scan(source),
+    )
+
+    # Unchanged and touched files are not scanned again
+    os.utime(paths[1], (0, 0))
+    scans = scan_files(paths, cache)
+    assert scans[0] is cache[paths[0]]
+    assert scans[1].units == cache[paths[1]].units
+    assert scanned == []
+
+    write_sources(tmp_path, top=TOP.replace("Leaf leaf", "Leaf other"))
+    scan_files(paths, cache)
+    assert len(scanned) == 1
+
+    # Caches of another scanner version are ignored
+    monkeypatch.setattr(gendependencies, "SCANNER_VERSION", -1)
+    assert read_cache(cache_file) == {}
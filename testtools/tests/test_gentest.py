@@ -0,0 +1,114 @@
+import pytest
+
+import gentest
+from gentest import NotStatic, ParameterSet, discover_module, scan_module
+
+SOURCE = """
+import cocotb
+from cocotb import test as cocotb_test
+
+WIDTH = 8
+VERILOG_MODULE: str = "Adder"
+VERILOG_PARAMETERS: dict = {"WIDTH": WIDTH, "DEPTH": 2**WIDTH}
+WAVES = "fst"
+UNUSED: int
+
+
+@cocotb.test()
+async def test_add(dut):
+    pass
+
+
+@cocotb_test
+async def test_subtract(dut):
+    pass
+
+
+async def test_helper(dut):
+    pass
+"""
+
+
+def test_scan_module():
+    module = scan_module(SOURCE, "math.test_adder")
+    assert module is not None
+    assert module.verilog_toplevel == "Adder"
+    assert list(module.tests) == ["test_add", "test_subtract"]
+    assert module.verilog_parameters == [
+        ParameterSet("", repr({"WIDTH": 8, "DEPTH": 256}))
+    ]
+    assert module.waves == "'fst'"
+    assert module.profile is None
+
+
+def test_scan_module_without_toplevel():
+    assert scan_module("VERILOG_MODULE: str\n", "test_empty") is None
+
+
+def test_scan_module_not_static():
+    with pytest.raises(NotStatic):
+        scan_module('VERILOG_MODULE = "A" + name()\n', "test_call")
+    with pytest.raises(NotStatic):
+        scan_module('VERILOG_MODULE = "A"\ntest_alias = other\n', "test_alias")
+
+
+def test_parameter_sets():
+    sets = gentest.parameter_sets(
+        "test_matrix", [{"W": 8}, {"W": 16}], {"DEPTH": [2, 4], "FAST": [True]}
+    )
+    assert [s.id for s in sets] == [
+        "W=8,DEPTH=2",
+        "W=8,DEPTH=4",
+        "W=16,DEPTH=2",
+        "W=16,DEPTH=4",
+    ]
+    assert eval(sets[1].parameters) == {"W": 8, "DEPTH": 4, "FAST": True}
+
+    # Sets that do not differ are numbered
+    assert [s.id for s in gentest.parameter_sets("test_same", [{}, {}], None)] == [
+        "0",
+        "1",
+    ]
+
+    with pytest.raises(ImportError):
+        gentest.parameter_sets("test_invalid", [], None)
+    with pytest.raises(ImportError):
+        gentest.parameter_sets("test_invalid", None, {"DEPTH": []})
+
+
+def test_discovery_cache(tmp_path, monkeypatch):
+    testdir = str(tmp_path)
+    path = str(tmp_path / "test_adder.py")
+    with open(path, "w") as f:
+        f.write(SOURCE)
+
+    cache: dict[str, dict] = {}
+    updated: dict[str, dict] = {}
+    module = discover_module(path, testdir, cache, updated)
+    assert module is not None
+    assert updated[path]["module"]["verilog_toplevel"] == "Adder"
+
+    # Unchanged files are not scanned again, and give the same module
+    def scan(source, name):
+        raise AssertionError(f"{name} scanned again")
+
+    monkeypatch.setattr(gentest, "scan_module", scan)
+    cached: dict[str, dict] = {}
+    assert discover_module(path, testdir, updated, cached) == module
+    assert cached == updated
+
+    with open(path, "a") as f:
+        f.write("\n# changed\n")
+    with pytest.raises(AssertionError, match="scanned again"):
+        discover_module(path, testdir, updated, {})
+
+
+def test_discovery_cache_version(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "discovery.json")
+    gentest.write_cache(
+        {"tests/test_adder.py": {"hash": "", "module": None}}, cache_file
+    )
+    assert list(gentest.read_cache(cache_file)) == ["tests/test_adder.py"]
+
+    monkeypatch.setattr(gentest, "DISCOVERY_VERSION", gentest.DISCOVERY_VERSION + 1)
+    assert gentest.read_cache(cache_file) == {}
@@ -0,0 +1,148 @@
+import os
+import types
+
+import pytest
+
+import gentypes
+from gentypes import Scalar, Struct, parse_packages, render
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXED = """
+package fixed_pkg;
+    localparam int STANDARD_FRACTIONAL_BITS = 14;
+    localparam int TOTAL_WIDTH = STANDARD_FRACTIONAL_BITS + 11;
+    typedef logic signed [TOTAL_WIDTH-1:0] fixed;
+    typedef logic signed [31:0] fixed_q16x16;
+endpackage
+"""
+
+TYPES = """
+// Imports fixed_pkg from another file
+package types_pkg;
+    import fixed_pkg::*;
+    localparam COLOR_BITS = 4;
+    localparam real SCALE = 0.5;
+
+    typedef struct packed {
+        logic [COLOR_BITS-1:0] red;
+        logic [2*COLOR_BITS-1:0] green; /* wider */
+    } color_t;
+
+    typedef struct packed {
+        fixed x;
+        fixed_q16x16 y;
+        logic signed [7:0] offset;
+        color_t color;
+        logic last;
+    } point_t;
+endpackage
+"""
+
+
+def test_parse_packages(tmp_path):
+    # The importing package comes first, it is still parsed last
+    (tmp_path / "types.sv").write_text(TYPES)
+    (tmp_path / "fixed.sv").write_text(FIXED)
+    parsed = parse_packages([str(tmp_path / "types.sv"), str(tmp_path / "fixed.sv")])
+
+    assert parsed["fixed"] == Scalar(25, True, 14)
+    assert parsed["fixed_q16x16"] == Scalar(32, True, 16)
+    assert parsed["color_t"] == Struct(
+        "color_t", [("red", Scalar(4)), ("green", Scalar(8))]
+    )
+    point = parsed["point_t"]
+    assert isinstance(point, Struct)
+    assert point.members == [
+        ("x", Scalar(25, True, 14)),
+        ("y", Scalar(32, True, 16)),
+        ("offset", Scalar(8, True)),
+        ("color", parsed["color_t"]),
+        ("last", Scalar(1)),
+    ]
+    assert point.width == 25 + 32 + 8 + 12 + 1
+
+    code = render(parsed, "0", ["types.sv"])
+    assert "class Color(LogicObject):" in code
+    assert "    y: float = LogicField(Fixed(16, 32))  # type: ignore" in code
+    assert "    offset: int = LogicField(Int(8))  # type: ignore" in code
+    assert "    color: Color = LogicField(Color)  # type: ignore" in code
+    # Only structs become classes
+    assert "class Fixed" not in code
+
+
+def test_unsupported_declaration(tmp_path):
+    (tmp_path / "types.sv").write_text(TYPES.replace("color_t color", "pixel_t color"))
+    (tmp_path / "fixed.sv").write_text(FIXED)
+    with pytest.raises(ValueError, match="Unknown type 'pixel_t'"):
+        parse_packages([str(tmp_path / "types.sv"), str(tmp_path / "fixed.sv")])
+
+
+# The hand-written types in tests/core/types/types_.py, by the System
+# Verilog type they are sent or received as
+HAND_WRITTEN = {
+    "Byte": "byte_t",
+    "Short": "short_t",
+    "RGB": "color_t",
+    "Position": "position_t",
+    "ProjectedPosition": "position_t",
+    "Vertex": "vertex_t",
+    "ProjectedVertex": "vertex_t",
+    "Triangle": "triangle_t",
+    "ProjectedTriangle": "triangle_t",
+    "TriangleMetadata": "triangle_metadata_t",
+    "RotationMatrix": "rotmat_t",
+    "Transform": "transform_t",
+    "ModelInstance": "modelinstance_t",
+    "ScenebufModelInstance": "scenebuf_modelinstance_t",
+    "PixelCoordinate": "pixel_coordinate_t",
+    "PixelData": "pixel_data_t",
+    "PixelDataMetadata": "pixel_metadata_t",
+    "ModelBufferWrite": "modelbuf_write_t",
+    "ModelBufferRead": "modelbuf_read_t",
+    "TriangleMeta": "triangle_meta_t",
+    "ModelInstanceMeta": "modelinstance_meta_t",
+    "TriangleTransform": "triangle_tf",
+    "TriangleTransformMeta": "triangle_tf_meta_t",
+    "PipelineEntry": "pipeline_entry_t",
+    "Last": "last_t",
+}
+
+# Types that read the `fixed` fields of the hardware type in another fixed
+# point format, e.g. the projected positions in screen space
+REFORMATTED = {"ProjectedPosition", "ProjectedVertex", "ProjectedTriangle", "PixelData"}
+
+
+def bit_layout(cls, formats: bool = True) -> list[tuple]:
+    """Offset, width, signedness and fixed point format of every leaf field."""
+    return [
+        (
+            entry.offset,
+            entry.width,
+            entry.kind.__name__ != "UInt",
+            entry.fractional_bits if formats else None,
+        )
+        for entry in cls.layout()
+    ]
+
+
+def test_generated_layouts_match_types(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "tests"))
+    hand_written = pytest.importorskip("core.types.types_")
+
+    parsed = parse_packages([os.path.join(ROOT, path) for path in gentypes.SOURCES])
+    generated = types.ModuleType("sv_types")
+    exec(render(parsed, "", gentypes.SOURCES), generated.__dict__)
+
+    for name, sv_name in HAND_WRITTEN.items():
+        cls = getattr(hand_written, name)
+        sv_type = parsed[sv_name]
+        if isinstance(sv_type, Scalar):
+            assert cls.size() == sv_type.width, name
+            continue
+
+        sv_cls = getattr(generated, gentypes.class_name(sv_name))
+        formats = name not in REFORMATTED
+        assert bit_layout(cls, formats) == bit_layout(
+            sv_cls, formats
+        ), f"{name} in types_.py does not match {sv_name}"
@@ -0,0 +1,137 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from sharding import (
+    build_weights,
+    junit_durations,
+    merge,
+    parse_shard,
+    partition,
+    select_shard,
+    toplevel_of,
+)
+from sharding import tests_path as collected_path
+
+TESTS = [
+    ("alu/test_alu.py::test_add", "simbuild_Alu"),
+    ("alu/test_alu.py::test_sub", "simbuild_Alu"),
+    ("alu/test_alu_fast.py::test_add", "simbuild_Alu_fast_1234abcd"),
+    ("mem/test_ram.py::test_read", "simbuild_Ram"),
+    ("mem/test_ram.py::test_write", "simbuild_Ram_Dual"),
+]
+
+
+def write_results(path: str, tests: list[tuple[str, str, float, str | None]]):
+    """JUnit results of (test, build, time, failure) like pytest writes them"""
+    suite = ET.Element("testsuite", tests=str(len(tests)), time="1.0")
+    failures = 0
+    for test, build, time, failure in tests:
+        filename, name = test.split("::")
+        testcase = ET.SubElement(
+            suite, "testcase", classname=filename, name=name, time=str(time)
+        )
+        properties = ET.SubElement(testcase, "properties")
+        ET.SubElement(properties, "property", name="test", value=test)
+        ET.SubElement(properties, "property", name="build", value=build)
+        if failure:
+            ET.SubElement(testcase, "failure", message=failure)
+            failures += 1
+    suite.set("failures", str(failures))
+    root = ET.Element("testsuites")
+    root.append(suite)
+    ET.ElementTree(root).write(path)
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (0, 4)
+    assert parse_shard("4/4") == (3, 4)
+    for spec in ("0/4", "5/4", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_toplevel_of():
+    modules = {"Ram", "Ram_Dual", "Alu"}
+    assert toplevel_of("simbuild_Ram", modules) == "Ram"
+    assert toplevel_of("simbuild_Ram_Dual_fast_1234abcd", modules) == "Ram_Dual"
+    assert toplevel_of("simbuild_Other", modules) is None
+
+
+def test_build_weights():
+    durations = {TESTS[0]: 2.0, TESTS[1]: 4.0}
+    sizes = {"Alu": 100, "Ram": 50, "Ram_Dual": 200}
+    weights = build_weights(TESTS, durations, sizes)
+    assert weights["simbuild_Alu"] == 6.0
+    # Estimated from the median of 0.02 and 0.04 s per byte of the sources
+    assert weights["simbuild_Ram"] == pytest.approx(1.5)
+    assert weights["simbuild_Ram_Dual"] == pytest.approx(6.0)
+
+
+def test_partition():
+    weights = {"a": 5.0, "b": 4.0, "c": 3.0, "d": 3.0, "e": 1.0}
+    shards = partition(weights, 2)
+    assert shards == [["a", "d"], ["b", "c", "e"]]
+    assert partition(dict(reversed(weights.items())), 2) == shards
+    assert partition(weights, 7)[5:] == [[], []]
+
+
+def test_select_shard():
+    sizes = {"Alu": 100, "Ram": 50, "Ram_Dual": 200}
+    shards = [select_shard(TESTS, f"{i}/3", {}, sizes) for i in range(1, 4)]
+    builds = [build for shard in shards for build in shard]
+    # Every build is in exactly one shard, so its tests stay together
+    assert sorted(builds) == sorted({build for _, build in TESTS})
+
+
+def test_merge(tmp_path):
+    collected = [test for test, _ in TESTS]
+    shards = [TESTS[:3], TESTS[3:]]
+    paths = []
+    for i, shard in enumerate(shards, 1):
+        path = str(tmp_path / f"shard-{i}-of-2.xml")
+        write_results(path, [(test, build, 1.5, None) for test, build in shard])
+        with open(collected_path(path), "w") as f:
+            json.dump(collected, f)
+        paths.append(path)
+
+    output = str(tmp_path / "merged.xml")
+    assert merge(output, paths)
+    root = ET.parse(output).getroot()
+    assert root.get("tests") == "5"
+    assert junit_durations(output) == {test: 1.5 for test in TESTS}
+
+
+def test_merge_problems(tmp_path, capsys):
+    collected = [test for test, _ in TESTS]
+    first = str(tmp_path / "shard-1-of-2.xml")
+    write_results(first, [(test, build, 1.0, None) for test, build in TESTS[:3]])
+    with open(collected_path(first), "w") as f:
+        json.dump(collected, f)
+    output = str(tmp_path / "merged.xml")
+
+    # A shard that did not run
+    assert not merge(output, [first])
+    assert f"Not run by any shard: {TESTS[3][0]}" in capsys.readouterr().out
+
+    # A test in two shards, and a failure
+    second = str(tmp_path / "shard-2-of-2.xml")
+    write_results(
+        second,
+        [(TESTS[2][0], TESTS[2][1], 1.0, None)]
+        + [(test, build, 1.0, "assert") for test, build in TESTS[3:]],
+    )
+    with open(collected_path(second), "w") as f:
+        json.dump(collected, f)
+    assert not merge(output, [first, second])
+    out = capsys.readouterr().out
+    assert f"Ran in more than one shard: {TESTS[2][0]}" in out
+    assert "2 failures" in out
+
+    # Shards of different runs
+    write_results(second, [(test, build, 1.0, None) for test, build in TESTS[3:]])
+    with open(collected_path(second), "w") as f:
+        json.dump(collected[1:], f)
+    assert not merge(output, [first, second])
+    assert "collected different tests" in capsys.readouterr().out
@@ -0,0 +1,104 @@
+import sqlite3
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import timing_db
+from timing_db import expected_durations, history, record
+
+
+def timing(run_id: str, wall_seconds: float, **kwargs) -> timing_db.TestTiming:
+    values = dict(
+        run_id=run_id,
+        test="alu/test_alu.py::test_add",
+        build="simbuild_Alu",
+        outcome="passed",
+        cache="reused",
+        build_seconds=0.5,
+        sim_seconds=2.0,
+        sim_ns=10_000.0,
+        sim_cycles=1_000.0,
+        wall_seconds=wall_seconds,
+    )
+    return timing_db.TestTiming(**{**values, **kwargs})
+
+
+def test_sim_rate():
+    assert timing("a", 3.0).sim_rate == 500.0
+    assert timing("a", 3.0, sim_seconds=0.0).sim_rate == 0.0
+
+
+def test_record_history(tmp_path):
+    path = str(tmp_path / "timings.sqlite")
+    # Recorded out of order, history is sorted by time
+    for run_id, timestamp in zip("bac", [2.0, 1.0, 3.0]):
+        record(timing(run_id, 1.0, timestamp=timestamp), path)
+    record(timing("c", 9.0, build="simbuild_Alu_fast", timestamp=3.0), path)
+
+    runs = history(path)
+    assert sorted(runs) == [
+        ("alu/test_alu.py::test_add", "simbuild_Alu"),
+        ("alu/test_alu.py::test_add", "simbuild_Alu_fast"),
+    ]
+    assert [t.run_id for t in runs[("alu/test_alu.py::test_add", "simbuild_Alu")]] == [
+        "a",
+        "b",
+        "c",
+    ]
+
+
+def test_expected_durations(tmp_path, monkeypatch):
+    monkeypatch.setattr(timing_db, "HISTORY", 3)
+    path = str(tmp_path / "timings.sqlite")
+    for i, wall_seconds in enumerate([100.0, 1.0, 2.0, 6.0, 50.0]):
+        record(timing(f"run{i}", wall_seconds, timestamp=float(i + 1)), path)
+
+    key = ("alu/test_alu.py::test_add", "simbuild_Alu")
+    # Median of the last runs
+    assert expected_durations(path=path) == {key: 6.0}
+    # The current run is ignored, so all workers see the same durations
+    assert expected_durations(exclude_run="run4", path=path) == {key: 2.0}
+    assert expected_durations(path=str(tmp_path / "missing.sqlite")) == {}
+
+
+def test_database_without_cycles(tmp_path):
+    path = str(tmp_path / "timings.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE timings"
+        " (run_id TEXT, test TEXT, build TEXT, outcome TEXT, cache TEXT,"
+        " build_seconds REAL, sim_seconds REAL, sim_ns REAL,"
+        " wall_seconds REAL, timestamp REAL)"
+    )
+    connection.execute(
+        "INSERT INTO timings VALUES ('a', 't', 'b', 'passed', '', 1, 2, 3, 4, 5)"
+    )
+    connection.commit()
+    connection.close()
+
+    record(timing("b", 8.0, test="t", build="b", timestamp=6.0), path)
+    old, new = history(path)[("t", "b")]
+    assert (old.sim_cycles, old.wall_seconds) == (0.0, 4.0)
+    assert (new.sim_cycles, new.wall_seconds) == (1_000.0, 8.0)
+    assert new.sim_rate == pytest.approx(500.0)
+
+
+def test_add_cycles(tmp_path):
+    from runner_tools import add_cycles
+
+    results = str(tmp_path / "results.xml")
+    with open(results, "w") as f:
+        f.write(
+            "<testsuites><testsuite>"
+            '<testcase classname="alu.test_alu" name="test_add" sim_time_ns="1000"/>'
+            '<testcase classname="alu.test_alu" name="test_sub" sim_time_ns="500"/>'
+            "</testsuite></testsuites>"
+        )
+    periods = str(tmp_path / "clocks.json")
+    with open(periods, "w") as f:
+        f.write('{"alu.test_alu.test_add": 2.5}')
+
+    add_cycles(results, periods)
+    cycles = [e.get("sim_cycles") for e in ET.parse(results).getroot().iter("testcase")]
+    # Tests that started no clock have no cycles
+    assert cycles == ["400", None]
@@ -0,0 +1,176 @@
+"""
+Timing database of the test runner.
+
+Every test run appends a record with the build and simulation time, the
+simulated time and clock cycles, and whether the build came from the
+build cache. The records are used to report the slowest tests and
+regressions, and to run the longest tests first when running in parallel.
+
+Usage: python testtools/timing_db.py [report [threshold]|clear]
+"""
+
+import contextlib
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from dataclasses import astuple, dataclass, fields
+
+DB_FILE = "build/test/timings.sqlite"
+
+# Number of previous runs to estimate the duration of a test from
+HISTORY = 5
+
+# Default slowdown compared to previous runs that counts as a regression
+REGRESSION_THRESHOLD = 1.25
+
+
+@dataclass
+class TestTiming:
+    run_id: str
+    test: str
+    build: str
+    outcome: str
+    cache: str
+    build_seconds: float
+    sim_seconds: float
+    sim_ns: float
+    # Cycles of the fastest clock of the test, see tests/tools/clock_periods.py
+    sim_cycles: float
+    wall_seconds: float
+    timestamp: float = 0.0
+
+    @property
+    def sim_rate(self) -> float:
+        """Simulated clock cycles per second of wall-clock time"""
+        return self.sim_cycles / self.sim_seconds if self.sim_seconds > 0 else 0.0
+
+
+COLUMNS = [f.name for f in fields(TestTiming)]
+
+
+@contextlib.contextmanager
+def connect(path: str = DB_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Parallel workers write at the same time, wait for each other
+    connection = sqlite3.connect(path, timeout=60)
+    try:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS timings"
+            " (run_id TEXT, test TEXT, build TEXT, outcome TEXT, cache TEXT,"
+            " build_seconds REAL, sim_seconds REAL, sim_ns REAL,"
+            " sim_cycles REAL, wall_seconds REAL, timestamp REAL)"
+        )
+        # Databases from before cycles were recorded
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(timings)")}
+        if "sim_cycles" not in columns:
+            connection.execute(
+                "ALTER TABLE timings ADD COLUMN sim_cycles REAL DEFAULT 0"
+            )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS timings_test ON timings (test, build)"
+        )
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def record(timing: TestTiming, path: str = DB_FILE):
+    if timing.timestamp == 0.0:
+        timing.timestamp = time.time()
+    with connect(path) as connection:
+        connection.execute(
+            f"INSERT INTO timings ({', '.join(COLUMNS)})"
+            f" VALUES ({', '.join('?' * len(COLUMNS))})",
+            astuple(timing),
+        )
+
+
+def history(path: str = DB_FILE) -> dict[tuple[str, str], list[TestTiming]]:
+    """Records of every (test, build), oldest first."""
+    if not os.path.exists(path):
+        return {}
+    results: dict[tuple[str, str], list[TestTiming]] = {}
+    with connect(path) as connection:
+        rows = connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM timings ORDER BY timestamp"
+        )
+        for row in rows:
+            timing = TestTiming(*row)
+            results.setdefault((timing.test, timing.build), []).append(timing)
+    return results
+
+
+def expected_durations(
+    exclude_run: str | None = None, path: str = DB_FILE
+) -> dict[tuple[str, str], float]:
+    """
+    Median wall time of the last runs of every (test, build). Records of
+    `exclude_run` are ignored, so every worker of a run sees the same
+    durations.
+    """
+    durations = {}
+    for key, timings in history(path).items():
+        previous = [t.wall_seconds for t in timings if t.run_id != exclude_run]
+        if previous:
+            durations[key] = statistics.median(previous[-HISTORY:])
+    return durations
+
+
+def report(threshold: float = REGRESSION_THRESHOLD, limit: int = 15):
+    tests = history()
+    if not tests:
+        print(f"No timings recorded in {DB_FILE} yet, run `make test` first")
+        return
+
+    latest = sorted(
+        tests.values(), key=lambda timings: timings[-1].wall_seconds, reverse=True
+    )
+    print(f"Slowest tests (last {HISTORY} runs, oldest first):\n")
+    print(
+        f"{'test':<60} {'wall':>8} {'build':>8} {'sim':>8}"
+        f" {'cycles/s':>10} {'cache':>8}  trend"
+    )
+    for timings in latest[:limit]:
+        last = timings[-1]
+        trend = " ".join(f"{t.wall_seconds:.1f}" for t in timings[-HISTORY:])
+        print(
+            f"{last.test[:60]:<60} {last.wall_seconds:>7.1f}s"
+            f" {last.build_seconds:>7.1f}s {last.sim_seconds:>7.1f}s"
+            f" {last.sim_rate:>10.0f} {last.cache:>8}  {trend}"
+        )
+
+    regressions = []
+    for timings in tests.values():
+        last = timings[-1]
+        previous = [t.sim_seconds for t in timings[-HISTORY - 1 : -1]]
+        if not previous or last.outcome != "passed":
+            continue
+        baseline = statistics.median(previous)
+        # Build times depend on the build cache, so compare simulation time
+        if baseline > 0 and last.sim_seconds > threshold * baseline:
+            regressions.append((last.sim_seconds / baseline, last, baseline))
+
+    print(f"\nRegressions (simulation time above {threshold:.2f}x the median):\n")
+    if not regressions:
+        print("None")
+    for ratio, last, baseline in sorted(regressions, key=lambda r: r[0], reverse=True):
+        print(
+            f"{last.test[:60]:<60} {baseline:>7.1f}s -> {last.sim_seconds:>7.1f}s"
+            f" ({ratio:.2f}x)"
+        )
+
+    builds = [timings[-1] for timings in tests.values()]
+    hits = sum(t.cache in ("reused", "restored") for t in builds)
+    print(f"\nBuild cache hits in the last run of each test: {hits}/{len(builds)}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command == "clear":
+        if os.path.exists(DB_FILE):
+            os.remove(DB_FILE)
+    else:
+        report(float(sys.argv[2]) if len(sys.argv) > 2 else REGRESSION_THRESHOLD)
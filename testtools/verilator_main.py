@@ -0,0 +1,103 @@
+"""
+Simulator main for Verilator with windowed tracing.
+
+Generated from the main shipped with cocotb, with three extra options:
+
+    --trace-start NS     Do not dump before this simulated time
+    --trace-stop NS      Do not dump after this simulated time
+    --trace-trigger SIG  Do not dump before the signal SIG is high once,
+                         e.g. `Pipeline.pipeline_math.rasterizer.triangle_s_valid`
+
+Only the time steps inside the window are written to the trace file, so
+a long test can be traced around the part of interest.
+"""
+
+import os
+
+import cocotb_tools.config
+
+COCOTB_MAIN = str(cocotb_tools.config.share_dir / "lib" / "verilator" / "verilator.cpp")
+OUTPUT = "build/test/verilator_main.cpp"
+
+WINDOW_CODE = """
+static double trace_start_ns = 0.0;
+static double trace_stop_ns = -1.0;
+static const char *trace_trigger = nullptr;
+static vpiHandle trace_trigger_handle = nullptr;
+static bool trace_triggered = false;
+
+[[maybe_unused]] static bool trace_window(vluint64_t time) {
+    double ns = time * std::pow(10.0, 9 + Verilated::threadContextp()->timeprecision());
+    if (ns < trace_start_ns || (trace_stop_ns >= 0.0 && ns > trace_stop_ns)) {
+        return false;
+    }
+    if (trace_trigger == nullptr || trace_triggered) {
+        return true;
+    }
+    if (trace_trigger_handle == nullptr) {
+        trace_trigger_handle =
+            vpi_handle_by_name(const_cast<PLI_BYTE8 *>(trace_trigger), nullptr);
+        if (trace_trigger_handle == nullptr) {
+            fprintf(stderr, "Warning: trace trigger %s not found\\n", trace_trigger);
+            trace_trigger = nullptr;
+            return true;
+        }
+    }
+    s_vpi_value value;
+    value.format = vpiIntVal;
+    vpi_get_value(trace_trigger_handle, &value);
+    trace_triggered = value.value.integer != 0;
+    return trace_triggered;
+}
+"""
+
+ARGUMENT_CODE = """} else if (arg == "--trace-start" && i + 1 < argc) {
+            trace_start_ns = std::stod(argv[++i]);
+        } else if (arg == "--trace-stop" && i + 1 < argc) {
+            trace_stop_ns = std::stod(argv[++i]);
+        } else if (arg == "--trace-trigger" && i + 1 < argc) {
+            trace_trigger = argv[++i];
+        """
+
+# (anchor, replacement) pairs applied to the main of cocotb
+PATCHES = [
+    ("#include <memory>", "#include <cmath>\n#include <memory>"),
+    (
+        "static vluint64_t main_time = 0;",
+        WINDOW_CODE + "\nstatic vluint64_t main_time = 0;",
+    ),
+    (
+        '} else if (arg == "--trace-file") {',
+        ARGUMENT_CODE + '} else if (arg == "--trace-file") {',
+    ),
+    ("tfp->dump(main_time);", "if (trace_window(main_time)) tfp->dump(main_time);"),
+]
+
+
+def generate(output: str = OUTPUT) -> str:
+    """Write the patched main to `output` if it changed, returns its path."""
+    with open(COCOTB_MAIN) as f:
+        source = f.read()
+
+    for anchor, replacement in PATCHES:
+        if source.count(anchor) != 1:
+            raise RuntimeError(
+                f"Could not patch {COCOTB_MAIN} for windowed tracing, "
+                f"'{anchor}' not found. Unsupported cocotb version?"
+            )
+        source = source.replace(anchor, replacement)
+    source = f"// Generated by testtools/verilator_main.py from {COCOTB_MAIN}\n{source}"
+
+    output = os.path.abspath(output)
+    try:
+        with open(output) as f:
+            if f.read() == source:
+                return output
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp = f"{output}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(source)
+    os.replace(tmp, output)
+    return output